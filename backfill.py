@@ -0,0 +1,167 @@
+import os
+import sys
+import argparse
+import logging
+import multiprocessing
+from datetime import date, timedelta
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+import pyarrow as pa
+import nfl_scrapper
+import schedule_scrapper
+import matchup_stats
+from stage_store import write_stage, read_stage, stage_mtime
+from pipeline_logging import setup_logging
+
+# Set up logging
+setup_logging()
+
+# Inputs are checkpointed per week as stages under inputs/<season>/week_NN; outputs are one
+# Arrow file per week under output/season=<season>/week=<week>, readable as one hive-partitioned dataset
+BACKFILL_DIR = os.getenv('NFL_BACKFILL_DIR', 'backfill')
+BACKFILL_WORKERS = int(os.getenv('NFL_BACKFILL_WORKERS', str(os.cpu_count() or 1)))
+SEASON_SCHEDULE_URL = os.getenv('NFL_SEASON_SCHEDULE_URL', schedule_scrapper.SCHEDULE_URL + '?season={season}')
+
+
+def input_root(season: int, week: int) -> str:
+    return os.path.join(BACKFILL_DIR, 'inputs', str(season), f"week_{week:02d}")
+
+
+def output_file(season: int, week: int) -> str:
+    return os.path.join(BACKFILL_DIR, 'output', f"season={season}", f"week={week}", 'part-0.arrow')
+
+
+def has_inputs(season: int, week: int) -> bool:
+    root = input_root(season, week)
+    return stage_mtime('schedule', root) is not None and stage_mtime('nfl_stats', root) is not None
+
+
+# Stats as they stood on the Tuesday before the week's Thursday game; week 1 kicks off
+# the Thursday after Labor Day (first Monday in September)
+def week_snapshot_date(season: int, week: int) -> date:
+    labor_day = date(season, 9, 1) + timedelta(days=(7 - date(season, 9, 1).weekday()) % 7)
+    return labor_day + timedelta(days=1 + 7 * (week - 1))
+
+
+# "1-18" or "1,3,5-7"
+def parse_weeks(spec: str) -> list:
+    weeks = set()
+    for part in spec.split(','):
+        first, _, last = part.partition('-')
+        weeks.update(range(int(first), int(last or first) + 1))
+    return sorted(weeks)
+
+
+# Fetch the season schedule once and checkpoint each requested week's games
+def fetch_schedules(season: int, weeks: list, refetch: bool = False):
+    missing = [week for week in weeks if refetch or stage_mtime('schedule', input_root(season, week)) is None]
+    if not missing:
+        return
+    season_df = schedule_scrapper.scrape_season_schedule(SEASON_SCHEDULE_URL.format(season=season))
+    if season_df is None:
+        logging.error(f"Backfill: no schedule for season {season}")
+        return
+    for week in missing:
+        week_df = season_df[season_df['Week'] == week].drop(columns='Week').reset_index(drop=True)
+        if week_df.empty:
+            logging.warning(f"Backfill: season {season} schedule has no week {week}")
+            continue
+        write_stage('schedule', week_df, root=input_root(season, week))
+
+
+# Scrape every stat page as of the week's snapshot date; only a complete set is checkpointed
+def fetch_stats(season: int, week: int) -> bool:
+    snapshot = week_snapshot_date(season, week).isoformat()
+    all_dfs = nfl_scrapper.scrape_all([f"{url}?date={snapshot}" for url in nfl_scrapper.STAT_URLS])
+    if len(all_dfs) < len(nfl_scrapper.STAT_URLS):
+        logging.error(f"Backfill: only {len(all_dfs)}/{len(nfl_scrapper.STAT_URLS)} stat pages for "
+                      f"{season} week {week} ({snapshot})")
+        return False
+    write_stage('nfl_stats', {df_name: df for df, df_name in all_dfs}, root=input_root(season, week))
+    return True
+
+
+# Worker: read one week's checkpointed inputs (memory-mapped), build its matchup stats and
+# write the partition atomically. Returns (week, rows written).
+def compute_week(season: int, week: int):
+    root = input_root(season, week)
+    final_df = matchup_stats.build_matchup_stats(read_stage('schedule', root), read_stage('nfl_stats', root))
+    if final_df.empty:
+        raise ValueError(f"No matchup stats for {season} week {week}")
+
+    path = output_file(season, week)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    table = pa.Table.from_pandas(final_df, preserve_index=False)
+    with pa.OSFile(f"{path}.tmp", 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(f"{path}.tmp", path)
+    return week, len(final_df)
+
+
+# Weeks with an output partition are done and skipped unless `force`. Fetching runs in this
+# process (the scrapers are I/O-bound and rate-limited) and each week is handed to the process
+# pool as soon as its inputs are checkpointed, so computing overlaps with fetching.
+def backfill(season: int, weeks: list, workers: int = BACKFILL_WORKERS, fetch: bool = True,
+             refetch: bool = False, force: bool = False) -> dict:
+    status = {week: 'done' for week in weeks if not force and os.path.exists(output_file(season, week))}
+    todo = [week for week in weeks if week not in status]
+    if status:
+        logging.info(f"Backfill {season}: weeks {sorted(status)} already done")
+
+    ctx = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        futures = {}
+        if fetch:
+            fetch_schedules(season, todo, refetch)
+        for week in todo:
+            if stage_mtime('schedule', input_root(season, week)) is None:
+                status[week] = 'missing schedule'
+                continue
+            if fetch and (refetch or stage_mtime('nfl_stats', input_root(season, week)) is None):
+                fetch_stats(season, week)
+            if has_inputs(season, week):
+                futures[pool.submit(compute_week, season, week)] = week
+            else:
+                status[week] = 'missing inputs'
+
+        for future in as_completed(futures):
+            week = futures[future]
+            try:
+                _, rows = future.result()
+                status[week] = f"ok ({rows} rows)"
+                logging.info(f"Backfill {season} week {week}: {rows} rows")
+            except Exception as e:
+                status[week] = f"failed: {e}"
+                logging.error(f"Backfill {season} week {week} failed: {e}")
+    return dict(sorted(status.items()))
+
+
+# All backfilled weeks as one DataFrame with 'season' and 'week' columns from the partition paths
+def read_backfill(season: int = None) -> pd.DataFrame:
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(os.path.join(BACKFILL_DIR, 'output'), format='arrow', partitioning='hive')
+    table = dataset.to_table(filter=ds.field('season') == season if season is not None else None)
+    return table.to_pandas()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backfill matchup stats for a season, one partition per week.")
+    parser.add_argument('--season', type=int, required=True)
+    parser.add_argument('--weeks', default='1-18', help="week range, e.g. 1-18 or 1,3,5-7")
+    parser.add_argument('--workers', type=int, default=BACKFILL_WORKERS, help="processes computing weeks")
+    parser.add_argument('--no-fetch', action='store_true', help="use only inputs already checkpointed")
+    parser.add_argument('--refetch', action='store_true', help="scrape inputs again even if checkpointed")
+    parser.add_argument('--force', action='store_true', help="recompute weeks that already have output")
+    args = parser.parse_args(argv)
+
+    status = backfill(args.season, parse_weeks(args.weeks), args.workers, fetch=not args.no_fetch,
+                      refetch=args.refetch, force=args.force)
+    for week, outcome in status.items():
+        print(f"{args.season} week {week:>2}: {outcome}")
+    failed = [week for week, outcome in status.items() if outcome != 'done' and not outcome.startswith('ok')]
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
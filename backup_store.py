@@ -0,0 +1,140 @@
+# backup_store.py
+
+import os
+import gzip
+import json
+import shutil
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+CHUNK_SIZE = 1024 * 1024
+MANIFEST_FILE = 'manifest.json'
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Content-addressed backups: each distinct file is stored once, gzip-compressed, under its SHA-256.
+# A dated snapshot is only a manifest entry mapping file names to digests, so unchanged files cost nothing.
+class BackupStore:
+    def __init__(self, root: str, workers: int = 4):
+        self.root = root
+        self.blob_dir = os.path.join(root, 'blobs')
+        self.manifest_file = os.path.join(root, MANIFEST_FILE)
+        self.workers = workers
+        self.lock = threading.Lock()
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self) -> dict:
+        if not os.path.exists(self.manifest_file):
+            return {'snapshots': {}, 'blobs': {}}
+        with open(self.manifest_file) as f:
+            return json.load(f)
+
+    def _save_manifest(self):
+        tmp_file = f"{self.manifest_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_file, self.manifest_file)
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.blob_dir, digest[:2], f"{digest}.gz")
+
+    # Hash once; compress and write the blob only if this content has never been stored
+    def _store_file(self, path: str) -> dict:
+        digest = hash_file(path)
+        size = os.path.getsize(path)
+        with self.lock:
+            known = digest in self.manifest['blobs']
+        if known:
+            return {'digest': digest, 'size': size, 'new': False}
+
+        blob_path = self._blob_path(digest)
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        tmp_path = f"{blob_path}.{threading.get_ident()}.tmp"
+        with open(path, 'rb') as src, gzip.open(tmp_path, 'wb') as dst:
+            shutil.copyfileobj(src, dst, CHUNK_SIZE)
+        os.replace(tmp_path, blob_path)
+        with self.lock:
+            self.manifest['blobs'][digest] = {'size': size, 'stored_size': os.path.getsize(blob_path)}
+        return {'digest': digest, 'size': size, 'new': True}
+
+    # Snapshot files (directories are walked) under a label, by default today's date
+    def snapshot(self, paths, label: str = None) -> dict:
+        label = label or datetime.now().strftime('%Y-%m-%d')
+        files = []
+        for path in paths:
+            if os.path.isdir(path):
+                for root, _, names in os.walk(path):
+                    files.extend(os.path.join(root, name) for name in sorted(names) if not name.endswith('.tmp'))
+            elif os.path.isfile(path):
+                files.append(path)
+            else:
+                logging.warning("File not found, skipping backup: %s", path)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            stored = dict(zip(files, executor.map(self._store_file, files)))
+
+        entry = {os.path.normpath(path).replace(os.sep, '/'): {'digest': info['digest'], 'size': info['size']}
+                 for path, info in stored.items()}
+        with self.lock:
+            self.manifest['snapshots'][label] = {
+                'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'files': entry,
+            }
+            self._save_manifest()
+
+        new_bytes = sum(self.manifest['blobs'][info['digest']]['stored_size'] for info in stored.values() if info['new'])
+        logging.info("Backup snapshot '%s': %d file(s), %d new blob(s), %d bytes written",
+                     label, len(stored), sum(info['new'] for info in stored.values()), new_bytes)
+        return entry
+
+    def list_snapshots(self) -> list:
+        return sorted(self.manifest['snapshots'])
+
+    # Write every file of a snapshot back out under dest_dir, keeping relative paths
+    def restore(self, label: str, dest_dir: str) -> list:
+        snapshot = self.manifest['snapshots'].get(label)
+        if snapshot is None:
+            raise KeyError(f"No backup snapshot '{label}'. Available: {self.list_snapshots()}")
+
+        def restore_file(item):
+            name, info = item
+            target = os.path.join(dest_dir, *name.split('/'))
+            os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+            with gzip.open(self._blob_path(info['digest']), 'rb') as src, open(target, 'wb') as dst:
+                shutil.copyfileobj(src, dst, CHUNK_SIZE)
+            return target
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            restored = list(executor.map(restore_file, snapshot['files'].items()))
+        logging.info("Restored backup snapshot '%s' to %s", label, dest_dir)
+        return restored
+
+    # Retention from the manifest alone: drop old snapshots, then blobs no snapshot references
+    def prune(self, days: int = 30) -> int:
+        cutoff = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+        with self.lock:
+            snapshots = self.manifest['snapshots']
+            for label in [label for label, snap in snapshots.items() if snap['created_at'] < cutoff]:
+                del snapshots[label]
+                logging.info("Removed old backup snapshot: %s", label)
+
+            referenced = {info['digest'] for snap in snapshots.values() for info in snap['files'].values()}
+            orphans = [digest for digest in self.manifest['blobs'] if digest not in referenced]
+            for digest in orphans:
+                del self.manifest['blobs'][digest]
+                blob_path = self._blob_path(digest)
+                if os.path.exists(blob_path):
+                    os.remove(blob_path)
+            self._save_manifest()
+        return len(orphans)
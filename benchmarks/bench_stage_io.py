@@ -0,0 +1,93 @@
+# bench_stage_io.py
+#
+# Stage hand-off I/O: the old xlsx round-trips versus the Arrow stage store.
+# Each case writes then reads the tracked workbooks in a fresh process.
+# Usage: python benchmarks/bench_stage_io.py [--scale N] [--repeat N]
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import multiprocessing
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pandas as pd  # noqa: E402
+import stage_store  # noqa: E402
+
+
+# Stats sheets replicated `scale` times to model more tracked stats, plus the matchup output
+def load_inputs(scale):
+    stats = pd.read_excel(os.path.join(ROOT, 'nfl_stats.xlsx'), sheet_name=None)
+    stats = {f"{name[:27]}_{i}": df for i in range(scale) for name, df in stats.items()}
+    output = pd.read_excel(os.path.join(ROOT, 'nfl_output.xlsx'))
+    return stats, output
+
+
+def xlsx_round_trip(stats, output, workdir):
+    stats_file = os.path.join(workdir, 'nfl_stats.xlsx')
+    output_file = os.path.join(workdir, 'nfl_output.xlsx')
+    with pd.ExcelWriter(stats_file, engine='xlsxwriter') as writer:
+        for name, df in stats.items():
+            df.to_excel(writer, sheet_name=name, index=False)
+    pd.read_excel(stats_file, sheet_name=None)
+    output.to_excel(output_file, index=False)
+    pd.read_excel(output_file)  # write_to_gsheets
+    pd.read_excel(output_file)  # create_backups
+
+
+def arrow_round_trip(stats, output, workdir):
+    stage_store.STAGE_DIR = workdir
+    stage_store.write_stage('nfl_stats', stats)
+    stage_store.read_stage('nfl_stats')
+    stage_store.write_stage('nfl_output', output)
+    stage_store.read_stage('nfl_output')
+    stage_store.read_stage('nfl_output')
+
+
+CASES = {'xlsx': xlsx_round_trip, 'arrow': arrow_round_trip}
+
+
+# Runs in a fresh process so RSS growth belongs to this case alone
+def measure(case, scale, repeat):
+    import psutil
+
+    stats, output = load_inputs(scale)
+    process = psutil.Process()
+    rss_before = process.memory_info().rss
+    timings = []
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as workdir:
+            start = time.perf_counter()
+            CASES[case](stats, output, workdir)
+            timings.append(time.perf_counter() - start)
+    timings.sort()
+
+    return {
+        'case': case,
+        'sheets': len(stats),
+        'median_ms': timings[len(timings) // 2] * 1000,
+        'min_ms': timings[0] * 1000,
+        'rss_growth_kib': max(process.memory_info().rss - rss_before, 0) / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark stage hand-off I/O: xlsx versus Arrow stage store.")
+    parser.add_argument('--scale', type=int, default=1, help="replicate the stats workbook N times")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context('spawn')
+    with ctx.Pool(1, maxtasksperchild=1) as pool:
+        results = [pool.apply(measure, (case, args.scale, args.repeat)) for case in CASES]
+
+    print(f"{'case':<8} {'sheets':>7} {'median ms':>10} {'min ms':>9} {'RSS +KiB':>10}")
+    for r in results:
+        print(f"{r['case']:<8} {r['sheets']:>7} {r['median_ms']:>10.1f} {r['min_ms']:>9.1f} {r['rss_growth_kib']:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# bench_table_extract.py
+#
+# Per-page parse time and peak memory of each table_extractor backend on the saved fixtures.
+# Usage: python benchmarks/bench_table_extract.py [--repeat N] [--backend NAME ...]
+
+import os
+import sys
+import glob
+import time
+import argparse
+import tracemalloc
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import table_extractor  # noqa: E402
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def fixture_attrs(path):
+    # Schedule pages are matched by class, stat pages take the first table like nfl_scrapper does
+    return {'class': 'tr-table'} if os.path.basename(path).startswith('schedule') else None
+
+
+# Runs in a fresh process so RSS growth belongs to this backend alone
+def measure(backend, path, repeat):
+    import psutil
+
+    with open(path, 'rb') as f:
+        content = f.read()
+    attrs = fixture_attrs(path)
+    extract = table_extractor.BACKENDS[backend]
+    process = psutil.Process()
+
+    rss_before = process.memory_info().rss
+    tracemalloc.start()
+    extract(content, attrs)
+    _, py_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_growth = process.memory_info().rss - rss_before
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        extract(content, attrs)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+
+    return {
+        'backend': backend,
+        'fixture': os.path.basename(path),
+        'median_ms': timings[len(timings) // 2] * 1000,
+        'min_ms': timings[0] * 1000,
+        'py_peak_kib': py_peak / 1024,
+        'rss_growth_kib': max(rss_growth, 0) / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark table extraction backends on saved HTML fixtures.")
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--backend', action='append', choices=sorted(table_extractor.BACKENDS))
+    args = parser.parse_args()
+
+    backends = args.backend or [b for b in table_extractor.BACKENDS if b != 'lxml' or table_extractor.lxml]
+    fixtures = sorted(glob.glob(os.path.join(FIXTURES_DIR, '*.html')))
+
+    ctx = multiprocessing.get_context('spawn')
+    results = []
+    with ctx.Pool(1, maxtasksperchild=1) as pool:
+        for path in fixtures:
+            for backend in backends:
+                results.append(pool.apply(measure, (backend, path, args.repeat)))
+
+    print(f"{'fixture':<40} {'backend':<10} {'median ms':>10} {'min ms':>8} {'py peak KiB':>12} {'RSS +KiB':>10}")
+    for r in results:
+        print(f"{r['fixture']:<40} {r['backend']:<10} {r['median_ms']:>10.2f} {r['min_ms']:>8.2f} "
+              f"{r['py_peak_kib']:>12.0f} {r['rss_growth_kib']:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
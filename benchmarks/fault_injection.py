@@ -0,0 +1,202 @@
+# fault_injection.py
+#
+# Local stand-in for teamrankings that serves the saved HTML corpus with injected latency and errors,
+# and a set of scenarios that run the stat scraper against it: a healthy site, transient 5xx answers,
+# a slow tail, hung connections and a site that is down. Each scenario runs nfl_scrapper.scrape_all in
+# a fresh process (fetch settings come from its environment) inside a scratch directory and is checked
+# for sheets retrieved, retries, hedges and wall time. Exits 1 when a scenario misses its expectations.
+# Usage: python benchmarks/fault_injection.py [--scenario NAME ...] [--serve --latency 2 --error-rate 0.3]
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+import subprocess
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+FIXTURES_DIR = os.path.join(BENCH_DIR, 'fixtures')
+
+# Fault settings per scenario, fetch settings (environment of the scraper process) and expectations
+SCENARIOS = {
+    'healthy': {
+        'faults': {},
+        'env': {},
+        'expect': {'sheets': 10, 'max_wall_s': 5},
+    },
+    'transient_5xx': {
+        'faults': {'error_rate': 0.4},
+        'env': {'NFL_FETCH_BACKOFF': '0.05'},
+        'expect': {'sheets': 10, 'min_retries': 1, 'max_wall_s': 10},
+    },
+    'slow_tail': {
+        'faults': {'slow_rate': 0.3, 'slow_s': 3},
+        'env': {'NFL_HEDGE_AFTER': '0.3', 'NFL_READ_TIMEOUT': '10'},
+        'expect': {'sheets': 10, 'min_hedges': 1, 'max_wall_s': 4},
+    },
+    'hung': {
+        'faults': {'hang_rate': 1.0},
+        'env': {'NFL_READ_TIMEOUT': '1', 'NFL_STAGE_DEADLINE': '4', 'NFL_FETCH_BACKOFF': '0.1'},
+        'expect': {'sheets': 0, 'max_wall_s': 8},
+    },
+    'down': {
+        'faults': {'error_rate': 1.0},
+        'env': {'NFL_FETCH_BACKOFF': '0.05', 'NFL_BREAKER_FAILURES': '5'},
+        'expect': {'sheets': 0, 'breaker': 'open', 'max_wall_s': 5},
+    },
+}
+
+
+# Serves /nfl/stat/<name> and /nfl/schedules/season/ from the corpus, after the configured faults
+class FaultyHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    faults = {}
+    rng = random.Random(0)
+    lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def roll(self, key):
+        rate = self.faults.get(key, 0)
+        if rate <= 0:
+            return False
+        with self.lock:
+            return self.rng.random() < rate
+
+    def do_GET(self):
+        path = self.path.split('?')[0].rstrip('/')
+        if path.startswith('/nfl/stat/'):
+            file_name = f"stat_{path.rsplit('/', 1)[-1]}.html"
+        elif path == '/nfl/schedules/season':
+            file_name = 'schedule_season.html'
+        else:
+            file_name = None
+
+        time.sleep(self.faults.get('latency', 0))
+        if self.roll('hang_rate'):
+            time.sleep(self.faults.get('hang_s', 60))
+            return
+        if self.roll('slow_rate'):
+            time.sleep(self.faults.get('slow_s', 3))
+        if self.roll('error_rate'):
+            return self.reply(503, b'Service Unavailable')
+
+        file_path = os.path.join(FIXTURES_DIR, file_name) if file_name else None
+        if file_path is None or not os.path.exists(file_path):
+            return self.reply(404, b'Not Found')
+        with open(file_path, 'rb') as f:
+            self.reply(200, f.read())
+
+    def reply(self, status, body):
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_server(port=0):
+    server = ThreadingHTTPServer(('127.0.0.1', port), FaultyHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def local_urls(port):
+    sys.path.insert(0, ROOT)
+    import nfl_scrapper
+
+    return [url.replace('https://www.teamrankings.com', f'http://127.0.0.1:{port}') for url in nfl_scrapper.STAT_URLS]
+
+
+# Child process: scrape every stat page from the stand-in and print what happened as JSON
+def run_scenario_child(port):
+    sys.path.insert(0, ROOT)
+    import fetch_utils
+    import nfl_scrapper
+    from instrumentation import span
+
+    start = time.perf_counter()
+    with span('fault_scenario', 'stage') as current:
+        dfs = nfl_scrapper.scrape_all(local_urls(port))
+    print(json.dumps({
+        'sheets': len(dfs),
+        'wall_s': round(time.perf_counter() - start, 2),
+        'requests': current.counts['http_requests'],
+        'retries': current.counts['http_retries'],
+        'hedges': current.counts['http_hedges'],
+        'breaker': 'open' if 'open' in fetch_utils.get_circuit_breaker().state().values() else 'closed',
+    }))
+
+
+def run_scenario(name, port):
+    scenario = SCENARIOS[name]
+    FaultyHandler.faults = scenario['faults']
+    FaultyHandler.rng = random.Random(0)
+    env = dict(os.environ, NFL_SCRAPE_RATE='100', NFL_SCRAPE_BURST='10', NFL_HTTP_CACHE_DIR='.http_cache',
+               NFL_LOG_LEVEL=os.getenv('NFL_LOG_LEVEL', 'CRITICAL'), **scenario['env'])
+    with tempfile.TemporaryDirectory() as scratch:
+        result = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', str(port)], cwd=scratch,
+                                env=env, capture_output=True, text=True, timeout=120)
+    lines = [line for line in result.stdout.splitlines() if line.startswith('{')]
+    if result.returncode != 0 or not lines:
+        return {'error': result.stderr.strip().splitlines()[-1:] or ['no output']}, False
+    outcome = json.loads(lines[-1])
+
+    expect = scenario['expect']
+    passed = (outcome['sheets'] == expect['sheets']
+              and outcome['wall_s'] <= expect['max_wall_s']
+              and outcome['retries'] >= expect.get('min_retries', 0)
+              and outcome['hedges'] >= expect.get('min_hedges', 0)
+              and outcome['breaker'] == expect.get('breaker', outcome['breaker']))
+    return outcome, passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the scraper against a local stand-in that injects faults.")
+    parser.add_argument('--scenario', nargs='*', choices=sorted(SCENARIOS), help="default: all")
+    parser.add_argument('--serve', action='store_true', help="only run the stand-in, with the faults below")
+    parser.add_argument('--port', type=int, default=0)
+    parser.add_argument('--latency', type=float, default=0, help="seconds added to every response")
+    parser.add_argument('--error-rate', type=float, default=0, help="share of 503 answers")
+    parser.add_argument('--hang-rate', type=float, default=0, help="share of requests that never answer")
+    parser.add_argument('--child', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_scenario_child(args.child)
+        return 0
+
+    if args.serve:
+        FaultyHandler.faults = {'latency': args.latency, 'error_rate': args.error_rate, 'hang_rate': args.hang_rate}
+        server = start_server(args.port or 8766)
+        print(f"Serving the corpus on http://127.0.0.1:{server.server_port}/nfl/stat/<name> with {FaultyHandler.faults}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
+        return 0
+
+    server = start_server(args.port)
+    failed = 0
+    print(f"{'scenario':<16}{'sheets':>7}{'wall':>8}{'requests':>10}{'retries':>9}{'hedges':>8}  breaker")
+    for name in args.scenario or SCENARIOS:
+        outcome, passed = run_scenario(name, server.server_port)
+        failed += not passed
+        if 'error' in outcome:
+            print(f"{name:<16} ERROR {outcome['error']}")
+            continue
+        print(f"{name:<16}{outcome['sheets']:>7}{outcome['wall_s']:>7.1f}s{outcome['requests']:>10}"
+              f"{outcome['retries']:>9}{outcome['hedges']:>8}  {outcome['breaker']:<8}{'' if passed else ' FAILED'}")
+    server.shutdown()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+# load_test_query_service.py
+#
+# Load test for a running query_service.py: keep-alive connections issue a mix of team, matchup,
+# leaderboard and history requests for a fixed time, then p50/p99 latency and requests/sec are reported.
+# Usage: python benchmarks/load_test_query_service.py [--port 8788] [--concurrency 32] [--duration 10]
+
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from urllib.parse import quote
+
+LEADERBOARDS = ['composite', 'points-per-game', 'opponent-points-per-game', 'turnover-margin-per-game']
+
+
+async def get(reader, writer, host, path):
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode('latin-1'))
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        key, _, value = line.decode('latin-1').partition(':')
+        if key.lower() == 'content-length':
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+
+def request_mix(teams, seed=0):
+    rng = random.Random(seed)
+    paths = []
+    for _ in range(2000):
+        kind = rng.random()
+        team1, team2 = rng.sample(teams, 2)
+        if kind < 0.4:
+            paths.append(f"/matchup?team1={quote(team1)}&team2={quote(team2)}")
+        elif kind < 0.7:
+            paths.append(f"/teams/{quote(team1)}")
+        elif kind < 0.9:
+            paths.append(f"/leaderboard/{rng.choice(LEADERBOARDS)}?limit={rng.choice([5, 10, 32])}")
+        else:
+            paths.append(f"/history/{quote(team1)}")
+    return paths
+
+
+async def worker(host, port, paths, deadline, latencies, errors, seed):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            status, _ = await get(reader, writer, host, rng.choice(paths))
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def run(host, port, concurrency, duration):
+    reader, writer = await asyncio.open_connection(host, port)
+    status, body = await get(reader, writer, host, '/teams')
+    writer.close()
+    if status != 200:
+        raise SystemExit(f"/teams returned {status}: {body.decode()}")
+    paths = request_mix(json.loads(body)['teams'])
+
+    latencies, errors = [], []
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(worker(host, port, paths, deadline, latencies, errors, seed)
+                           for seed in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+
+def percentile(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, int(p / 100 * len(sorted_values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test a local query_service.py instance.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8788)
+    parser.add_argument('--concurrency', type=int, default=32, help="keep-alive connections")
+    parser.add_argument('--duration', type=float, default=10, help="seconds")
+    args = parser.parse_args()
+
+    latencies, errors, elapsed = asyncio.run(run(args.host, args.port, args.concurrency, args.duration))
+    latencies.sort()
+    print(f"{len(latencies)} requests in {elapsed:.1f}s over {args.concurrency} connections, {len(errors)} errors")
+    print(f"requests/sec  {len(latencies) / elapsed:10.0f}")
+    print(f"p50           {percentile(latencies, 50) * 1000:10.2f} ms")
+    print(f"p99           {percentile(latencies, 99) * 1000:10.2f} ms")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,354 @@
+# run_benchmarks.py
+#
+# Offline benchmark suite for the pipeline hot paths on synthetic data and the saved HTML corpus.
+# Each case runs in a fresh process inside a scratch directory; setup is not timed.
+# Results go to benchmarks/results/<scale>.json and are checked against thresholds.json and,
+# when present, the baseline saved with --save-baseline. Exits 1 on a regression.
+# Usage: python benchmarks/run_benchmarks.py [--scale small|medium|large] [--case NAME ...] [--repeat N]
+#                                            [--teams N] [--sheets N] [--log-rows N] [--save-baseline]
+
+import io
+import os
+import sys
+import json
+import glob
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import multiprocessing
+from contextlib import redirect_stdout
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+FIXTURES_DIR = os.path.join(BENCH_DIR, 'fixtures')
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+THRESHOLDS_FILE = os.path.join(BENCH_DIR, 'thresholds.json')
+
+SCALES = {
+    'small': {'teams': 32, 'sheets': 10, 'log_rows': 1000},
+    'medium': {'teams': 320, 'sheets': 50, 'log_rows': 10000},
+    'large': {'teams': 2000, 'sheets': 200, 'log_rows': 100000},
+}
+
+
+# Serves saved pages in place of requests.Session.get
+class FixtureSession:
+    def __init__(self, pages):
+        self.pages = pages
+
+    def get(self, url, headers=None, timeout=None, **kwargs):
+        import requests
+
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response._content = self.pages[url]
+        return response
+
+    def mount(self, prefix, adapter):
+        pass  # get_session() resizes the connection pool; there are no connections here
+
+
+def _fixture_pages(pattern):
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, pattern))):
+        name = os.path.basename(path)[:-len('.html')]
+        with open(path, 'rb') as f:
+            pages[f"https://fixtures.local/nfl/{name}"] = f.read()
+    return pages
+
+
+def _unlimited():
+    from fetch_utils import HostRateLimiter
+    return HostRateLimiter(rate=1e9, burst=10 ** 9)
+
+
+def _stats_and_schedule(params):
+    import synthetic
+
+    registry = synthetic.synthetic_registry(params['teams'])
+    stats = synthetic.synthetic_stats(registry, params['sheets'])
+    return registry, stats, synthetic.synthetic_schedule(registry)
+
+
+# Each case: setup(params, workdir) -> state, run(state) is what gets timed
+def setup_scrape_to_df(params, workdir):
+    return {'pages': _fixture_pages('stat_*.html'), 'workdir': workdir, 'round': 0}
+
+
+def run_scrape_to_df(state):
+    import nfl_scrapper
+    from http_cache import HttpCache
+
+    # A fresh cache every round, so each page is parsed rather than served from a snapshot
+    state['round'] += 1
+    cache = HttpCache(os.path.join(state['workdir'], f"cache_{state['round']}"))
+    session, limiter = FixtureSession(state['pages']), _unlimited()
+    for url in state['pages']:
+        df, _ = nfl_scrapper.scrape_to_df(url, session, limiter, cache)
+        assert df is not None, url
+
+
+def setup_scrape_schedule(params, workdir):
+    import fetch_utils
+
+    pages = _fixture_pages('schedule_*.html')
+    fetch_utils._session = FixtureSession(pages)
+    fetch_utils._default_limiter = _unlimited()
+    return {'url': next(iter(pages)), 'workdir': workdir, 'round': 0}
+
+
+def run_scrape_schedule(state):
+    import schedule_scrapper
+    from http_cache import HttpCache
+
+    state['round'] += 1
+    cache = HttpCache(os.path.join(state['workdir'], f"cache_{state['round']}"))
+    assert schedule_scrapper.scrape_current_week_schedule(state['url'], cache) is not None
+
+
+def setup_build_matchup_stats(params, workdir):
+    registry, stats, schedule = _stats_and_schedule(params)
+    return {'registry': registry, 'stats': stats, 'schedule': schedule}
+
+
+def run_build_matchup_stats(state):
+    import matchup_stats
+
+    final_df = matchup_stats.build_matchup_stats(state['schedule'], state['stats'], state['registry'])
+    assert not final_df.empty
+
+
+# Build the all-pairs matrix, then score every scheduled matchup and every pair in the league
+def run_matchup_matrix(state):
+    import matchup_stats
+
+    matrix = matchup_stats.build_matchup_matrix(state['stats'], state['registry'])
+    assert not matrix.matchup_frame(state['schedule']['Team1 ID'], state['schedule']['Team2 ID']).empty
+    assert not matrix.all_pairs_frame().empty
+
+
+def setup_save_dfs_to_excel(params, workdir):
+    _, stats, _ = _stats_and_schedule(params)
+    return {'dfs': [(df, name) for name, df in stats.items()], 'file': os.path.join(workdir, 'nfl_stats.xlsx')}
+
+
+def run_save_dfs_to_excel(state):
+    import nfl_scrapper
+
+    nfl_scrapper.save_dfs_to_excel(state['dfs'], state['file'])
+
+
+def setup_load_nfl_stats(params, workdir):
+    import nfl_scrapper
+    import stage_store
+
+    state = setup_save_dfs_to_excel(params, workdir)
+    nfl_scrapper.save_dfs_to_excel(state['dfs'], state['file'])
+    stage_store.STAGE_DIR = os.path.join(workdir, 'stage_store')  # empty: load from the workbook
+    return state
+
+
+def run_load_nfl_stats(state):
+    import matchup_stats
+
+    assert matchup_stats.load_nfl_stats(state['file'])
+
+
+def setup_load_nfl_stats_stage(params, workdir):
+    import stage_store
+
+    state = setup_load_nfl_stats(params, workdir)
+    stage_store.write_stage('nfl_stats', {name: df for df, name in state['dfs']})
+    return state
+
+
+def setup_backup(params, workdir):
+    import stage_store
+
+    state = setup_load_nfl_stats_stage(params, workdir)
+    state['paths'] = [state['file'], stage_store.STAGE_DIR]
+    state['workdir'] = workdir
+    state['round'] = 0
+    return state
+
+
+# Cold snapshot into an empty store: every file hashed, compressed and written
+def run_backup_snapshot(state):
+    from backup_store import BackupStore
+
+    state['round'] += 1
+    store = BackupStore(os.path.join(state['workdir'], f"store_{state['round']}"))
+    store.snapshot(state['paths'], label='bench')
+
+
+def setup_backup_warm(params, workdir):
+    from backup_store import BackupStore
+
+    state = setup_backup(params, workdir)
+    state['store'] = BackupStore(os.path.join(workdir, 'store'))
+    state['store'].snapshot(state['paths'], label='seed')
+    return state
+
+
+# Warm snapshot: nothing changed, so only hashing and the manifest write
+def run_backup_snapshot_warm(state):
+    state['round'] += 1
+    state['store'].snapshot(state['paths'], label=f"bench_{state['round']}")
+
+
+def setup_dashboard_render(params, workdir):
+    import synthetic
+    from run_log_mirror import RunLogMirror
+
+    shutil.copy(os.path.join(ROOT, 'dashboard_template.html'), workdir)
+    mirror = RunLogMirror(os.path.join(workdir, 'run_log.db'))
+    mirror.add_rows(synthetic.synthetic_run_log(params['log_rows']), 1)
+    return {'mirror': mirror}
+
+
+def run_dashboard_render(state):
+    import generate_html_dashboard
+
+    pipelines, logs, totals = generate_html_dashboard.prepare_data(state['mirror'])
+    generate_html_dashboard.render_html(pipelines, logs, totals)
+
+
+CASES = {
+    'scrape_to_df': (setup_scrape_to_df, run_scrape_to_df),
+    'scrape_schedule': (setup_scrape_schedule, run_scrape_schedule),
+    'build_matchup_stats': (setup_build_matchup_stats, run_build_matchup_stats),
+    'matchup_matrix': (setup_build_matchup_stats, run_matchup_matrix),
+    'save_dfs_to_excel': (setup_save_dfs_to_excel, run_save_dfs_to_excel),
+    'load_nfl_stats': (setup_load_nfl_stats, run_load_nfl_stats),
+    'load_nfl_stats_stage': (setup_load_nfl_stats_stage, run_load_nfl_stats),
+    'backup_snapshot': (setup_backup, run_backup_snapshot),
+    'backup_snapshot_warm': (setup_backup_warm, run_backup_snapshot_warm),
+    'dashboard_render': (setup_dashboard_render, run_dashboard_render),
+}
+
+
+# Runs in a fresh process and scratch directory so logs, caches and RSS growth belong to this case alone
+def measure(case, params, repeat):
+    import psutil
+
+    setup, run = CASES[case]
+    with tempfile.TemporaryDirectory() as workdir, redirect_stdout(io.StringIO()):
+        os.chdir(workdir)
+        state = setup(params, workdir)
+        process = psutil.Process()
+        rss_before = process.memory_info().rss
+        run(state)  # warm-up: imports, first-call caches
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run(state)
+            timings.append(time.perf_counter() - start)
+        rss_growth = process.memory_info().rss - rss_before
+        os.chdir(ROOT)
+    timings.sort()
+    return {
+        'median_ms': round(timings[len(timings) // 2] * 1000, 3),
+        'min_ms': round(timings[0] * 1000, 3),
+        'repeat': repeat,
+        'rss_growth_kib': round(max(rss_growth, 0) / 1024),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _load_json(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+# A case regresses when it is slower than its absolute limit for this scale, or slower than the
+# baseline by more than its allowed ratio. Baselines only count when taken with the same parameters.
+def check_regressions(report, thresholds, baseline):
+    regressions = []
+    default_ratio = thresholds.get('max_ratio', 1.25)
+    for case, result in report['results'].items():
+        limits = thresholds.get('cases', {}).get(case, {})
+        max_ms = limits.get('max_ms', {}).get(report['scale'])
+        if max_ms is not None and result['median_ms'] > max_ms:
+            regressions.append(f"{case}: {result['median_ms']:.1f}ms exceeds limit {max_ms}ms")
+        if baseline and baseline['params'] == report['params'] and case in baseline['results']:
+            base_ms = baseline['results'][case]['median_ms']
+            ratio = result['median_ms'] / base_ms if base_ms else 1.0
+            max_ratio = limits.get('max_ratio', default_ratio)
+            result['baseline_ratio'] = round(ratio, 3)
+            if ratio > max_ratio:
+                regressions.append(f"{case}: {ratio:.2f}x baseline ({base_ms:.1f}ms), allowed {max_ratio}x")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks of the pipeline hot paths.")
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--case', action='append', choices=sorted(CASES))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--teams', type=int, help="override the number of teams for this scale")
+    parser.add_argument('--sheets', type=int, help="override the number of stat sheets for this scale")
+    parser.add_argument('--log-rows', type=int, help="override the number of run-log rows for this scale")
+    parser.add_argument('--output', help="results file (default benchmarks/results/<scale>.json)")
+    parser.add_argument('--baseline', help="baseline file (default benchmarks/results/baseline_<scale>.json)")
+    parser.add_argument('--save-baseline', action='store_true', help="store these results as the new baseline")
+    args = parser.parse_args()
+
+    params = dict(SCALES[args.scale])
+    for key in params:
+        if getattr(args, key) is not None:
+            params[key] = getattr(args, key)
+    cases = args.case or list(CASES)
+
+    ctx = multiprocessing.get_context('spawn')
+    results = {}
+    with ctx.Pool(1, maxtasksperchild=1) as pool:
+        for case in cases:
+            results[case] = pool.apply(measure, (case, params, args.repeat))
+            print(f"{case:<24} {results[case]['median_ms']:>10.1f} ms (min {results[case]['min_ms']:.1f})")
+
+    report = {
+        'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'scale': args.scale,
+        'params': params,
+        'results': results,
+    }
+    baseline_file = args.baseline or os.path.join(RESULTS_DIR, f"baseline_{args.scale}.json")
+    report['regressions'] = check_regressions(report, _load_json(THRESHOLDS_FILE) or {}, _load_json(baseline_file))
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    output_file = args.output or os.path.join(RESULTS_DIR, f"{args.scale}.json")
+    with open(output_file, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output_file}")
+    if args.save_baseline:
+        with open(baseline_file, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {baseline_file}")
+
+    for regression in report['regressions']:
+        print(f"REGRESSION {regression}")
+    sys.exit(1 if report['regressions'] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+# synthetic.py
+#
+# Synthetic NFL-shaped data for offline benchmarks: a team registry of any size, stat sheets and a
+# schedule shaped like the scraper output, run-log rows, and HTML pages in teamrankings' markup.
+# Usage: python benchmarks/synthetic.py --write-corpus   # regenerate benchmarks/fixtures from the tracked xlsx
+#                                                        # and the saved schedule page
+
+import os
+import sys
+import html
+import argparse
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from team_registry import TeamRegistry, NFL_TEAMS  # noqa: E402
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+STAT_COLUMNS = ['Rank', 'Team', '2024', 'Last 3', 'Last 1', 'Home', 'Away', '2023']
+# <main> of the real season schedule page, saved from teamrankings
+SAVED_SCHEDULE_PAGE = os.path.join(ROOT, 'html nfl example.txt')
+NAV_LINKS = 900  # real pages carry a large menu before and after the table
+
+
+# The real 32 teams, or `n_teams` made-up ones with unambiguous names and aliases
+def synthetic_registry(n_teams: int = 32) -> TeamRegistry:
+    if n_teams == len(NFL_TEAMS):
+        return TeamRegistry(NFL_TEAMS)
+    teams = [(f"Team {i:04d}", [f"T{i:04d}"], f"City {i:04d}", f"Nick{i:04d}", []) for i in range(n_teams)]
+    return TeamRegistry(teams)
+
+
+# One stat sheet per name, typed like scrape_to_df produces (Int16 ranks, float32 values), plus the Team ID column
+def synthetic_stats(registry: TeamRegistry, n_sheets: int = 10, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    n_teams = len(registry)
+    sheets = {}
+    for s in range(n_sheets):
+        values = rng.normal(20, 6, size=(n_teams, 6)).round(1)
+        order = np.argsort(-values[:, 0], kind='stable')
+        df = pd.DataFrame(values[order].astype(np.float32), columns=STAT_COLUMNS[2:])
+        df.insert(0, 'Team', [registry.names[i] for i in order])
+        df.insert(0, 'Rank', pd.array(np.arange(1, n_teams + 1), dtype='Int16'))
+        df['Team ID'] = registry.team_ids(df['Team'])
+        sheets[f"df_stat_{s:03d}"[:31]] = df
+    return sheets
+
+
+# Every team plays once (an odd team out sits), with the matchup-id columns the scraper adds
+def synthetic_schedule(registry: TeamRegistry, n_games: int = None, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(registry))
+    n_games = n_games or len(order) // 2
+    away = order[0::2][:n_games]
+    home = order[1::2][:n_games]
+    df = pd.DataFrame({
+        'Teams': [f"{registry.names[a]}  @  {registry.names[h]}" for a, h in zip(away, home)],
+        'Time': ['1:00 PM'] * len(away),
+        'Location': [f"Stadium {h}" for h in home],
+    })
+    df['Team1 ID'], df['Team2 ID'], _ = registry.matchup_team_ids(df['Teams'])
+    return df
+
+
+# Run_Log worksheet rows (Pipeline Name, Run Date, Run Status, Duration, Error Message, Stage Summary)
+def synthetic_run_log(n_rows: int = 1000, n_pipelines: int = 3, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp('2024-01-01')
+    rows = []
+    for i in range(n_rows):
+        failed = rng.random() < 0.1
+        rows.append([
+            f"Pipeline {i % n_pipelines}",
+            (start + pd.Timedelta(hours=i)).strftime('%Y-%m-%d %H:%M:%S'),
+            'Failed' if failed else 'Success',
+            str(round(float(rng.uniform(5, 60)), 2)),
+            'matchup_stats: synthetic failure' if failed else '',
+            'nfl_scrapper 4.0s cpu 0.5s rss 150MB; matchup_stats 0.3s cpu 0.3s rss 160MB',
+        ])
+    return rows
+
+
+def _page(title: str, table: str) -> str:
+    nav = ''.join(f'<li class="menu-item"><a href="/nfl/stat/link-{i}">Stat link {i}</a></li>'
+                  for i in range(NAV_LINKS))
+    return f'''<!DOCTYPE html>
+<html lang="en">
+<head><meta charset="utf-8"><title>{title}</title>
+<script>window.dataLayer = window.dataLayer || [];</script></head>
+<body>
+<header><nav><ul class="menu">{nav}</ul></nav></header>
+<main>
+<h1>{title}</h1>
+{table}
+</main>
+<footer><ul>{nav}</ul></footer>
+</body>
+</html>
+'''
+
+
+# A stat page as teamrankings serves it; the scraper reads the first table
+def stat_page_html(df: pd.DataFrame, name: str) -> str:
+    columns = [c for c in STAT_COLUMNS if c in df.columns]
+    head = ''.join(f'<th class="text-right">{html.escape(c)}</th>' for c in columns)
+    body = ''.join(
+        '<tr>' + ''.join(
+            f'<td class="text-right" data-sort="{html.escape(str(row[c]))}">'
+            + (f'<a href="/nfl/team/x">{html.escape(str(row[c]))}</a>' if c == 'Team' else html.escape(str(row[c])))
+            + '</td>' for c in columns) + '</tr>\n'
+        for _, row in df.iterrows())
+    table = f'<table class="tr-table datatable scrollable"><thead><tr>{head}</tr></thead><tbody>\n{body}</tbody></table>'
+    return _page(f'NFL Team {name} Stats', table)
+
+
+# The season schedule page from the saved teamrankings markup: a "Week N" heading above each week's
+# table, whose header rows are game days; the current-week scraper reads the first table
+def schedule_page_html(saved_page: str = SAVED_SCHEDULE_PAGE) -> str:
+    with open(saved_page, encoding='utf-8') as f:
+        markup = f.read().strip()
+    inner = markup[markup.index('>') + 1:markup.rindex('</main>')] if markup.startswith('<main') else markup
+    return _page('NFL Schedule', inner)
+
+
+# Saved pages for both scrapers, one per stat URL, from the tracked workbooks
+def write_corpus(fixtures_dir: str = FIXTURES_DIR):
+    import nfl_scrapper
+
+    os.makedirs(fixtures_dir, exist_ok=True)
+    stats = pd.read_excel(os.path.join(ROOT, 'nfl_stats.xlsx'), sheet_name=None, dtype=str)
+    for url in nfl_scrapper.STAT_URLS:
+        name = url.split('/')[-1]
+        df = stats[f"df_{name.replace('-', '_')}"[:31]]
+        with open(os.path.join(fixtures_dir, f"stat_{name}.html"), 'w') as f:
+            f.write(stat_page_html(df, name))
+    with open(os.path.join(fixtures_dir, 'schedule_season.html'), 'w') as f:
+        f.write(schedule_page_html())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic NFL data for offline benchmarks.")
+    parser.add_argument('--write-corpus', action='store_true', help="regenerate the saved HTML fixtures")
+    args = parser.parse_args()
+    if args.write_corpus:
+        write_corpus()
+        print(f"HTML corpus written to {FIXTURES_DIR}")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
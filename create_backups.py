@@ -1,103 +1,78 @@
 import os
-import shutil
+import argparse
 import logging
-from datetime import datetime
-import time
-import pandas as pd
+from backup_store import BackupStore
+from stage_store import STAGE_DIR
+from pipeline_logging import setup_logging, rotate_log, LOG_ARCHIVE_DIR
 
 # Set up logging
-logging.basicConfig(
-    filename='nfl_pipeline.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-)
+setup_logging()
 
 # Load environment variables if needed
 # load_dotenv()
 
 # Define backup paths
 BACKUP_DIR = "backups"
-RAW_DATA_DIR = os.path.join(BACKUP_DIR, "raw_data")
-PROCESSED_DATA_DIR = os.path.join(BACKUP_DIR, "processed_data")
-FINAL_OUTPUT_DIR = os.path.join(BACKUP_DIR, "final_output")
-LOG_DIR = os.path.join(BACKUP_DIR, "logs")
-MAIN_OUTPUT_FILE = 'nfl_output.xlsx'
-BACKUP_FOLDER = 'backups/final_output/'
-
-# Create backup directories if they don’t exist
-for dir_path in [RAW_DATA_DIR, PROCESSED_DATA_DIR, FINAL_OUTPUT_DIR, LOG_DIR]:
-    os.makedirs(dir_path, exist_ok=True)
-
-
-# Function to backup nfl_output.xlsx with a timestamp
-def backup_nfl_output_with_timestamp():
-    # Ensure the backup directory exists
-    os.makedirs(BACKUP_FOLDER, exist_ok=True)
-
-    # Load the existing nfl_output.xlsx file
-    if os.path.exists(MAIN_OUTPUT_FILE):
-        final_df = pd.read_excel(MAIN_OUTPUT_FILE)
-        current_date = datetime.now().strftime('%Y-%m-%d')
-        backup_filename = f"nfl_output_{current_date}.xlsx"
-        backup_path = os.path.join(BACKUP_FOLDER, backup_filename)
-
-        # Save the DataFrame with a timestamped filename
-        final_df.to_excel(backup_path, index=False)
-        logging.info(f"Backup created: '{backup_path}'")
-        # print(f"Backup created: '{backup_path}'")
-        return backup_path  # Return path for logging if needed
-    else:
-        logging.warning(f"File '{MAIN_OUTPUT_FILE}' does not exist. No backup created.")
-        # print(f"File '{MAIN_OUTPUT_FILE}' does not exist. No backup created.")
-        return None
+STORE_DIR = os.path.join(BACKUP_DIR, "store")
+RESTORE_DIR = os.path.join(BACKUP_DIR, "restored")
+RETENTION_DAYS = int(os.getenv('NFL_BACKUP_RETENTION_DAYS', '30'))
+
+# Define files to back up
+RAW_FILES = ['nfl_stats.xlsx', 'nfl_current_week_schedule.xlsx']  # Add other raw files here
+PROCESSED_FILES = [STAGE_DIR]
+FINAL_FILES = ['nfl_output.xlsx']
+LOG_FILES = [LOG_ARCHIVE_DIR]  # closed, rotated log files; the live log is rotated first
+
 
+def get_backup_store():
+    return BackupStore(STORE_DIR)
 
-def backup_file(source_path, backup_folder):
+
+# Snapshot all pipeline artifacts under today's date; unchanged files are stored only once
+def backup_pipeline_files(store=None):
+    store = store or get_backup_store()
     try:
-        if os.path.exists(source_path):
-            backup_path = os.path.join(backup_folder, os.path.basename(source_path))
-            shutil.copy2(source_path, backup_path)
-            logging.info(f"Backed up {source_path} to {backup_path}")
-        else:
-            logging.warning(f"File not found, skipping backup: {source_path}")
+        rotate_log()
+        return store.snapshot(RAW_FILES + PROCESSED_FILES + FINAL_FILES + LOG_FILES)
     except Exception as e:
-        logging.error(f"Failed to back up {source_path}: {e}")
+        logging.error(f"Failed to create backup snapshot: {e}")
+        return None
+
+
+def clean_old_backups(store=None, days=RETENTION_DAYS):
+    store = store or get_backup_store()
+    removed = store.prune(days)
+    logging.info(f"Backup retention: removed {removed} unreferenced blob(s)")
 
 
-def clean_old_backups(directory, days=30):
-    now = time.time()
-    cutoff = now - (days * 86400)  # 86400 seconds per day
+def restore_backup(label, dest_dir=None):
+    store = get_backup_store()
+    return store.restore(label, dest_dir or os.path.join(RESTORE_DIR, label))
 
-    for filename in os.listdir(directory):
-        file_path = os.path.join(directory, filename)
-        if os.path.isfile(file_path) and os.path.getmtime(file_path) < cutoff:
-            os.remove(file_path)
-            logging.info(f"Removed old backup: {file_path}")
 
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Back up pipeline files, or restore a dated snapshot.")
+    parser.add_argument('--list', action='store_true', help="list backup snapshots")
+    parser.add_argument('--restore', metavar='DATE', help="restore the snapshot taken on DATE (YYYY-MM-DD)")
+    parser.add_argument('--dest', help="directory to restore into (default backups/restored/DATE)")
+    args = parser.parse_args(argv)
 
-def main():
-    # Define files to back up
-    raw_files = ['nfl_stats.xlsx', 'nfl_current_week_schedule.xlsx']  # Add other raw files here
-    # processed_files = ['intermediate_file.xlsx']  # Example, add processed files if any
-    final_files = ["nfl_output.xlsx"]
-    log_files = ['nfl_pipeline.log']
+    store = get_backup_store()
+    if args.list:
+        for label in store.list_snapshots():
+            print(label)
+        return
+    if args.restore:
+        restored = restore_backup(args.restore, args.dest)
+        print(f"Restored {len(restored)} file(s) from {args.restore}")
+        return
 
-    # Back up nfl_output to datestamp
-    backup_path = backup_nfl_output_with_timestamp()
-    if backup_path:
-        print(f"Backup successful: {backup_path}")
+    files = backup_pipeline_files(store)
+    if files is not None:
+        print(f"Backup successful: {len(files)} file(s) in snapshot")
     else:
-        print("Backup failed or file not found.")
-
-    # Back up each type of file
-    for file in raw_files:
-        backup_file(file, RAW_DATA_DIR)
-    # for file in processed_files:
-    #     backup_file(file, PROCESSED_DATA_DIR)
-    for file in final_files:
-        backup_file(file, FINAL_OUTPUT_DIR)
-    for file in log_files:
-        backup_file(file, LOG_DIR)
+        print("Backup failed.")
+    clean_old_backups(store)
 
 
 if __name__ == "__main__":
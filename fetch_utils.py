@@ -0,0 +1,309 @@
+# fetch_utils.py
+
+import os
+import time
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from instrumentation import count
+from pipeline_logging import log_sampled
+from replay_archive import current_archive
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'
+}
+
+# Scrape tuning, overridable from .env: requests per second per host, burst size and worker threads
+SCRAPE_RATE = float(os.getenv('NFL_SCRAPE_RATE', '1.0'))
+SCRAPE_BURST = int(os.getenv('NFL_SCRAPE_BURST', '2'))
+SCRAPE_WORKERS = int(os.getenv('NFL_SCRAPE_WORKERS', '4'))
+
+# Timeouts and retries, in seconds. A stage's fetches share one deadline: retries, backoff and
+# timeouts are cut short once it runs out.
+CONNECT_TIMEOUT = float(os.getenv('NFL_CONNECT_TIMEOUT', '5'))
+READ_TIMEOUT = float(os.getenv('NFL_READ_TIMEOUT', '20'))
+STAGE_DEADLINE = float(os.getenv('NFL_STAGE_DEADLINE', '300'))
+FETCH_RETRIES = int(os.getenv('NFL_FETCH_RETRIES', '3'))
+FETCH_BACKOFF = float(os.getenv('NFL_FETCH_BACKOFF', '1'))        # first delay, doubled per retry, full jitter
+FETCH_BACKOFF_MAX = float(os.getenv('NFL_FETCH_BACKOFF_MAX', '30'))
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Send a duplicate request when the first has not answered after this long; 0 disables hedging
+HEDGE_AFTER = float(os.getenv('NFL_HEDGE_AFTER', '0'))
+# Per host: this many consecutive failed attempts open the circuit, which fails fast until a trial
+# request is let through after the cool-down
+BREAKER_FAILURES = int(os.getenv('NFL_BREAKER_FAILURES', '5'))
+BREAKER_RESET = float(os.getenv('NFL_BREAKER_RESET', '60'))
+
+_session = None
+_session_pool_size = 0
+_session_lock = threading.Lock()
+_default_limiter = None
+_default_breaker = None
+_hedge_pool = None
+
+
+# Raised instead of fetching while a host's circuit is open
+class CircuitOpenError(requests.ConnectionError):
+    pass
+
+
+# Raised when a stage's fetch budget is spent before a usable response arrived
+class DeadlineExceeded(requests.Timeout):
+    pass
+
+
+# Raised on replay (replay_archive) for a request the archive holds no answer for, so the scrapers
+# drop that page as they would after a failed fetch
+class ReplayMissError(requests.ConnectionError):
+    pass
+
+
+# Token bucket: refills `rate` tokens per second up to `capacity`, each request takes one
+class TokenBucket:
+    def __init__(self, rate: float, capacity: int):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+# One token bucket per host so every scraper shares the same politeness budget
+class HostRateLimiter:
+    def __init__(self, rate: float = SCRAPE_RATE, burst: int = SCRAPE_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, url: str):
+        host = urlparse(url).netloc
+        with self.lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                bucket = self.buckets[host] = TokenBucket(self.rate, self.burst)
+        bucket.acquire()
+
+
+def get_rate_limiter() -> HostRateLimiter:
+    global _default_limiter
+    with _session_lock:
+        if _default_limiter is None:
+            _default_limiter = HostRateLimiter()
+        return _default_limiter
+
+
+# Wall-clock budget shared by every fetch of one stage (and its threads)
+class Deadline:
+    def __init__(self, seconds: float = STAGE_DEADLINE):
+        self.seconds = seconds
+        self.expires = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+# Consecutive failures per host; open hosts fail fast, one trial request probes them after `reset` seconds
+class HostCircuitBreaker:
+    def __init__(self, failures: int = BREAKER_FAILURES, reset: float = BREAKER_RESET):
+        self.failures = failures
+        self.reset = reset
+        self.hosts = {}  # host -> [consecutive failures, opened at or None, trial in flight]
+        self.lock = threading.Lock()
+
+    def before(self, url: str):
+        host = urlparse(url).netloc
+        with self.lock:
+            state = self.hosts.setdefault(host, [0, None, False])
+            if state[1] is None:
+                return
+            if time.monotonic() - state[1] < self.reset or state[2]:
+                raise CircuitOpenError(f"circuit open for {host} after {state[0]} consecutive failures")
+            state[2] = True  # half-open: this request is the trial
+
+    def record(self, url: str, ok: bool):
+        host = urlparse(url).netloc
+        with self.lock:
+            state = self.hosts.setdefault(host, [0, None, False])
+            was_open = state[1] is not None
+            if ok:
+                state[:] = [0, None, False]
+            else:
+                state[0] += 1
+                state[2] = False
+                if was_open or state[0] >= self.failures:
+                    state[1] = time.monotonic()
+        if ok and was_open:
+            log_sampled(logging.INFO, 'circuit_closed', "Circuit closed for %s", host)
+        elif not ok and not was_open and state[1] is not None:
+            log_sampled(logging.ERROR, 'circuit_opened', "Circuit opened for %s after %d consecutive failures; "
+                        "failing fast for %.0fs", host, state[0], self.reset)
+
+    # End a trial request that gave no verdict on the host (the deadline ran out), so the next one can probe
+    def release(self, url: str):
+        with self.lock:
+            state = self.hosts.get(urlparse(url).netloc)
+            if state is not None:
+                state[2] = False
+
+    def state(self) -> dict:
+        with self.lock:
+            return {host: 'open' if opened is not None else 'closed' for host, (_, opened, _) in self.hosts.items()}
+
+
+def get_circuit_breaker() -> HostCircuitBreaker:
+    global _default_breaker
+    with _session_lock:
+        if _default_breaker is None:
+            _default_breaker = HostCircuitBreaker()
+        return _default_breaker
+
+
+def _get_hedge_pool() -> ThreadPoolExecutor:
+    global _hedge_pool
+    with _session_lock:
+        if _hedge_pool is None:
+            _hedge_pool = ThreadPoolExecutor(max_workers=2 * SCRAPE_WORKERS, thread_name_prefix='fetch-hedge')
+        return _hedge_pool
+
+
+# Shared session so keep-alive connections are reused across pages and threads. The connection pool
+# is as large as the largest pool_size asked for so far: a caller with more workers remounts a bigger
+# adapter on the same session (requests already in flight finish on the old one). While a run is
+# recorded or replayed (replay_archive) the session is wrapped or replaced by the archive's.
+def get_session(pool_size: int = SCRAPE_WORKERS) -> requests.Session:
+    global _session, _session_pool_size
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            _session.headers.update(HEADERS)
+        if pool_size > _session_pool_size:
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            _session.mount('http://', adapter)
+            _session.mount('https://', adapter)
+            _session_pool_size = pool_size
+        session = _session
+    archive = current_archive()
+    return archive.session(session) if archive is not None else session
+
+
+# One GET with timeouts capped by the deadline
+def _get(session, limiter, url, headers, deadline):
+    if not getattr(session, 'offline', False):
+        limiter.acquire(url)
+    remaining = deadline.remaining()
+    if remaining <= 0:
+        raise DeadlineExceeded(f"fetch deadline of {deadline.seconds:.0f}s spent before requesting {url}")
+    return session.get(url, headers=headers, timeout=(min(CONNECT_TIMEOUT, remaining), min(READ_TIMEOUT, remaining)))
+
+
+# GET, duplicated once if the first request is slower than `hedge_after`; the first usable answer wins
+# and the other request is left to finish in the background and discarded
+def _hedged_get(session, limiter, url, headers, deadline, hedge_after):
+    if hedge_after <= 0:
+        return _get(session, limiter, url, headers, deadline)
+    pool = _get_hedge_pool()
+    pending = {pool.submit(_get, session, limiter, url, headers, deadline)}
+    done, pending = wait(pending, timeout=min(hedge_after, deadline.remaining()))
+    if not done:
+        logging.info("Hedging %s after %.1fs", url, hedge_after)
+        count(http_hedges=1)
+        pending.add(pool.submit(_get, session, limiter, url, headers, deadline))
+    error = None
+    while True:
+        for future in done:
+            try:
+                response = future.result()
+            except requests.RequestException as e:
+                error = e
+                continue
+            if response.status_code not in RETRY_STATUSES or not pending:
+                for other in pending:
+                    other.add_done_callback(_discard)
+                return response
+            error = response
+        if not pending:
+            break
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+    if isinstance(error, requests.Response):
+        return error
+    raise error
+
+
+def _discard(future):
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+# Delay before retry `attempt` (0-based): exponential backoff with full jitter, or the server's Retry-After
+def _backoff(attempt, response=None):
+    retry_after = response.headers.get('Retry-After') if response is not None else None
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), FETCH_BACKOFF_MAX)
+    return random.uniform(0, min(FETCH_BACKOFF_MAX, FETCH_BACKOFF * 2 ** attempt))
+
+
+# Rate-limited GET through the shared session, with connect/read timeouts, retries of connection
+# errors, timeouts and 429/5xx answers, optional hedging, and a per-host circuit breaker. All attempts
+# share `deadline` (a fresh STAGE_DEADLINE budget if none is given). Returns the response, the last
+# 5xx one if retries run out; raises requests.RequestException (CircuitOpenError, DeadlineExceeded)
+# when no response came back at all.
+def fetch(url: str, session: requests.Session = None, limiter: HostRateLimiter = None,
+          headers: dict = None, deadline: Deadline = None, retries: int = FETCH_RETRIES,
+          hedge_after: float = HEDGE_AFTER, breaker: HostCircuitBreaker = None) -> requests.Response:
+    session = session or get_session()
+    limiter = limiter or get_rate_limiter()
+    deadline = deadline or Deadline()
+    breaker = breaker or get_circuit_breaker()
+
+    for attempt in range(retries + 1):
+        breaker.before(url)
+        logging.info("Fetching %s", url)
+        response, error = None, None
+        try:
+            response = _hedged_get(session, limiter, url, headers, deadline, hedge_after)
+        except (CircuitOpenError, DeadlineExceeded):
+            breaker.release(url)
+            raise
+        except requests.RequestException as e:
+            error = e
+        ok = response is not None and response.status_code not in RETRY_STATUSES
+        breaker.record(url, ok)
+        if ok:
+            count(http_requests=1, http_bytes=len(response.content))
+            return response
+
+        reason = error if response is None else f"status {response.status_code}"
+        delay = _backoff(attempt, response)
+        out_of_time = attempt < retries and delay >= deadline.remaining()
+        if attempt == retries or out_of_time:
+            if response is not None:
+                count(http_requests=1, http_bytes=len(response.content))
+                return response
+            if out_of_time:
+                raise DeadlineExceeded(f"fetch deadline of {deadline.seconds:.0f}s spent on {url}: {reason}") from error
+            raise error
+        count(http_retries=1)
+        logging.warning("Fetching %s failed (%s), retry %d/%d in %.1fs", url, reason, attempt + 1, retries, delay)
+        time.sleep(delay)
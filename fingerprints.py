@@ -0,0 +1,73 @@
+# fingerprints.py
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from datetime import datetime
+
+MANIFEST_FILE = os.getenv('NFL_MANIFEST_FILE', '.pipeline_manifest.json')
+CHUNK_SIZE = 1024 * 1024
+
+
+def _hash_file(digest, path):
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+
+
+# Content hash of files and directories; names are part of the hash, missing paths hash as missing
+def fingerprint_paths(paths) -> str:
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        digest.update(path.encode('utf-8'))
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.endswith('.tmp'):
+                        continue
+                    file_path = os.path.join(root, name)
+                    digest.update(os.path.relpath(file_path, path).encode('utf-8'))
+                    _hash_file(digest, file_path)
+        elif os.path.isfile(path):
+            _hash_file(digest, path)
+        else:
+            digest.update(b'<missing>')
+    return digest.hexdigest()
+
+
+# Per-stage record of the input and output fingerprints of its last successful run
+class FingerprintManifest:
+    def __init__(self, manifest_file: str = MANIFEST_FILE):
+        self.manifest_file = manifest_file
+        self.lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(manifest_file):
+            try:
+                with open(manifest_file) as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.warning(f"Ignoring unreadable fingerprint manifest {manifest_file}: {e}")
+
+    # Unchanged when the inputs hash as last time and the outputs on disk are still what that run wrote
+    def is_unchanged(self, stage, inputs_fp: str) -> bool:
+        with self.lock:
+            entry = self.entries.get(stage.name)
+        if entry is None or entry['inputs'] != inputs_fp:
+            return False
+        return not stage.outputs or entry['outputs'] == fingerprint_paths(stage.outputs)
+
+    def record(self, stage, inputs_fp: str):
+        outputs_fp = fingerprint_paths(stage.outputs) if stage.outputs else None
+        with self.lock:
+            self.entries[stage.name] = {
+                'inputs': inputs_fp,
+                'outputs': outputs_fp,
+                'recorded_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            }
+            tmp_file = f"{self.manifest_file}.tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump(self.entries, f, indent=2)
+            os.replace(tmp_file, self.manifest_file)
@@ -1,65 +1,56 @@
-import gspread
-from google.oauth2.service_account import Credentials
-from jinja2 import Environment, FileSystemLoader
 from dotenv import load_dotenv
 import os
+from gsheets_client import get_worksheet, timed
+from run_log_mirror import RunLogMirror
 
 load_dotenv()  # Load environment variables from .env file
 
+RECENT_LOG_LIMIT = int(os.getenv('NFL_DASHBOARD_LOG_LIMIT', '50'))
 
-# Load credentials and Google Sheets client
-def get_gsheets_client():
-    SCOPES = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive']
-    credentials = Credentials.from_service_account_file('credentials.json', scopes=SCOPES)
-    client = gspread.authorize(credentials)
-    return client
 
+# Bring the local run-log mirror up to date; only rows appended since the last sync are fetched
+def fetch_pipeline_data(mirror=None, rebuild=False):
+    mirror = mirror or RunLogMirror()
+    sheet = get_worksheet(os.getenv('SPREADSHEET_ID_LOG'), 'Run_Log')
+    with timed('data'):
+        if rebuild:
+            mirror.rebuild(sheet)
+        else:
+            mirror.sync(sheet)
+    return mirror
 
-# Fetch data from Google Sheets
-def fetch_pipeline_data():
-    client = get_gsheets_client()
-    sheet = client.open_by_key(os.getenv('SPREADSHEET_ID_LOG')).worksheet('Run_Log')
-    data = sheet.get_all_records()
-    return data
 
-
-# Prepare data for Jinja2 template
-def prepare_data(data):
-    pipelines = {}
-    logs = []
-
-    for row in data:
-        # Aggregate latest status by pipeline
-        pipeline_name = row['Pipeline Name']
-        if pipeline_name not in pipelines or pipelines[pipeline_name]['run_date'] < row['Run Date']:
-            pipelines[pipeline_name] = {
-                'name': pipeline_name,
-                'status': row['Run Status'],
-                'run_date': row['Run Date'],
-                'duration': row['Duration']
-            }
-        logs.append({
-            'run_date': row['Run Date'],
-            'pipeline_name': pipeline_name,
-            'status': row['Run Status'],
-            'duration': row['Duration'],
-            'error_message': row['Error Message']
-        })
-
-    return list(pipelines.values()), logs
+# Prepare data for Jinja2 template from the mirror's indexed views
+def prepare_data(mirror, limit=RECENT_LOG_LIMIT):
+    pipelines = [{
+        'name': row['pipeline_name'],
+        'status': row['status'],
+        'run_date': row['run_date'],
+        'duration': row['duration'],
+        'stage_summary': row['stage_summary']
+    } for row in mirror.latest_runs()]
+    logs = mirror.recent_runs(limit)
+    return pipelines, logs, mirror.totals()
 
 
 # Render HTML
-def render_html(pipelines, logs):
+def render_html(pipelines, logs, totals=()):
+    from jinja2 import Environment, FileSystemLoader
+
     env = Environment(loader=FileSystemLoader('.'))
     template = env.get_template('dashboard_template.html')
-    output_from_parsed_template = template.render(pipelines=pipelines, logs=logs)
+    output_from_parsed_template = template.render(pipelines=pipelines, logs=logs, totals=totals)
 
     with open("dashboard.html", "w") as f:
         f.write(output_from_parsed_template)
 
 
+def main():
+    mirror = fetch_pipeline_data()
+    pipelines, logs, totals = prepare_data(mirror)
+    render_html(pipelines, logs, totals)
+    mirror.close()
+
+
 if __name__ == "__main__":
-    data = fetch_pipeline_data()
-    pipelines, logs = prepare_data(data)
-    render_html(pipelines, logs)
+    main()
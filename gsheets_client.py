@@ -0,0 +1,112 @@
+# gsheets_client.py
+
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from replay_archive import current_archive
+
+SCOPES = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive']
+CREDENTIALS_FILE = os.path.abspath('credentials.json')  # resolved at import, so runs in a --workdir find it
+POOL_SIZE = 10
+
+_lock = threading.RLock()
+_client = None
+_spreadsheets = {}
+_worksheets = {}
+_stats = {}
+
+
+# Count and total seconds per category: auth, open_spreadsheet, open_worksheet, data, cache_hit
+@contextmanager
+def timed(category: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        with _lock:
+            entry = _stats.setdefault(category, {'count': 0, 'seconds': 0.0})
+            entry['count'] += 1
+            entry['seconds'] += elapsed
+
+
+def _hit():
+    with _lock:
+        entry = _stats.setdefault('cache_hit', {'count': 0, 'seconds': 0.0})
+        entry['count'] += 1
+
+
+# One authorized client per process. google-auth refreshes the access token only once it has
+# expired, and the client's session keeps its pooled HTTPS connections between calls.
+# gspread and google-auth are imported here, on first use, not by every module that imports this one.
+def get_gsheets_client():
+    import gspread
+    from google.oauth2.service_account import Credentials
+    from requests.adapters import HTTPAdapter
+
+    global _client
+    with _lock:
+        if _client is not None:
+            _hit()
+            return _client
+        try:
+            with timed('auth'):
+                credentials = Credentials.from_service_account_file(CREDENTIALS_FILE, scopes=SCOPES)
+                client = gspread.authorize(credentials)
+                adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+                client.http_client.session.mount('https://', adapter)
+            logging.info("Successfully authenticated Google Sheets API client.")
+        except Exception as e:
+            logging.error(f"Failed to authenticate Google Sheets API client: {e}")
+            raise
+        _client = client
+        return _client
+
+
+def get_spreadsheet(spreadsheet_id: str):
+    with _lock:
+        if spreadsheet_id in _spreadsheets:
+            _hit()
+            return _spreadsheets[spreadsheet_id]
+    client = get_gsheets_client()
+    with timed('open_spreadsheet'):
+        spreadsheet = client.open_by_key(spreadsheet_id)
+    with _lock:
+        return _spreadsheets.setdefault(spreadsheet_id, spreadsheet)
+
+
+# Worksheet handle; while a run is recorded or replayed (replay_archive) the archive's proxy for it
+def get_worksheet(spreadsheet_id: str, sheet_name: str):
+    archive = current_archive()
+    if archive is not None:
+        return archive.worksheet(spreadsheet_id, sheet_name, lambda: _open_worksheet(spreadsheet_id, sheet_name))
+    return _open_worksheet(spreadsheet_id, sheet_name)
+
+
+def _open_worksheet(spreadsheet_id: str, sheet_name: str):
+    key = (spreadsheet_id, sheet_name)
+    with _lock:
+        if key in _worksheets:
+            _hit()
+            return _worksheets[key]
+    spreadsheet = get_spreadsheet(spreadsheet_id)
+    with timed('open_worksheet'):
+        worksheet = spreadsheet.worksheet(sheet_name)
+    with _lock:
+        return _worksheets.setdefault(key, worksheet)
+
+
+def client_stats() -> dict:
+    with _lock:
+        return {category: dict(entry) for category, entry in _stats.items()}
+
+
+# Drop cached handles, e.g. after a worksheet was deleted or credentials rotated
+def reset_gsheets_cache():
+    global _client
+    with _lock:
+        _client = None
+        _spreadsheets.clear()
+        _worksheets.clear()
@@ -0,0 +1,193 @@
+# http_cache.py
+
+import os
+import json
+import time
+import pickle
+import hashlib
+import logging
+import threading
+from pipeline_logging import log_sampled
+
+# Cache settings, overridable from .env
+CACHE_DIR = os.getenv('NFL_HTTP_CACHE_DIR', '.http_cache')
+CACHE_MAX_AGE_DAYS = float(os.getenv('NFL_HTTP_CACHE_MAX_AGE_DAYS', '7'))
+CACHE_MAX_MB = float(os.getenv('NFL_HTTP_CACHE_MAX_MB', '50'))
+INDEX_FILE = 'index.json'
+# Bumped when parsed frames or cache keys change (e.g. typed stat columns); older snapshots are dropped
+SNAPSHOT_FORMAT = 3
+# What a corrupt, truncated or outdated pickle raises on load
+UNREADABLE_SNAPSHOT_ERRORS = (OSError, ValueError, EOFError, AttributeError, pickle.UnpicklingError)
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+# On-disk conditional-GET cache: validators, raw bodies and the DataFrame parsed from each body.
+# Frames stored or loaded by this instance stay in memory, so a long-running process gets the very
+# same DataFrame object back for an unchanged page (callers must not modify it).
+# Entries are keyed by URL and `namespace`: scrapers that parse the same page into different
+# frames (the current-week and season schedules) each pass their own namespace.
+class HttpCache:
+    def __init__(self, cache_dir: str = CACHE_DIR, max_age_days: float = CACHE_MAX_AGE_DAYS,
+                 max_mb: float = CACHE_MAX_MB):
+        self.cache_dir = cache_dir
+        self.max_age = max_age_days * 86400
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.frames = {}  # key -> (body_hash, DataFrame)
+        os.makedirs(cache_dir, exist_ok=True)
+        self.index = self._load_index()
+
+    def _load_index(self) -> dict:
+        index_path = os.path.join(self.cache_dir, INDEX_FILE)
+        if not os.path.exists(index_path):
+            return {}
+        try:
+            with open(index_path) as f:
+                index = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning("Discarding unreadable HTTP cache index %s: %s", index_path, e)
+            return {}
+        for key in [key for key, entry in index.items() if entry.get('format') != SNAPSHOT_FORMAT]:
+            index.pop(key)
+            for suffix in ('body', 'pkl'):
+                if os.path.exists(self._path(key, suffix)):
+                    os.remove(self._path(key, suffix))
+        return index
+
+    def _save_index(self):
+        index_path = os.path.join(self.cache_dir, INDEX_FILE)
+        tmp_path = f"{index_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, index_path)
+
+    @staticmethod
+    def _key(url: str, namespace: str = '') -> str:
+        return hashlib.sha256(f"{namespace}\n{url}".encode('utf-8')).hexdigest()[:32]
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.{suffix}")
+
+    # Headers for a conditional GET; empty when there is no usable snapshot to fall back on
+    def conditional_headers(self, url: str, namespace: str = '') -> dict:
+        key = self._key(url, namespace)
+        with self.lock:
+            entry = self.index.get(key)
+        if entry is None or not os.path.exists(self._path(key, 'pkl')):
+            return {}
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    # Return the stored DataFrame when the server says 304 or sends back an identical body.
+    # An unreadable snapshot is evicted, so the caller's fresh parse replaces it.
+    def lookup(self, url: str, response, namespace: str = ''):
+        key = self._key(url, namespace)
+        with self.lock:
+            entry = self.index.get(key)
+
+        if entry is not None:
+            unchanged = response.status_code == 304 or (
+                response.status_code == 200 and hashlib.sha256(response.content).hexdigest() == entry['body_hash'])
+            if unchanged:
+                with self.lock:
+                    warm = self.frames.get(key)
+                try:
+                    if warm is not None and warm[0] == entry['body_hash']:
+                        df = warm[1]
+                    else:
+                        import pandas as pd
+
+                        df = pd.read_pickle(self._path(key, 'pkl'))
+                except UNREADABLE_SNAPSHOT_ERRORS as e:
+                    logging.warning("HTTP cache snapshot for %s unreadable, evicting it: %s", url, e)
+                    with self.lock:
+                        if self.index.get(key) is entry:
+                            self._remove(key)
+                            self._save_index()
+                else:
+                    with self.lock:
+                        self.hits += 1
+                        self.frames[key] = (entry['body_hash'], df)
+                    logging.info("HTTP cache hit for %s (status %s)", url, response.status_code)
+                    return df
+
+        with self.lock:
+            self.misses += 1
+        logging.info("HTTP cache miss for %s", url)
+        return None
+
+    # Record the body, validators and parsed DataFrame of a fresh 200 response
+    def store(self, url: str, response, df, namespace: str = ''):
+        key = self._key(url, namespace)
+        body = response.content
+        with open(self._path(key, 'body'), 'wb') as f:
+            f.write(body)
+        df.to_pickle(self._path(key, 'pkl'))
+        size = len(body) + os.path.getsize(self._path(key, 'pkl'))
+
+        with self.lock:
+            self.frames[key] = (hashlib.sha256(body).hexdigest(), df)
+            self.index[key] = {
+                'url': url,
+                'namespace': namespace,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'body_hash': hashlib.sha256(body).hexdigest(),
+                'stored_at': time.time(),
+                'size': size,
+                'format': SNAPSHOT_FORMAT,
+            }
+            self._evict()
+            self._save_index()
+
+    # Drop entries past max age, then the oldest entries until the cache fits in max_bytes
+    def _evict(self):
+        cutoff = time.time() - self.max_age
+        expired = [key for key, entry in self.index.items() if entry['stored_at'] < cutoff]
+
+        live = sorted((entry['stored_at'], key) for key, entry in self.index.items() if key not in expired)
+        total = sum(self.index[key]['size'] for _, key in live)
+        for _, key in live:
+            if total <= self.max_bytes:
+                break
+            total -= self.index[key]['size']
+            expired.append(key)
+
+        for key in expired:
+            entry = self._remove(key)
+            log_sampled(logging.INFO, 'http_cache_evict', "Evicted HTTP cache entry for %s", entry['url'])
+
+    # Drop one entry from the index, memory and disk (caller holds the lock)
+    def _remove(self, key: str) -> dict:
+        entry = self.index.pop(key)
+        self.frames.pop(key, None)
+        for suffix in ('body', 'pkl'):
+            path = self._path(key, suffix)
+            if os.path.exists(path):
+                os.remove(path)
+        return entry
+
+    def evict(self):
+        with self.lock:
+            self._evict()
+            self._save_index()
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.index)}
+
+
+def get_http_cache() -> HttpCache:
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = HttpCache()
+        return _default_cache
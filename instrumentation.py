@@ -0,0 +1,230 @@
+# instrumentation.py
+
+import os
+import sys
+import time
+import json
+import uuid
+import logging
+import threading
+import functools
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SPANS_FILE = os.getenv('NFL_SPANS_FILE', 'pipeline_spans.jsonl')
+PROFILE = os.getenv('NFL_PROFILE', '').lower()  # '', 'cprofile' or 'pyinstrument'
+PROFILE_DIR = os.getenv('NFL_PROFILE_DIR', 'profiles')
+COUNTERS = ('rows_in', 'rows_out', 'http_requests', 'http_bytes', 'http_retries', 'http_hedges', 'failed_casts')
+ROLLUP_COUNTERS = ('http_requests', 'http_bytes', 'http_retries', 'http_hedges', 'failed_casts')  # rows are reported per span, not summed up the tree
+
+_lock = threading.Lock()
+_current = contextvars.ContextVar('current_span', default=None)
+_run_id = None
+_spans = []
+
+
+# Process high-water mark in MB; ru_maxrss is KB on Linux and bytes on macOS
+def peak_rss_mb() -> float:
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+    import psutil
+
+    info = psutil.Process().memory_info()
+    return round(getattr(info, 'peak_wset', info.rss) / (1024 * 1024), 1)
+
+
+class Span:
+    def __init__(self, name, kind, parent):
+        self.name = name
+        self.kind = kind
+        self.parent = parent
+        self.counts = dict.fromkeys(COUNTERS, 0)
+        self.lock = threading.Lock()
+
+    def add(self, counts: dict):
+        with self.lock:
+            for key, value in counts.items():
+                self.counts[key] = self.counts.get(key, 0) + value
+
+
+def start_run(run_id: str = None) -> str:
+    global _run_id
+    with _lock:
+        _run_id = run_id or datetime.now().strftime('%Y%m%d-%H%M%S-') + uuid.uuid4().hex[:6]
+        _spans.clear()
+    return _run_id
+
+
+def _emit(record: dict):
+    with _lock:
+        _spans.append(record)
+        with open(SPANS_FILE, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+
+# Time a block: wall and thread CPU time, process peak RSS, and the counters reported inside it.
+# HTTP counters roll up into the enclosing span when the block ends.
+@contextmanager
+def span(name: str, kind: str = 'function'):
+    parent = _current.get()
+    current = Span(name, kind, parent)
+    token = _current.set(current)
+    started_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    wall_start, cpu_start = time.perf_counter(), time.thread_time()
+    status, error = 'ok', None
+    try:
+        yield current
+    except Exception as e:
+        status, error = 'error', str(e)
+        raise
+    finally:
+        _current.reset(token)
+        if parent is not None:
+            parent.add({key: current.counts[key] for key in ROLLUP_COUNTERS})
+        _emit_span(current, started_at, time.perf_counter() - wall_start, time.thread_time() - cpu_start,
+                   status, error)
+
+
+# A zero-duration span with status 'skipped' for a block that did not run, e.g. a stage whose
+# inputs are unchanged, so the run's spans still list it
+def skipped_span(name: str, kind: str = 'function'):
+    _emit_span(Span(name, kind, _current.get()), datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 0.0, 0.0,
+               'skipped', None)
+
+
+def _emit_span(current: Span, started_at: str, wall_s: float, cpu_s: float, status: str, error):
+    record = {
+        'run_id': _run_id,
+        'name': current.name,
+        'kind': current.kind,
+        'parent': current.parent.name if current.parent is not None else None,
+        'started_at': started_at,
+        'wall_s': round(wall_s, 4),
+        'cpu_s': round(cpu_s, 4),
+        'peak_rss_mb': peak_rss_mb(),
+        'status': status,
+        'error': error,
+    }
+    record.update(current.counts)
+    try:
+        _emit(record)
+    except OSError as e:
+        logging.warning(f"Could not write span '{current.name}' to {SPANS_FILE}: {e}")
+
+
+def traced(name: str = None, kind: str = 'function'):
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name, kind):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# Add to the counters of the innermost open span (no-op outside any span)
+def count(**counts):
+    current = _current.get()
+    if current is not None:
+        current.add(counts)
+
+
+# (run id, name of the enclosing stage span) for tagging log records
+def current_ids():
+    current = _current.get()
+    while current is not None and current.kind != 'stage':
+        current = current.parent
+    return _run_id, current.name if current is not None else None
+
+
+# Run func in worker threads as a child of the span that is open where bind_span was called
+def bind_span(func):
+    parent = _current.get()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        token = _current.set(parent)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _current.reset(token)
+    return wrapper
+
+
+# Optional profiler around a block, chosen by NFL_PROFILE. From Python 3.12 only one cProfile
+# profiler can be active at a time, so a block that starts while another is profiling runs unprofiled.
+@contextmanager
+def profiled(name: str):
+    if PROFILE not in ('cprofile', 'pyinstrument'):
+        yield
+        return
+    out_dir = os.path.join(PROFILE_DIR, _run_id or 'adhoc')
+    os.makedirs(out_dir, exist_ok=True)
+
+    if PROFILE == 'cprofile':
+        import cProfile
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as e:
+            logging.warning(f"Not profiling '{name}': {e}")
+            yield
+            return
+        try:
+            yield
+        finally:
+            profiler.disable()
+            out_file = os.path.join(out_dir, f"{name}.prof")
+            profiler.dump_stats(out_file)
+            logging.info(f"cProfile output for '{name}' written to {out_file}")
+    else:
+        from pyinstrument import Profiler
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            out_file = os.path.join(out_dir, f"{name}.html")
+            with open(out_file, 'w') as f:
+                f.write(profiler.output_html())
+            logging.info(f"pyinstrument output for '{name}' written to {out_file}")
+
+
+def run_spans(kind: str = None) -> list:
+    with _lock:
+        return [record for record in _spans if kind is None or record['kind'] == kind]
+
+
+def _format_bytes(n: int) -> str:
+    return f"{n / (1024 * 1024):.1f}MB" if n >= 1024 * 1024 else f"{n / 1024:.0f}KB"
+
+
+# One line per stage of the current run, short enough for a Sheets cell
+def format_stage_summary(records: list = None) -> str:
+    records = run_spans('stage') if records is None else records
+    parts = []
+    for record in records:
+        if record.get('status') == 'skipped':
+            parts.append(f"{record['name']} skipped")
+            continue
+        part = f"{record['name']} {record['wall_s']:.1f}s cpu {record['cpu_s']:.1f}s rss {record['peak_rss_mb']:.0f}MB"
+        if record['rows_in'] or record['rows_out']:
+            part += f" rows {record['rows_in']}>{record['rows_out']}"
+        if record['http_requests']:
+            part += f" http {record['http_requests']}req/{_format_bytes(record['http_bytes'])}"
+            if record.get('http_retries') or record.get('http_hedges'):
+                part += f" ({record.get('http_retries', 0)} retries, {record.get('http_hedges', 0)} hedged)"
+        if record.get('failed_casts'):
+            part += f" failed casts {record['failed_casts']}"
+        parts.append(part)
+    return '; '.join(parts)
@@ -0,0 +1,205 @@
+# matchup_engine.py
+
+import os
+import logging
+import numpy as np
+
+# Composite weights as slug=weight pairs, e.g. "points-per-game=2,penalty-yards-per-game=0.5";
+# stats not listed weigh 1. Sheet names (df_points_per_game) are accepted as well.
+STAT_WEIGHTS = os.getenv('NFL_STAT_WEIGHTS', '')
+# Per-stat rank deltas for every team pair are precomputed up to this many cells (teams² x stats);
+# larger leagues compute them per lookup
+MATRIX_MAX_CELLS = int(os.getenv('NFL_MATRIX_MAX_CELLS', '5000000'))
+
+# A team's offensive stat against the opponent's matching defensive stat. teamrankings lists the
+# better team first on every page, so rank 1 is the best offense or the stingiest defense.
+PAIRINGS = [
+    ('scoring', 'points-per-game', 'opponent-points-per-game'),
+    ('third_down', 'third-down-conversion-pct', 'opponent-third-down-conversion-pct'),
+    ('red_zone', 'red-zone-scoring-pct', 'opponent-red-zone-scores-per-game'),
+    ('pass_protection', 'qb-sacked-per-game', 'sacks-per-game'),
+]
+
+
+# Stat sheet name for a teamrankings URL slug, as nfl_scrapper names them
+def sheet_name(slug: str) -> str:
+    return f"df_{slug.replace('-', '_')}"[:31]
+
+
+# One weight per sheet from a {slug or sheet name: weight} mapping or an NFL_STAT_WEIGHTS string
+def stat_weights(sheet_names, weights=None) -> np.ndarray:
+    if weights is None:
+        weights = STAT_WEIGHTS
+    if isinstance(weights, str):
+        weights = {key.strip(): float(value) for key, _, value in
+                   (item.partition('=') for item in weights.split(',') if item.strip())}
+    resolved = np.ones(len(sheet_names))
+    for key, weight in weights.items():
+        name = key if key in sheet_names else sheet_name(key)
+        if name not in sheet_names:
+            logging.warning(f"Stat weight for unknown stat '{key}' ignored")
+            continue
+        resolved[sheet_names.index(name)] = weight
+    return resolved
+
+
+# Per column, the share of ranked teams each team ranks ahead of (ties count half), 0-100;
+# NaN where a team is unranked
+def rank_percentiles(ranks: np.ndarray) -> np.ndarray:
+    percentiles = np.full(ranks.shape, np.nan)
+    for col in range(ranks.shape[1]):
+        column = ranks[:, col]
+        found = ~np.isnan(column)
+        values = np.sort(column[found])
+        if len(values) < 2:
+            percentiles[found, col] = 100.0
+            continue
+        left = np.searchsorted(values, column[found], side='left')
+        right = np.searchsorted(values, column[found], side='right')
+        percentiles[found, col] = 100 * ((len(values) - right) + 0.5 * (right - left - 1)) / (len(values) - 1)
+    return percentiles
+
+
+# All-pairs team x team matchup metrics, computed once with broadcasting over the rank matrix.
+# Every edge is oriented from the row team's side: positive means the row team is favoured.
+# Lookups take registry team ids; -1 (unknown team) yields NaN.
+class MatchupMatrix:
+    def __init__(self, registry, sheet_names, ranks, weights=None):
+        self.registry = registry
+        self.sheet_names = list(sheet_names)
+        self.ranks = ranks
+        self.weights = stat_weights(self.sheet_names, weights)
+        n_teams, n_stats = ranks.shape
+
+        # Per team: unweighted rank total, and the weighted mean rank over the stats it was found in
+        found = ~np.isnan(ranks)
+        filled = np.where(found, ranks, 0)
+        self.rank_total = filled.sum(axis=1)
+        weight_sum = np.where(found, self.weights, 0).sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.composite = np.where(weight_sum > 0, (filled * self.weights).sum(axis=1) / weight_sum, np.nan)
+        self.percentiles = rank_percentiles(ranks)
+        self.composite_percentile = rank_percentiles(self.composite[:, None])[:, 0]
+
+        # [i, j]: how much better team i's composite is than team j's
+        self.composite_edge = self.composite[None, :] - self.composite[:, None]
+
+        # [i, j, p]: team j's defensive rank minus team i's offensive rank for pairing p
+        pairings = [(name, sheet_name(offense), sheet_name(defense)) for name, offense, defense in PAIRINGS]
+        pairings = [p for p in pairings if p[1] in self.sheet_names and p[2] in self.sheet_names]
+        self.pairing_names = [name for name, _, _ in pairings]
+        offense = [self.sheet_names.index(p[1]) for p in pairings]
+        defense = [self.sheet_names.index(p[2]) for p in pairings]
+        self.pairing_edges = ranks[None, :, defense] - ranks[:, None, offense]
+
+        # [i, j, k]: team j's rank minus team i's rank in stat k
+        self.rank_deltas = None
+        if n_teams * n_teams * n_stats <= MATRIX_MAX_CELLS:
+            self.rank_deltas = ranks[None, :, :] - ranks[:, None, :]
+
+        logging.info(f"Built matchup matrix: {n_teams}x{n_teams} teams, {n_stats} stats, "
+                     f"{len(self.pairing_names)} offense/defense pairings")
+
+    @classmethod
+    def from_rank_index(cls, rank_index, weights=None):
+        return cls(rank_index.registry, rank_index.sheet_names, rank_index.ranks, weights)
+
+    def team_id(self, team_name):
+        return self.registry.team_id(team_name)
+
+    # Values of a per-team array for team ids, NaN (along the remaining axes) for -1
+    @staticmethod
+    def _take(values, team_ids):
+        team_ids = np.asarray(team_ids, dtype=np.intp)
+        taken = values[np.maximum(team_ids, 0)].astype(float)
+        taken[team_ids < 0] = np.nan
+        return taken
+
+    def _take_pairs(self, values, team1_ids, team2_ids):
+        team1_ids = np.asarray(team1_ids, dtype=np.intp)
+        team2_ids = np.asarray(team2_ids, dtype=np.intp)
+        taken = values[np.maximum(team1_ids, 0), np.maximum(team2_ids, 0)].astype(float)
+        taken[(team1_ids < 0) | (team2_ids < 0)] = np.nan
+        return taken
+
+    def ranks_for(self, team_ids):
+        return self._take(self.ranks, team_ids)
+
+    def rank_totals_for(self, team_ids):
+        return self._take(self.rank_total, team_ids)
+
+    def composites_for(self, team_ids):
+        return self._take(self.composite, team_ids)
+
+    def rank_deltas_for(self, team1_ids, team2_ids):
+        if self.rank_deltas is not None:
+            return self._take_pairs(self.rank_deltas, team1_ids, team2_ids)
+        return self.ranks_for(team2_ids) - self.ranks_for(team1_ids)
+
+    # One matchup, e.g. a hypothetical one: a constant-time lookup into the precomputed arrays
+    def matchup(self, team1_id: int, team2_id: int) -> dict:
+        deltas = self.rank_deltas_for([team1_id], [team2_id])[0]
+        edges = self._take_pairs(self.pairing_edges, [team1_id, team2_id], [team2_id, team1_id])
+        return {
+            'composite': (self._take(self.composite, [team1_id])[0], self._take(self.composite, [team2_id])[0]),
+            'composite_edge': self._take_pairs(self.composite_edge, [team1_id], [team2_id])[0],
+            'rank_deltas': dict(zip(self.sheet_names, deltas)),
+            'offense_edges': (dict(zip(self.pairing_names, edges[0])), dict(zip(self.pairing_names, edges[1]))),
+            'percentiles': (dict(zip(self.sheet_names, self._take(self.percentiles, [team1_id])[0])),
+                            dict(zip(self.sheet_names, self._take(self.percentiles, [team2_id])[0]))),
+        }
+
+    # A slate of matchups (scheduled or not) as one row each, with both teams' offensive edges
+    def matchup_frame(self, team1_ids, team2_ids):
+        import pandas as pd
+
+        team1_ids = np.asarray(team1_ids, dtype=np.intp)
+        team2_ids = np.asarray(team2_ids, dtype=np.intp)
+        frame = pd.DataFrame({
+            'Team1 ID': team1_ids,
+            'Team2 ID': team2_ids,
+            'Team1 Composite': self._take(self.composite, team1_ids),
+            'Team2 Composite': self._take(self.composite, team2_ids),
+            'Team1 Percentile': self._take(self.composite_percentile, team1_ids),
+            'Team2 Percentile': self._take(self.composite_percentile, team2_ids),
+            'Composite Edge': self._take_pairs(self.composite_edge, team1_ids, team2_ids),
+        })
+        for p, name in enumerate(self.pairing_names):
+            frame[f'Team1 {name} Edge'] = self._take_pairs(self.pairing_edges[:, :, p], team1_ids, team2_ids)
+            frame[f'Team2 {name} Edge'] = self._take_pairs(self.pairing_edges[:, :, p], team2_ids, team1_ids)
+        return frame
+
+    # Every team against every other team, e.g. for power rankings or what-if slates
+    def all_pairs_frame(self):
+        team1_ids, team2_ids = np.nonzero(~np.eye(len(self.ranks), dtype=bool))
+        frame = self.matchup_frame(team1_ids, team2_ids)
+        frame.insert(0, 'Team1', np.asarray(self.registry.names)[team1_ids])
+        frame.insert(1, 'Team2', np.asarray(self.registry.names)[team2_ids])
+        return frame
+
+
+def main(argv=None):
+    import argparse
+    import matchup_stats
+
+    parser = argparse.ArgumentParser(description="Score any matchup from the latest stats.")
+    parser.add_argument('team1')
+    parser.add_argument('team2')
+    parser.add_argument('--weights', default=None, help="slug=weight pairs, overrides NFL_STAT_WEIGHTS")
+    args = parser.parse_args(argv)
+
+    matrix = matchup_stats.build_matchup_matrix(matchup_stats.load_nfl_stats(matchup_stats.STATS_FILE),
+                                                weights=args.weights)
+    team1_id, team2_id = matrix.team_id(args.team1), matrix.team_id(args.team2)
+    if team1_id < 0 or team2_id < 0:
+        parser.error(f"unknown team: {args.team1 if team1_id < 0 else args.team2}")
+    result = matrix.matchup(team1_id, team2_id)
+    print(f"{args.team1} vs {args.team2}: composite {result['composite'][0]:.1f} vs {result['composite'][1]:.1f}, "
+          f"edge {result['composite_edge']:+.1f}")
+    for name in matrix.pairing_names:
+        print(f"  {name:<16} {args.team1} {result['offense_edges'][0][name]:+.0f}   "
+              f"{args.team2} {result['offense_edges'][1][name]:+.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,82 +1,140 @@
+import numpy as np
 import pandas as pd
-import re
 from datetime import datetime
 import logging
-from validation_functions import run_validations
+from instrumentation import traced, count
+from matchup_engine import MatchupMatrix
+from stage_store import load_stage_or_excel, write_stage
+from stat_schema import coerce_stat_frame, stat_rules
+from team_registry import NFL_REGISTRY, MATCHUP_SPLIT_PATTERN
+from validation_functions import run_validations, validate_frame
+from pipeline_logging import setup_logging, log_sampled
+
+SCHEDULE_FILE = 'nfl_current_week_schedule.xlsx'
+STATS_FILE = 'nfl_stats.xlsx'
 
 # Set up logging
-logging.basicConfig(
-    filename='nfl_pipeline.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-)
+setup_logging()
 
 
 # Load the Weekly Schedule DataFrame (scraped from previous code)
 def load_weekly_schedule(file_path):
     logging.info(f"Loading weekly schedule from {file_path}")
-    return pd.read_excel(file_path)
+    return load_stage_or_excel('schedule', file_path)
 
 
-# Load the NFL stats workbook
+# Load the NFL stats sheets, typed per the stat schemas (older workbooks and stages hold strings)
 def load_nfl_stats(file_path):
     logging.info(f"Loading NFL stats from {file_path}")
-    return pd.read_excel(file_path, sheet_name=None)
-
-
-# Function to find the rank of the team in each sheet
-def get_team_rank(team_name, nfl_stats_sheets):
-    team_ranks = []
-    for sheet_name, df in nfl_stats_sheets.items():
-        # Validate the data and check for the required 'Team' column
-        if 'Team' in df.columns and run_validations(df, sheet_name, required_columns=['Team', 'Rank']):
-            team_row = df[df['Team'].str.contains(team_name, na=False, case=False)]
-            rank_value = team_row['Rank'].values[0] if not team_row.empty else None
-            team_ranks.append(rank_value)
-        else:
-            team_ranks.append(None)  # If team not found in this sheet
-    return team_ranks
+    sheets = load_stage_or_excel('nfl_stats', file_path, sheet_name=None)
+    return {name: coerce_stat_frame(df, name)[0] for name, df in sheets.items()}
 
 
-# Build the final DataFrame by iterating over the schedule and nfl_stats
-def build_matchup_stats(schedule_df, nfl_stats_sheets):
-    final_data = []
-    # Validate schedule DataFrame
-    if not run_validations(schedule_df, "Weekly Schedule", required_columns=['Teams']):
-        logging.error("Validation failed for schedule_df.")
-        return pd.DataFrame()  # Return an empty DataFrame if validation fails
+# Dense team x stat rank matrix built once from the stats workbook; rows are registry team ids
+class RankIndex:
+    def __init__(self, registry, sheet_names, ranks):
+        self.registry = registry
+        self.sheet_names = sheet_names
+        self.ranks = ranks
+
+    def team_id(self, team_name):
+        return self.registry.team_id(team_name)
+
+    # Rank rows for an array of team ids; unknown teams (-1) get an all-NaN row
+    def ranks_for(self, team_ids):
+        padded = np.vstack([self.ranks, np.full((1, len(self.sheet_names)), np.nan)])
+        return padded[np.asarray(team_ids, dtype=np.intp)]
+
+
+# Team ids of a stats sheet: the scraped 'Team ID' column, or resolved from names for older workbooks
+def sheet_team_ids(df, registry=NFL_REGISTRY):
+    if 'Team ID' in df.columns:
+        return df['Team ID'].to_numpy(dtype=np.intp)
+    return registry.team_ids(df['Team']).astype(np.intp)
+
+
+# Validate each stats sheet once and index its ranks by canonical team id
+def build_rank_index(nfl_stats_sheets, registry=NFL_REGISTRY):
+    sheet_names = list(nfl_stats_sheets.keys())
+    ranks = np.full((len(registry), len(sheet_names)), np.nan)
 
-    # Iterate over each row in the schedule (each matchup)
-    for idx, row in schedule_df.iterrows():
-        teams = re.split(r'\s*@\s*|\s*vs\.\s*|\s*vs\s*', row['Teams'])
-        logging.info(f"Row {idx}: Splitting '{row['Teams']}' resulted in {teams}")
+    for col, (sheet_name, df) in enumerate(nfl_stats_sheets.items()):
+        # Missing stat cells (e.g. "--" in Last 1 after a bye) are NaN in the typed sheets; only Team must be set.
+        # Sheets already checked by the scraper in this process are not scanned again.
+        if not validate_frame(df, sheet_name, stat_rules(sheet_name, tuple(df.columns), len(registry))):
+            continue  # Sheet failed validation; its column stays empty
 
-        if len(teams) != 2:
-            logging.warning(f"Skipping malformed matchup in row {idx}: {row['Teams']}")
-            continue
+        # Walk rows in reverse so the first row of a duplicated team wins
+        team_ids = sheet_team_ids(df, registry)[::-1]
+        sheet_ranks = pd.to_numeric(df['Rank'], errors='coerce').to_numpy(dtype=float, na_value=np.nan)[::-1]
+        known = team_ids >= 0
+        ranks[team_ids[known], col] = sheet_ranks[known]
 
-        team1, team2 = teams[0].strip(), teams[1].strip()
-        team1_ranks, team2_ranks = get_team_rank(team1, nfl_stats_sheets), get_team_rank(team2, nfl_stats_sheets)
+    logging.info(f"Built rank index: {len(registry)} teams x {len(sheet_names)} stat sheets")
+    return RankIndex(registry, sheet_names, ranks)
 
-        # Calculate sum and average for each team
-        team1_rank_sum = sum(r for r in team1_ranks if r is not None)
-        team1_rank_count = len([r for r in team1_ranks if r is not None])
-        team1_rank_avg = team1_rank_sum / team1_rank_count if team1_rank_count > 0 else None
-        team2_rank_sum = sum(r for r in team2_ranks if r is not None)
-        team2_rank_count = len([r for r in team2_ranks if r is not None])
-        team2_rank_avg = team2_rank_sum / team2_rank_count if team2_rank_count > 0 else None
 
-        match_id = f'Match {idx + 1}'
-        final_data.extend([
-            [match_id, team1] + team1_ranks + [team1_rank_sum, team1_rank_avg],
-            [match_id, team2] + team2_ranks + [team2_rank_sum, team2_rank_avg]
-        ])
+# All-pairs matchup metrics over the stats; `weights` as in matchup_engine.stat_weights
+def build_matchup_matrix(nfl_stats_sheets, registry=NFL_REGISTRY, weights=None):
+    return MatchupMatrix.from_rank_index(build_rank_index(nfl_stats_sheets, registry), weights)
 
+
+# Find the rank of the team in each sheet
+def get_team_rank(team_name, rank_index):
+    ranks = rank_index.ranks_for([rank_index.team_id(team_name)])[0]
+    return [None if np.isnan(r) else r for r in ranks]
+
+
+# Build the final DataFrame for the scheduled matchups as a view over the matchup matrix.
+# 'Rank Average' is the weighted composite, the plain average with the default weights.
+@traced()
+def build_matchup_stats(schedule_df, nfl_stats_sheets, registry=NFL_REGISTRY, weights=None):
     column_names = ['Match ID', 'Team'] + [f'Rank_{sheet}' for sheet in nfl_stats_sheets.keys()] + ['Rank Total',
                                                                                                     'Rank Average']
-    final_df = pd.DataFrame(final_data, columns=column_names)
+    # Validate schedule DataFrame
+    if not run_validations(schedule_df, "Weekly Schedule", required_columns=['Teams']):
+        logging.error("Validation failed for schedule_df.")
+        return pd.DataFrame()  # Return an empty DataFrame if validation fails
 
-    return final_df
+    matrix = build_matchup_matrix(nfl_stats_sheets, registry, weights)
+
+    # Split every matchup at once and drop malformed rows
+    teams = schedule_df['Teams'].astype(str).str.split(MATCHUP_SPLIT_PATTERN, regex=True)
+    well_formed = (teams.str.len() == 2).to_numpy()
+    for idx in schedule_df.index[~well_formed]:
+        log_sampled(logging.WARNING, 'malformed_matchup', "Skipping malformed matchup in row %s: %s",
+                    idx, schedule_df.at[idx, 'Teams'])
+    teams = teams[well_formed]
+    logging.info(f"Split {len(teams)} matchups from {len(schedule_df)} schedule rows")
+
+    # Team ids come from the scraped schedule when present, otherwise from the registry
+    if {'Team1 ID', 'Team2 ID'}.issubset(schedule_df.columns):
+        team1_ids = schedule_df['Team1 ID'].to_numpy()[well_formed]
+        team2_ids = schedule_df['Team2 ID'].to_numpy()[well_formed]
+    else:
+        team1_ids = registry.team_ids(teams.str[0].str.strip())
+        team2_ids = registry.team_ids(teams.str[1].str.strip())
+
+    # Interleave so each match contributes a team1 row followed by a team2 row
+    team_names = np.column_stack([teams.str[0].str.strip(), teams.str[1].str.strip()]).ravel()
+    match_ids = np.repeat([f'Match {idx + 1}' for idx in teams.index], 2)
+    team_ids = np.column_stack([team1_ids, team2_ids]).ravel()
+    ranks = matrix.ranks_for(team_ids)
+    rank_total = np.nan_to_num(matrix.rank_totals_for(team_ids))
+    rank_average = matrix.composites_for(team_ids)
+
+    final_df = pd.DataFrame(ranks, columns=column_names[2:-2])
+    final_df.insert(0, 'Match ID', match_ids)
+    final_df.insert(1, 'Team', team_names)
+    final_df['Rank Total'] = rank_total
+    final_df['Rank Average'] = rank_average
+
+    # Ranks are whole numbers; keep them integer (nullable where a team was not found)
+    rank_columns = column_names[2:-1]
+    final_df[rank_columns] = final_df[rank_columns].round().astype('Int64')
+
+    count(rows_in=len(schedule_df), rows_out=len(final_df))
+    return final_df[column_names]
 
 
 # Function to save output with and without date signature
@@ -84,17 +142,18 @@ def save_output_with_date(final_df):
     current_date = datetime.now().strftime('%Y-%m-%d')
     # final_df.to_excel(f'backups/final_output/nfl_output_{current_date}.xlsx', index=False)
     final_df.to_excel('nfl_output.xlsx', index=False)
+    write_stage('nfl_output', final_df)
     logging.info(f"Files saved: nfl_output.xlsx")
 
 
-# Main function to load the data, process it, and export it
-def main():
-    schedule_file = 'nfl_current_week_schedule.xlsx'
-    stats_file = 'nfl_stats.xlsx'
-
+# Main function to load the data, process it, and export it.
+# Frames already in memory (from the pipeline runner) skip the load from disk.
+def main(schedule_df=None, nfl_stats_sheets=None):
     # Load and validate schedule and NFL stats
-    schedule_df = load_weekly_schedule(schedule_file)
-    nfl_stats_sheets = load_nfl_stats(stats_file)
+    if schedule_df is None:
+        schedule_df = load_weekly_schedule(SCHEDULE_FILE)
+    if nfl_stats_sheets is None:
+        nfl_stats_sheets = load_nfl_stats(STATS_FILE)
 
     # Build the final DataFrame with the matchups and ranks
     final_df = build_matchup_stats(schedule_df, nfl_stats_sheets)
@@ -109,6 +168,8 @@ def main():
     except Exception as e:
         logging.error(f"ETL matchup_stats pipeline failed: {e}")
 
+    return final_df
+
 
 if __name__ == "__main__":
     main()
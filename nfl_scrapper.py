@@ -1,54 +1,96 @@
-import requests
-from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
-import time
 import logging
-from validation_functions import run_validations
+import requests
+from urllib.parse import urlparse
+from fetch_utils import fetch, get_session, get_rate_limiter, Deadline, SCRAPE_WORKERS
+from http_cache import get_http_cache
+from instrumentation import traced, count, bind_span
+from table_extractor import extract_table
+from stat_schema import stat_rules, typed_stat_frame
+from stage_store import write_stage, EXPORT_EXCEL
+from team_registry import NFL_REGISTRY
+from validation_functions import validate_frame
+from pipeline_logging import setup_logging
+
+CACHE_NAMESPACE = 'stat_table'
+STAT_URLS = [
+    "https://www.teamrankings.com/nfl/stat/points-per-game",
+    "https://www.teamrankings.com/nfl/stat/opponent-points-per-game",
+    "https://www.teamrankings.com/nfl/stat/sacks-per-game",
+    "https://www.teamrankings.com/nfl/stat/third-down-conversion-pct",
+    "https://www.teamrankings.com/nfl/stat/qb-sacked-per-game",
+    "https://www.teamrankings.com/nfl/stat/opponent-third-down-conversion-pct",
+    "https://www.teamrankings.com/nfl/stat/turnover-margin-per-game",
+    "https://www.teamrankings.com/nfl/stat/penalty-yards-per-game",
+    "https://www.teamrankings.com/nfl/stat/red-zone-scoring-pct",
+    "https://www.teamrankings.com/nfl/stat/opponent-red-zone-scores-per-game"
+]
 
 # Set up logging
-logging.basicConfig(
-    filename='nfl_pipeline.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-)
+setup_logging()
 
 
 # Function to scrape table from URL and generate DataFrame
-def scrape_to_df(url):
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'
-    }
+@traced()
+def scrape_to_df(url, session=None, limiter=None, cache=None, deadline=None):
+    cache = cache or get_http_cache()
+    identifier = urlparse(url).path.rstrip('/').split('/')[-1]  # ignores ?date= on historical snapshots
+    df_name = f"df_{identifier.replace('-', '_')}"[:31]
 
-    response = requests.get(url, headers=headers)
+    try:
+        response = fetch(url, session=session, limiter=limiter,
+                         headers=cache.conditional_headers(url, CACHE_NAMESPACE), deadline=deadline)
+    except requests.RequestException as e:
+        logging.error("Failed to retrieve %s: %s", url, e)
+        return None, None
     print(f"Request to {url} returned status code: {response.status_code}")
 
+    # Page unchanged since the last run: reuse the validated snapshot without parsing
+    cached_df = cache.lookup(url, response, CACHE_NAMESPACE)
+    if cached_df is not None:
+        count(rows_out=len(cached_df))
+        return cached_df, df_name
+
     if response.status_code != 200:
-        logging.error(f"Failed to retrieve {url}. Status code: {response.status_code}")
+        logging.error("Failed to retrieve %s. Status code: %s", url, response.status_code)
         return None, None
 
-    soup = BeautifulSoup(response.content, 'html.parser')
-    table = soup.find('table')
+    table = extract_table(response.content)
 
     if table is None:
-        logging.error(f"No table found on the page: {url}")
+        logging.error("No table found on the page: %s", url)
         return None, None
 
-    headers = [th.text.strip() for th in table.find_all('th')]
-    rows = [[td.text.strip() for td in tr.find_all('td')] for tr in table.find_all('tr')[1:]]
-
-    df = pd.DataFrame(rows, columns=headers)
-    identifier = url.split('/')[-1]
-    df_name = f"df_{identifier.replace('-', '_')}"[:31]
-
-    time.sleep(5)
+    headers, rows = table
+    df, failed_casts = typed_stat_frame(headers, rows, identifier)
+    if 'Team' in df.columns:
+        df['Team ID'] = NFL_REGISTRY.team_ids(df['Team'])
 
-    if not run_validations(df, df_name, required_columns=headers):
-        logging.error(f"Validation failed for {df_name}")
+    # Stat cells may be blank ('--') or fail to parse (counted above); only the team must be present
+    if not validate_frame(df, df_name, stat_rules(identifier, tuple(df.columns), len(NFL_REGISTRY))):
+        logging.error("Validation failed for %s", df_name)
         return None, None
+    count(failed_casts=sum(failed_casts.values()))
 
+    cache.store(url, response, df, CACHE_NAMESPACE)
+    count(rows_out=len(df))
     return df, df_name
 
 
+# Scrape several URLs concurrently within one fetch deadline; results keep the order of `urls`.
+# Requests go through the shared per-host limiter (NFL_SCRAPE_RATE/NFL_SCRAPE_BURST) unless one is given.
+def scrape_all(urls, max_workers=SCRAPE_WORKERS, limiter=None, deadline=None):
+    session = get_session(max_workers)
+    limiter = limiter or get_rate_limiter()
+    deadline = deadline or Deadline()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(bind_span(lambda url: scrape_to_df(url, session, limiter, deadline=deadline)), urls))
+
+    return [(df, df_name) for df, df_name in results if df is not None]
+
+
 def save_dfs_to_excel(dfs, file_name="nfl_stats.xlsx"):
     with pd.ExcelWriter(file_name, engine='xlsxwriter') as writer:
         for df, df_name in dfs:
@@ -56,33 +98,28 @@ def save_dfs_to_excel(dfs, file_name="nfl_stats.xlsx"):
     print(f"DataFrames saved to {file_name}")
 
 
+# Hand the stats to the next stage through the stage store; the workbook is an optional export
+def save_stats(dfs, file_name="nfl_stats.xlsx"):
+    if EXPORT_EXCEL:
+        save_dfs_to_excel(dfs, file_name)
+    write_stage('nfl_stats', {df_name: df for df, df_name in dfs})
+
+
 def main():
-    urls = [
-        "https://www.teamrankings.com/nfl/stat/points-per-game",
-        "https://www.teamrankings.com/nfl/stat/opponent-points-per-game",
-        "https://www.teamrankings.com/nfl/stat/sacks-per-game",
-        "https://www.teamrankings.com/nfl/stat/third-down-conversion-pct",
-        "https://www.teamrankings.com/nfl/stat/qb-sacked-per-game",
-        "https://www.teamrankings.com/nfl/stat/opponent-third-down-conversion-pct",
-        "https://www.teamrankings.com/nfl/stat/turnover-margin-per-game",
-        "https://www.teamrankings.com/nfl/stat/penalty-yards-per-game",
-        "https://www.teamrankings.com/nfl/stat/red-zone-scoring-pct",
-        "https://www.teamrankings.com/nfl/stat/opponent-red-zone-scores-per-game"
-    ]
-
-    all_dfs = []
-    for url in urls:
-        df, df_name = scrape_to_df(url)
-        if df is not None:
-            print(f"DataFrame Name: {df_name}")
-            print(df.head())
-            all_dfs.append((df, df_name))
+
+    all_dfs = scrape_all(STAT_URLS)
+    for df, df_name in all_dfs:
+        print(f"DataFrame Name: {df_name}")
+        print(df.head())
 
     try:
-        save_dfs_to_excel(all_dfs)
+        save_stats(all_dfs)
+        logging.info("HTTP cache stats: %s", get_http_cache().stats())
         logging.info("ETL nfl_scrapper pipeline completed successfully.")
     except Exception as e:
-        logging.error(f"ETL nfl_scrapper pipeline failed: {e}")
+        logging.error("ETL nfl_scrapper pipeline failed: %s", e)
+
+    return all_dfs
 
 
 if __name__ == "__main__":
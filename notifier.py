@@ -0,0 +1,186 @@
+# notifier.py
+
+import os
+import time
+import queue
+import atexit
+import logging
+import threading
+
+# SMTP settings, overridable from .env. For a local stand-in (e.g. python -m aiosmtpd -n -l 127.0.0.1:8025)
+# set NFL_SMTP_HOST/NFL_SMTP_PORT and NFL_SMTP_STARTTLS=0; without EMAIL_PASSWORD there is no login.
+SMTP_HOST = os.getenv('NFL_SMTP_HOST', 'smtp.gmail.com')
+SMTP_PORT = int(os.getenv('NFL_SMTP_PORT', '587'))
+SMTP_STARTTLS = os.getenv('NFL_SMTP_STARTTLS', '1') == '1'
+SMTP_TIMEOUT = float(os.getenv('NFL_SMTP_TIMEOUT', '30'))
+# The connection is kept open between messages and closed after this long without one
+SMTP_IDLE_SECONDS = float(os.getenv('NFL_SMTP_IDLE_SECONDS', '300'))
+NOTIFY_RETRIES = int(os.getenv('NFL_NOTIFY_RETRIES', '3'))
+NOTIFY_BACKOFF = float(os.getenv('NFL_NOTIFY_BACKOFF', '2'))  # seconds, doubled on each retry
+# 0 sends every notification at once; otherwise non-urgent ones are collected into one digest per window
+DIGEST_MINUTES = float(os.getenv('NFL_NOTIFY_DIGEST_MINUTES', '0'))
+CLOSE_TIMEOUT = float(os.getenv('NFL_NOTIFY_CLOSE_TIMEOUT', '60'))
+
+_lock = threading.Lock()
+_notifier = None
+
+
+# Background dispatcher: callers enqueue emails (and other slow reporting calls such as the Run_Log
+# append) and return immediately; one worker thread delivers them over a reused SMTP connection.
+class Notifier:
+    def __init__(self, sender=None, receiver=None, password=None, digest_minutes=DIGEST_MINUTES,
+                 retries=NOTIFY_RETRIES, backoff=NOTIFY_BACKOFF, host=SMTP_HOST, port=SMTP_PORT,
+                 starttls=SMTP_STARTTLS):
+        self.sender = sender or os.getenv('EMAIL')
+        self.receiver = receiver or os.getenv('RECEIVER_EMAIL')
+        self.password = password if password is not None else os.getenv('EMAIL_PASSWORD')
+        self.digest_minutes = digest_minutes
+        self.retries = retries
+        self.backoff = backoff
+        self.host, self.port, self.starttls = host, port, starttls
+        self.queue = queue.Queue()
+        self.digest = []  # (time, subject, body) waiting for the next digest
+        self.digest_due = None
+        self.smtp = None
+        self.stats = {'sent': 0, 'failed': 0, 'retries': 0, 'connections': 0, 'digests': 0, 'jobs': 0}
+        self.thread = threading.Thread(target=self._run, name='notifier', daemon=True)
+        self.thread.start()
+
+    def notify(self, subject: str, body: str, urgent: bool = False):
+        self.queue.put(('email', (subject, body, urgent)))
+
+    # Run func(*args) on the dispatcher thread, e.g. a Sheets append that should not hold up the caller
+    def submit(self, func, *args):
+        self.queue.put(('job', (func, args)))
+
+    # Deliver everything queued (and a pending digest), then close the connection
+    def close(self, timeout: float = CLOSE_TIMEOUT):
+        self.queue.put(('close', None))
+        self.thread.join(timeout)
+        if self.thread.is_alive():
+            logging.warning("Notifier still busy after %ss; %d item(s) not delivered", timeout, self.queue.qsize())
+
+    def _run(self):
+        while True:
+            if self.digest_due is not None:
+                wait = max(0.0, self.digest_due - time.time())
+            else:
+                wait = SMTP_IDLE_SECONDS if self.smtp is not None else None
+            try:
+                kind, item = self.queue.get(timeout=wait)
+            except queue.Empty:
+                if self.digest_due is not None and time.time() >= self.digest_due:
+                    self._send_digest()
+                else:
+                    self._disconnect()
+                continue
+
+            if kind == 'close':
+                self._send_digest()
+                self._disconnect()
+                return
+            if kind == 'job':
+                func, args = item
+                try:
+                    func(*args)
+                    self.stats['jobs'] += 1
+                except Exception as e:
+                    logging.error("Notifier job %s failed: %s", getattr(func, '__name__', func), e)
+                continue
+
+            subject, body, urgent = item
+            if self.digest_minutes > 0 and not urgent:
+                self.digest.append((time.strftime('%Y-%m-%d %H:%M:%S'), subject, body))
+                if self.digest_due is None:
+                    self.digest_due = time.time() + self.digest_minutes * 60
+            else:
+                self._deliver(subject, body)
+
+    def _send_digest(self):
+        entries, self.digest, self.digest_due = self.digest, [], None
+        if not entries:
+            return
+        subject = f"NFL Pipeline digest: {len(entries)} notification(s)"
+        body = '\n\n'.join(f"[{stamp}] {subject}\n{body}" for stamp, subject, body in entries)
+        if self._deliver(subject, body):
+            self.stats['digests'] += 1
+
+    def _connect(self):
+        import smtplib
+
+        smtp = smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT)
+        if self.starttls:
+            smtp.starttls()
+        if self.password:
+            smtp.login(self.sender, self.password)
+        self.stats['connections'] += 1
+        return smtp
+
+    def _disconnect(self):
+        if self.smtp is None:
+            return
+        try:
+            self.smtp.quit()
+        except Exception:
+            pass  # already dropped by the server
+        self.smtp = None
+
+    def _message(self, subject, body):
+        from email.mime.multipart import MIMEMultipart
+        from email.mime.text import MIMEText
+
+        msg = MIMEMultipart()
+        msg['From'] = self.sender
+        msg['To'] = self.receiver
+        msg['Subject'] = subject
+        msg.attach(MIMEText(body, 'plain'))
+        return msg
+
+    # Bounded retries with exponential backoff; a dropped connection is reopened on the next attempt.
+    # Rejected credentials are not retried.
+    def _deliver(self, subject, body) -> bool:
+        import smtplib
+
+        msg = self._message(subject, body)
+        for attempt in range(self.retries + 1):
+            try:
+                if self.smtp is None:
+                    self.smtp = self._connect()
+                self.smtp.send_message(msg)
+                self.stats['sent'] += 1
+                logging.info("Email sent: %s", subject)
+                return True
+            except smtplib.SMTPAuthenticationError as e:
+                self._disconnect()
+                logging.error("Failed to send email '%s': SMTP login rejected: %s", subject, e)
+                break
+            except (smtplib.SMTPException, OSError) as e:
+                self._disconnect()
+                if attempt == self.retries:
+                    logging.error("Failed to send email '%s' after %d attempt(s): %s", subject, attempt + 1, e)
+                    break
+                delay = self.backoff * 2 ** attempt
+                self.stats['retries'] += 1
+                logging.warning("Sending email '%s' failed (%s), retrying in %.1fs", subject, e, delay)
+                time.sleep(delay)
+        self.stats['failed'] += 1
+        return False
+
+
+# One dispatcher per process, created on first use; options only apply to that first call.
+# Flushed at exit, before the logging listener stops.
+def get_notifier(**options) -> Notifier:
+    global _notifier
+    with _lock:
+        if _notifier is None:
+            _notifier = Notifier(**options)
+            atexit.register(close_notifier)
+        return _notifier
+
+
+def close_notifier():
+    global _notifier
+    with _lock:
+        notifier, _notifier = _notifier, None
+    if notifier is not None:
+        notifier.close()
@@ -0,0 +1,134 @@
+# pipeline_dag.py
+
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from fingerprints import fingerprint_paths
+from instrumentation import span, skipped_span, profiled, bind_span
+
+FAIL_FAST = 'fail-fast'
+CONTINUE = 'continue'
+OK_STATUSES = ('success', 'unchanged')
+
+
+class StageError(Exception):
+    """Raised by a stage function to mark its stage as failed."""
+
+
+# A pipeline step: func(inputs) receives {dependency name: dependency result} and returns its own result.
+# `inputs`/`outputs` are artifact paths; a stage with declared inputs can be skipped when they are unchanged.
+class Stage:
+    def __init__(self, name, func, deps=(), inputs=(), outputs=()):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+
+
+class StageResult:
+    def __init__(self, name, status, value=None, error=None, duration=0.0):
+        self.name = name
+        self.status = status  # 'success', 'unchanged', 'failed' or 'skipped'
+        self.value = value
+        self.error = error
+        self.duration = duration
+
+    def __repr__(self):
+        return f"StageResult({self.name!r}, {self.status!r}, duration={self.duration:.2f})"
+
+
+def _check_graph(stages):
+    names = {stage.name for stage in stages}
+    for stage in stages:
+        missing = [dep for dep in stage.deps if dep not in names]
+        if missing:
+            raise ValueError(f"Stage '{stage.name}' depends on unknown stages: {missing}")
+
+
+# Select the stages to run: `only` runs exactly those, `targets` adds everything upstream of them
+def select_stages(stages, targets=None, only=None):
+    _check_graph(stages)
+    by_name = {stage.name: stage for stage in stages}
+    for name in list(targets or []) + list(only or []):
+        if name not in by_name:
+            raise ValueError(f"Unknown stage '{name}'. Known stages: {list(by_name)}")
+
+    if only:
+        selected = set(only)
+    elif targets:
+        selected = set()
+        pending = list(targets)
+        while pending:
+            name = pending.pop()
+            if name not in selected:
+                selected.add(name)
+                pending.extend(by_name[name].deps)
+    else:
+        selected = set(by_name)
+    return [stage for stage in stages if stage.name in selected]
+
+
+# Run stages in one process; a stage starts as soon as all of its selected dependencies succeeded.
+# Dependencies outside `stages` are treated as already satisfied (the stage loads their artifacts).
+# With a manifest, stages whose declared inputs are unchanged are not run unless `force` is set.
+# Each stage that runs is recorded as a 'stage' span, optionally profiled (see instrumentation);
+# stages that do not run get a zero-duration 'stage' span with status 'skipped'.
+# `seed` supplies values for dependencies outside `stages` that are already in memory.
+def run_dag(stages, policy=FAIL_FAST, max_workers=4, manifest=None, force=False, seed=None):
+    selected = {stage.name for stage in stages}
+    seed = seed or {}
+    results = {}
+    pending = list(stages)
+    running = {}
+    stop = False
+
+    def run_stage(stage, inputs):
+        start = time.perf_counter()
+        inputs_fp = fingerprint_paths(stage.inputs) if manifest is not None and stage.inputs else None
+        if inputs_fp is not None and not force and manifest.is_unchanged(stage, inputs_fp):
+            logging.info(f"Stage '{stage.name}' skipped: inputs unchanged")
+            skipped_span(stage.name, kind='stage')
+            return StageResult(stage.name, 'unchanged', duration=time.perf_counter() - start)
+
+        logging.info(f"Stage '{stage.name}' started")
+        try:
+            with span(stage.name, kind='stage'), profiled(stage.name):
+                value = stage.func(inputs)
+        except Exception as e:
+            duration = time.perf_counter() - start
+            logging.error(f"Stage '{stage.name}' failed after {duration:.2f}s: {e}")
+            return StageResult(stage.name, 'failed', error=e, duration=duration)
+        if inputs_fp is not None:
+            manifest.record(stage, inputs_fp)
+        duration = time.perf_counter() - start
+        logging.info(f"Stage '{stage.name}' completed in {duration:.2f}s")
+        return StageResult(stage.name, 'success', value=value, duration=duration)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            for stage in list(pending):
+                deps = [dep for dep in stage.deps if dep in selected]
+                if stop or any(dep in results and results[dep].status not in OK_STATUSES for dep in deps):
+                    pending.remove(stage)
+                    results[stage.name] = StageResult(stage.name, 'skipped')
+                    logging.warning(f"Stage '{stage.name}' skipped")
+                    skipped_span(stage.name, kind='stage')
+                elif all(dep in results for dep in deps):
+                    pending.remove(stage)
+                    inputs = {dep: results[dep].value for dep in deps}
+                    inputs.update({dep: seed[dep] for dep in stage.deps if dep not in selected and dep in seed})
+                    running[executor.submit(bind_span(run_stage), stage, inputs)] = stage
+
+            if not running:
+                if pending:
+                    raise ValueError(f"Dependency cycle between stages: {[stage.name for stage in pending]}")
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                results[running.pop(future).name] = result
+                if result.status == 'failed' and policy == FAIL_FAST:
+                    stop = True
+
+    return [results[stage.name] for stage in stages]
@@ -0,0 +1,176 @@
+# pipeline_logging.py
+
+import os
+import copy
+import json
+import queue
+import atexit
+import logging
+import threading
+import multiprocessing
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from instrumentation import current_ids
+
+LOG_FILE = os.getenv('NFL_LOG_FILE', 'nfl_pipeline.log')
+LOG_LEVEL = os.getenv('NFL_LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.getenv('NFL_LOG_FORMAT', 'json')  # 'json' or 'text'
+LOG_ARCHIVE_DIR = os.getenv('NFL_LOG_ARCHIVE_DIR', 'logs')
+LOG_MAX_MB = float(os.getenv('NFL_LOG_MAX_MB', '10'))
+LOG_ARCHIVES = int(os.getenv('NFL_LOG_ARCHIVES', '20'))
+# Per-key sampling for repetitive messages: the first N are logged, then one in every M
+SAMPLE_FIRST = int(os.getenv('NFL_LOG_SAMPLE_FIRST', '5'))
+SAMPLE_EVERY = int(os.getenv('NFL_LOG_SAMPLE_EVERY', '100'))
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+_lock = threading.Lock()
+_listener = None
+_file_handler = None
+_sample_counts = {}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'run_id': getattr(record, 'run_id', None),
+            'stage': getattr(record, 'stage', None),
+            'module': record.module,
+            'line': record.lineno,
+            'thread': record.threadName,
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+# Runs in the calling thread before the record is queued, where the current span is known
+class ContextFilter(logging.Filter):
+    def filter(self, record):
+        record.run_id, record.stage = current_ids()
+        return True
+
+
+# The stock prepare() formats the message in the calling thread and drops the traceback, so
+# JsonFormatter never saw exc_info. This keeps msg and args apart for the listener to format, and
+# renders only the traceback to exc_text here: exc_info holds live frames and must not be queued.
+class StructuredQueueHandler(QueueHandler):
+    def prepare(self, record):
+        record = copy.copy(record)
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+# Size-based rotation into timestamped files under LOG_ARCHIVE_DIR. Archived files never
+# change again, so the content-addressed backups store each of them exactly once.
+class ArchivingFileHandler(RotatingFileHandler):
+    def __init__(self, filename, archive_dir, max_bytes, archives):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=archives, encoding='utf-8', delay=True)
+        self.archive_dir = archive_dir
+
+    def doRollover(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        if os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename) > 0:
+            os.makedirs(self.archive_dir, exist_ok=True)
+            stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+            name, ext = os.path.splitext(os.path.basename(self.baseFilename))
+            os.replace(self.baseFilename, os.path.join(self.archive_dir, f"{name}-{stamp}{ext}"))
+            archived = sorted(archived_logs(self.archive_dir))
+            for old in archived[:max(len(archived) - self.backupCount, 0)]:
+                os.remove(old)
+        self.stream = self._open()
+
+
+def archived_logs(archive_dir: str = LOG_ARCHIVE_DIR) -> list:
+    if not os.path.isdir(archive_dir):
+        return []
+    name = os.path.splitext(os.path.basename(LOG_FILE))[0]
+    return [os.path.join(archive_dir, f) for f in os.listdir(archive_dir) if f.startswith(f"{name}-")]
+
+
+# Root logging for every entry point: callers only enqueue records, a listener thread formats
+# and writes them. Safe to call repeatedly. Pool worker processes append to the same file but
+# never rotate it; rotation belongs to the main process.
+def setup_logging():
+    global _listener, _file_handler
+    with _lock:
+        if _listener is not None:
+            return _listener
+
+        if multiprocessing.parent_process() is None:
+            _file_handler = ArchivingFileHandler(LOG_FILE, LOG_ARCHIVE_DIR, int(LOG_MAX_MB * 1024 * 1024),
+                                                 LOG_ARCHIVES)
+            file_handler = _file_handler
+        else:
+            file_handler = logging.FileHandler(LOG_FILE, encoding='utf-8', delay=True)
+        file_handler.setFormatter(JsonFormatter() if LOG_FORMAT == 'json' else logging.Formatter(TEXT_FORMAT))
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = StructuredQueueHandler(log_queue)
+        queue_handler.addFilter(ContextFilter())
+        root = logging.getLogger()
+        root.setLevel(LOG_LEVEL)
+        root.addHandler(queue_handler)
+
+        _listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+        return _listener
+
+
+# After a fork (e.g. daemonizing) the listener thread is gone: drop the old queue and start over
+def restart_logging():
+    global _listener, _file_handler
+    with _lock:
+        root = logging.getLogger()
+        for handler in [h for h in root.handlers if isinstance(h, QueueHandler)]:
+            root.removeHandler(handler)
+        _listener = None
+        _file_handler = None
+    return setup_logging()
+
+
+def shutdown_logging():
+    global _listener
+    with _lock:
+        listener, _listener = _listener, None
+    if listener is None:
+        return
+    suppressed = {key: n - SAMPLE_FIRST - (n - SAMPLE_FIRST) // SAMPLE_EVERY
+                  for key, n in _sample_counts.items() if n > SAMPLE_FIRST}
+    if suppressed:
+        logging.info("Sampled log messages suppressed: %s", suppressed)
+    listener.stop()
+
+
+# Close the live log into the archive now, e.g. before a backup. Returns the archived paths.
+def rotate_log() -> list:
+    if _file_handler is None:
+        return archived_logs()
+    _file_handler.acquire()
+    try:
+        _file_handler.doRollover()
+    finally:
+        _file_handler.release()
+    return archived_logs()
+
+
+# For per-row and per-item messages: the first SAMPLE_FIRST per key, then one in SAMPLE_EVERY.
+# Arguments are only formatted when the message is actually written.
+def log_sampled(level: int, key: str, msg: str, *args):
+    with _lock:
+        n = _sample_counts[key] = _sample_counts.get(key, 0) + 1
+    if n <= SAMPLE_FIRST:
+        logging.log(level, msg, *args, stacklevel=2)
+    elif (n - SAMPLE_FIRST) % SAMPLE_EVERY == 0:
+        logging.log(level, msg + " (%d similar so far)", *args, n, stacklevel=2)
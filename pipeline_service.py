@@ -0,0 +1,258 @@
+import os
+import sys
+import json
+import time
+import signal
+import logging
+import argparse
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import run_all_nfl_scripts as pipeline
+import nfl_scrapper
+import schedule_scrapper
+from fetch_utils import get_circuit_breaker
+from fingerprints import FingerprintManifest
+from gsheets_client import client_stats
+from http_cache import get_http_cache
+from notifier import get_notifier, close_notifier
+from instrumentation import start_run, span, bind_span
+from pipeline_dag import select_stages, run_dag, FAIL_FAST
+from pipeline_logging import setup_logging, restart_logging
+
+setup_logging()
+
+# Poll cadence, overridable from .env: minutes between polls, and on game days (three-letter day names)
+POLL_MINUTES = float(os.getenv('NFL_POLL_MINUTES', '60'))
+GAMEDAY_POLL_MINUTES = float(os.getenv('NFL_GAMEDAY_POLL_MINUTES', '10'))
+GAME_DAYS = os.getenv('NFL_GAME_DAYS', 'Thu,Sun,Mon')
+SERVICE_HOST = os.getenv('NFL_SERVICE_HOST', '127.0.0.1')
+SERVICE_PORT = int(os.getenv('NFL_SERVICE_PORT', '8787'))
+PID_FILE = os.getenv('NFL_SERVICE_PID_FILE', 'nfl_service.pid')
+# Success emails from frequent polls are collected into one digest per window; failures go out at once
+SERVICE_DIGEST_MINUTES = float(os.getenv('NFL_SERVICE_DIGEST_MINUTES', '60'))
+SCRAPER_STAGES = ('nfl_scrapper', 'schedule_scrapper')
+# Renders the Run_Log, so it only runs in polls that ran something to log
+DASHBOARD_STAGE = 'generate_html_dashboard'
+
+
+# Long-running pipeline: imports, the HTTP session, the Sheets client and the parsed pages stay warm.
+# Each poll re-requests the sources with conditional GETs; an unchanged page comes back as the very
+# same DataFrame from the in-memory cache, so only sources that really changed are saved. The
+# downstream stages then run against the fingerprint manifest, which skips those whose stage-store
+# inputs are unchanged; a stage that failed was not recorded there, so the next poll retries it.
+class PipelineService:
+    def __init__(self, poll_minutes=POLL_MINUTES, gameday_poll_minutes=GAMEDAY_POLL_MINUTES,
+                 game_days=GAME_DAYS, workers=4, digest_minutes=SERVICE_DIGEST_MINUTES):
+        self.poll_minutes = poll_minutes
+        self.gameday_poll_minutes = gameday_poll_minutes
+        self.game_days = {day.strip().lower()[:3] for day in game_days.split(',') if day.strip()}
+        self.workers = workers
+        self.digest_minutes = digest_minutes
+        self.frames = {}  # last value of each scraper stage
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        self.state = {
+            'state': 'starting',
+            'started_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'polls': 0,
+            'runs': 0,
+            'failures': 0,
+            'last_poll': None,
+            'last_success': None,
+            'last_change': None,
+            'next_poll': None,
+            'last_error': None,
+            'last_results': [],
+        }
+
+    def _update(self, **fields):
+        with self.lock:
+            self.state.update(fields)
+
+    def interval_seconds(self, now: datetime) -> float:
+        minutes = self.gameday_poll_minutes if now.strftime('%a').lower() in self.game_days else self.poll_minutes
+        return minutes * 60
+
+    def _changed(self, stage: str, value) -> bool:
+        previous = self.frames.get(stage)
+        if stage == 'nfl_scrapper':
+            return previous is None or previous.keys() != value.keys() or any(
+                value[name] is not previous[name] for name in value)
+        return value is not previous
+
+    def _scrape(self):
+        def scrape_stats():
+            with span('nfl_scrapper', kind='stage'):
+                return nfl_scrapper.scrape_all(nfl_scrapper.STAT_URLS)
+
+        def scrape_schedule():
+            with span('schedule_scrapper', kind='stage'):
+                return schedule_scrapper.scrape_current_week_schedule(schedule_scrapper.SCHEDULE_URL)
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            stats = executor.submit(bind_span(scrape_stats))
+            schedule = executor.submit(bind_span(scrape_schedule))
+            return stats.result(), schedule.result()
+
+    # One poll: refresh both sources, save the ones that changed, then run what depends on the store
+    def poll(self):
+        start_time = time.time()
+        run_id = start_run()
+        with span('pipeline', kind='run'):
+            all_dfs, schedule_df = self._scrape()
+            changed = []
+            stats = {df_name: df for df, df_name in all_dfs}
+            if stats and self._changed('nfl_scrapper', stats):
+                nfl_scrapper.save_stats(all_dfs)
+                self.frames['nfl_scrapper'] = stats
+                changed.append('nfl_scrapper')
+            if schedule_df is not None and self._changed('schedule_scrapper', schedule_df):
+                if schedule_scrapper.save_schedule(schedule_df):
+                    self.frames['schedule_scrapper'] = schedule_df
+                    changed.append('schedule_scrapper')
+
+            now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            with self.lock:
+                self.state['polls'] += 1
+                self.state['last_poll'] = now
+            if not stats or schedule_df is None:
+                raise RuntimeError("A source could not be scraped; keeping the last good data.")
+
+            # A source saved by an earlier poll whose other scrape failed, or a stage that failed last
+            # time, is picked up here even when no page changed in this poll
+            manifest = FingerprintManifest()
+            downstream = [stage.name for stage in pipeline.STAGES
+                          if stage.name not in SCRAPER_STAGES and stage.name != DASHBOARD_STAGE]
+            results = run_dag(select_stages(pipeline.STAGES, only=downstream), policy=FAIL_FAST,
+                              max_workers=self.workers, manifest=manifest, seed=self.frames)
+            if all(result.status == 'unchanged' for result in results):
+                logging.info("Poll %s: sources and stage inputs unchanged, nothing to run", run_id)
+                self._update(last_success=now)
+                return []
+
+            logging.info("Poll %s: changed sources %s, downstream stages run", run_id, changed)
+            results += run_dag(select_stages(pipeline.STAGES, only=[DASHBOARD_STAGE]), policy=FAIL_FAST,
+                               max_workers=1, manifest=manifest, seed=self.frames)
+
+        pipeline.report_run(run_id, results, start_time)
+        failed = [result.name for result in results if result.status == 'failed']
+        with self.lock:
+            self.state['runs'] += 1
+            self.state['last_change'] = now
+            self.state['last_results'] = [{'stage': result.name, 'status': result.status,
+                                           'duration': round(result.duration, 2)} for result in results]
+            if failed:
+                self.state['failures'] += 1
+                self.state['last_error'] = f"Failed stages: {failed}"
+            else:
+                self.state['last_success'] = now
+        return results
+
+    # Healthy while polls keep succeeding: the last success is at most two poll intervals old
+    def health(self):
+        status = self.status()
+        reference = status['last_success'] or status['started_at']
+        age = (datetime.now() - datetime.strptime(reference, '%Y-%m-%d %H:%M:%S')).total_seconds()
+        healthy = status['state'] == 'running' and age <= 2 * self.interval_seconds(datetime.now()) + 60
+        return healthy, {'healthy': healthy, 'state': status['state'], 'last_success': status['last_success'],
+                         'last_error': status['last_error']}
+
+    def status(self) -> dict:
+        with self.lock:
+            status = json.loads(json.dumps(self.state))
+        status['http_cache'] = get_http_cache().stats()
+        status['circuits'] = get_circuit_breaker().state()
+        status['google_api'] = client_stats()
+        status['notifier'] = dict(get_notifier().stats)
+        return status
+
+    def run_forever(self, host=SERVICE_HOST, port=SERVICE_PORT):
+        get_notifier(digest_minutes=self.digest_minutes)
+        server = ThreadingHTTPServer((host, port), StatusHandler)
+        server.service = self
+        threading.Thread(target=server.serve_forever, name='status-server', daemon=True).start()
+        logging.info("Pipeline service started; status on http://%s:%s/status", host, port)
+        self._update(state='running')
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    self.poll()
+                except Exception as e:
+                    logging.exception("Poll failed: %s", e)
+                    with self.lock:
+                        self.state['failures'] += 1
+                        self.state['last_error'] = str(e)
+                wait = self.interval_seconds(datetime.now())
+                self._update(next_poll=(datetime.now() + timedelta(seconds=wait)).strftime('%Y-%m-%d %H:%M:%S'))
+                self.stop_event.wait(wait)
+        finally:
+            self._update(state='stopped', next_poll=None)
+            server.shutdown()
+            server.server_close()
+            close_notifier()  # deliver the pending digest
+            logging.info("Pipeline service stopped")
+
+    # Signal handler: let the current poll finish, then leave the loop
+    def stop(self, signum=None, frame=None):
+        logging.info("Pipeline service stopping (signal %s)", signum)
+        self._update(state='stopping')
+        self.stop_event.set()
+
+
+# GET /health -> 200 or 503; GET /status -> counters, last results, cache and API stats
+class StatusHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        service = self.server.service
+        if self.path == '/health':
+            healthy, body = service.health()
+            code = 200 if healthy else 503
+        elif self.path == '/status':
+            code, body = 200, service.status()
+        else:
+            code, body = 404, {'error': f"unknown path {self.path}"}
+        payload = json.dumps(body, indent=2).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        logging.debug("Status endpoint: " + format, *args)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the NFL pipeline as a long-running polling service.")
+    parser.add_argument('--once', action='store_true', help="poll a single time and exit")
+    parser.add_argument('--daemon', action='store_true', help="detach from the terminal (POSIX, python-daemon)")
+    parser.add_argument('--port', type=int, default=SERVICE_PORT, help="status endpoint port")
+    parser.add_argument('--workers', type=int, default=4, help="stages allowed to run at the same time")
+    args = parser.parse_args(argv)
+
+    service = PipelineService(workers=args.workers)
+    if args.once:
+        results = service.poll()
+        return 1 if any(result.status == 'failed' for result in results) else 0
+
+    if args.daemon:
+        import daemon
+        from daemon.pidfile import TimeoutPIDLockFile
+
+        context = daemon.DaemonContext(working_directory=os.getcwd(), umask=0o022,
+                                       pidfile=TimeoutPIDLockFile(os.path.abspath(PID_FILE)),
+                                       signal_map={signal.SIGTERM: service.stop, signal.SIGINT: service.stop})
+        with context:
+            restart_logging()  # the listener thread does not survive the fork
+            service.run_forever(port=args.port)
+        return 0
+
+    signal.signal(signal.SIGTERM, service.stop)
+    signal.signal(signal.SIGINT, service.stop)
+    service.run_forever(port=args.port)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,334 @@
+# query_service.py
+#
+# Read-only JSON API over the latest pipeline artifacts for internal tools, served by asyncio.
+# Usage: python query_service.py [--port 8788]
+#   GET /teams                              team names
+#   GET /teams/<team>                       ranks, percentiles, composite and this week's opponent
+#   GET /matchup?team1=<team>&team2=<team>  any pairing, scheduled or hypothetical
+#   GET /leaderboard/<stat>?limit=10        a stat by slug or sheet name, or 'composite'
+#   GET /history/<team>                     backfilled weeks for the team
+#   GET /health, GET /stats                 liveness, cache and reload counters
+
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+from collections import OrderedDict
+from urllib.parse import urlsplit, parse_qs, unquote
+import numpy as np
+import pandas as pd
+import matchup_stats
+from matchup_engine import sheet_name
+from stage_store import load_stage_or_excel, stage_mtime
+from pipeline_logging import setup_logging
+
+setup_logging()
+
+QUERY_HOST = os.getenv('NFL_QUERY_HOST', '127.0.0.1')
+QUERY_PORT = int(os.getenv('NFL_QUERY_PORT', '8788'))
+QUERY_CACHE_SIZE = int(os.getenv('NFL_QUERY_CACHE_SIZE', '1024'))
+# How often to look for newly published artifacts (the stage manifests, written last)
+RELOAD_SECONDS = float(os.getenv('NFL_QUERY_RELOAD_SECONDS', '5'))
+BACKFILL_OUTPUT = os.path.join(os.getenv('NFL_BACKFILL_DIR', 'backfill'), 'output')
+# Stage artifacts and the Excel files read in their place when a stage is missing or older
+ARTIFACT_STAGES = {'nfl_stats': matchup_stats.STATS_FILE, 'nfl_output': 'nfl_output.xlsx'}
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error',
+           503: 'Service Unavailable'}
+
+
+class NotFound(LookupError):
+    """Raised for an unknown team, stat or endpoint; answered with a 404."""
+
+
+# Encoded responses by request target, least recently used evicted first. Only touched from the
+# event loop, so it needs no lock.
+class LRUCache:
+    def __init__(self, max_entries=QUERY_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self) -> dict:
+        return {'entries': len(self.entries), 'max_entries': self.max_entries, 'hits': self.hits,
+                'misses': self.misses}
+
+
+# Changes whenever the pipeline or a backfill publishes new artifacts, or an Excel fallback is replaced
+def artifact_version() -> tuple:
+    backfill_mtime = None
+    if os.path.isdir(BACKFILL_OUTPUT):
+        backfill_mtime = max(os.path.getmtime(root) for root, _, _ in os.walk(BACKFILL_OUTPUT))
+    excel_mtimes = [os.path.getmtime(path) if os.path.exists(path) else None for path in ARTIFACT_STAGES.values()]
+    return tuple(stage_mtime(stage) for stage in ARTIFACT_STAGES) + tuple(excel_mtimes) + (backfill_mtime,)
+
+
+# NaN, pd.NA and NumPy scalars as JSON-ready Python values
+def _clean(value):
+    if isinstance(value, dict):
+        return {key: _clean(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_clean(item) for item in value]
+    if isinstance(value, (np.integer, np.floating, float)) or value is pd.NA:
+        return None if pd.isna(value) else value.item() if hasattr(value, 'item') else value
+    return value
+
+
+# float32 stat columns are serialised at float32 precision (the shortest repr that round-trips in
+# float32), so 32.3 comes back as 32.3 and 41.2% as 0.412 rather than 32.29999923706055 or 32.299999
+def _records(df) -> list:
+    records = df.astype(object).where(df.notna(), None)
+    for column in df.select_dtypes('float32').columns:
+        values = [None if np.isnan(value) else float(str(value)) for value in df[column].to_numpy()]
+        records[column] = pd.Series(values, index=df.index, dtype=object)
+    return records.to_dict('records')
+
+
+# Opponent of every row in frames that list each match as a team1 row followed by a team2 row
+def _opponents(teams) -> np.ndarray:
+    return np.asarray(teams).reshape(-1, 2)[:, ::-1].ravel()
+
+
+# One immutable snapshot of the artifacts; the service swaps in a new one when they change
+class MatchupData:
+    def __init__(self):
+        self.version = artifact_version()
+        self.stats = matchup_stats.load_nfl_stats(matchup_stats.STATS_FILE)  # typed, as in the pipeline
+        self.matrix = matchup_stats.build_matchup_matrix(self.stats)
+        self.registry = self.matrix.registry
+
+        self.week = None
+        if stage_mtime('nfl_output') is not None or os.path.exists(ARTIFACT_STAGES['nfl_output']):
+            self.week = load_stage_or_excel('nfl_output', ARTIFACT_STAGES['nfl_output'])
+            self.week['Opponent'] = _opponents(self.week['Team'])
+            self.week_ids = self.registry.team_ids(self.week['Team'])
+
+        self.history = None
+        if self.version[-1] is not None:
+            from backfill import read_backfill
+
+            history = read_backfill()
+            history['Opponent'] = _opponents(history['Team'])
+            self.history = history.sort_values(['season', 'week'], kind='stable')
+            self.history_ids = self.registry.team_ids(self.history['Team'])
+
+    def team_id(self, name: str) -> int:
+        team_id = self.registry.team_id(name)
+        if team_id < 0:
+            raise NotFound(f"unknown team '{name}'")
+        return team_id
+
+    def teams(self) -> dict:
+        return {'teams': list(self.registry.names)}
+
+    def this_week(self, team_id: int):
+        if self.week is None:
+            return None
+        rows = self.week[self.week_ids == team_id]
+        return _records(rows)[0] if len(rows) else None
+
+    def team_profile(self, name: str) -> dict:
+        team_id = self.team_id(name)
+        matrix = self.matrix
+        return _clean({
+            'team': self.registry.team_name(team_id),
+            'composite': matrix.composites_for([team_id])[0],
+            'composite_percentile': matrix.composite_percentile[team_id],
+            'ranks': dict(zip(matrix.sheet_names, matrix.ranks_for([team_id])[0])),
+            'percentiles': dict(zip(matrix.sheet_names, matrix.percentiles[team_id])),
+            'this_week': self.this_week(team_id),
+        })
+
+    def matchup(self, team1: str, team2: str) -> dict:
+        team1_id, team2_id = self.team_id(team1), self.team_id(team2)
+        result = self.matrix.matchup(team1_id, team2_id)
+        week_row = self.this_week(team1_id)
+        scheduled = week_row is not None and self.registry.team_id(week_row['Opponent']) == team2_id
+        return _clean(dict(result, teams=[self.registry.team_name(team1_id), self.registry.team_name(team2_id)],
+                           scheduled=week_row['Match ID'] if scheduled else None))
+
+    def leaderboard(self, stat: str, limit: int) -> dict:
+        if stat == 'composite':
+            order = np.argsort(self.matrix.composite, kind='stable')[:limit]
+            rows = [{'Rank': rank + 1, 'Team': self.registry.names[i], 'Composite': self.matrix.composite[i]}
+                    for rank, i in enumerate(order) if not np.isnan(self.matrix.composite[i])]
+            return _clean({'stat': stat, 'rows': rows})
+        sheet = stat if stat in self.stats else sheet_name(stat)
+        if sheet not in self.stats:
+            raise NotFound(f"unknown stat '{stat}'")
+        df = self.stats[sheet].drop(columns='Team ID', errors='ignore')
+        df = df.iloc[np.argsort(pd.to_numeric(df['Rank'], errors='coerce').to_numpy(dtype=float, na_value=np.nan), kind='stable')[:limit]]
+        return {'stat': sheet, 'rows': _records(df)}
+
+    def team_history(self, name: str) -> dict:
+        team_id = self.team_id(name)
+        rows = [] if self.history is None else _records(self.history[self.history_ids == team_id])
+        return {'team': self.registry.team_name(team_id), 'weeks': rows}
+
+
+class QueryService:
+    def __init__(self, cache_size=QUERY_CACHE_SIZE, reload_seconds=RELOAD_SECONDS):
+        self.cache = LRUCache(cache_size)
+        self.reload_seconds = reload_seconds
+        self.data = None
+        self.reloads = 0
+        self.requests = 0
+        self.started = time.time()
+
+    # Loading runs off the event loop; requests keep using the old snapshot until the swap
+    async def reload(self):
+        start = time.perf_counter()
+        data = await asyncio.to_thread(MatchupData)
+        self.data = data
+        self.cache.clear()
+        self.reloads += 1
+        logging.info("Query service loaded artifacts %s in %.2fs", data.version, time.perf_counter() - start)
+
+    async def watch(self):
+        while True:
+            await asyncio.sleep(self.reload_seconds)
+            try:
+                if self.data is None or artifact_version() != self.data.version:
+                    await self.reload()
+            except Exception as e:
+                logging.error(f"Query service reload failed, keeping the previous artifacts: {e}")
+
+    def route(self, path: str, query: dict):
+        parts = [unquote(part) for part in path.strip('/').split('/')] if path.strip('/') else []
+        data = self.data
+        if data is None:
+            raise RuntimeError("artifacts not loaded yet")
+        if parts == ['teams']:
+            return data.teams()
+        if len(parts) == 2 and parts[0] == 'teams':
+            return data.team_profile(parts[1])
+        if parts == ['matchup']:
+            if 'team1' not in query or 'team2' not in query:
+                raise ValueError("team1 and team2 are required")
+            return data.matchup(query['team1'][0], query['team2'][0])
+        if len(parts) == 3 and parts[0] == 'matchup':
+            return data.matchup(parts[1], parts[2])
+        if len(parts) == 2 and parts[0] == 'leaderboard':
+            return data.leaderboard(parts[1], int(query.get('limit', ['10'])[0]))
+        if len(parts) == 2 and parts[0] == 'history':
+            return data.team_history(parts[1])
+        raise NotFound(f"no endpoint {path}")
+
+    # (status, body); successful query responses come from and go into the LRU cache
+    def respond(self, method: str, target: str):
+        self.requests += 1
+        if method != 'GET':
+            return 405, json.dumps({'error': f"{method} not allowed"}).encode('utf-8')
+        url = urlsplit(target)
+        if url.path == '/health':
+            status = 200 if self.data is not None else 503
+            return status, json.dumps({'healthy': status == 200}).encode('utf-8')
+        if url.path == '/stats':
+            return 200, json.dumps({'requests': self.requests, 'reloads': self.reloads,
+                                    'uptime': round(time.time() - self.started, 1), 'cache': self.cache.stats(),
+                                    'artifacts': self.data.version if self.data else None}).encode('utf-8')
+
+        body = self.cache.get(target)
+        if body is not None:
+            return 200, body
+        try:
+            body = json.dumps(self.route(url.path, parse_qs(url.query))).encode('utf-8')
+        except NotFound as e:
+            return 404, json.dumps({'error': str(e)}).encode('utf-8')
+        except ValueError as e:
+            return 400, json.dumps({'error': str(e)}).encode('utf-8')
+        except RuntimeError as e:
+            return 503, json.dumps({'error': str(e)}).encode('utf-8')
+        except Exception:
+            logging.exception("Query service error for %s", target)
+            return 500, json.dumps({'error': 'internal error'}).encode('utf-8')
+        self.cache.put(target, body)
+        return 200, body
+
+    # Minimal HTTP/1.1: GET requests without bodies, keep-alive unless the client asks to close
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, version = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    key, _, value = line.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = value.strip().lower()
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection') != 'close'
+
+                try:
+                    status, body = self.respond(method, target)
+                except Exception as e:
+                    logging.exception(f"Query service error for {target}: {e}")
+                    status, body = 500, json.dumps({'error': 'internal error'}).encode('utf-8')
+                writer.write(f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\nContent-Type: application/json\r\n"
+                             f"Content-Length: {len(body)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}"
+                             f"\r\n\r\n".encode('latin-1') + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, ValueError):
+            pass  # client went away or sent something that is not HTTP
+        finally:
+            writer.close()
+
+    async def serve(self, host=QUERY_HOST, port=QUERY_PORT):
+        await self.reload()
+        server = await asyncio.start_server(self.handle, host, port)
+        watcher = asyncio.create_task(self.watch())
+        logging.info(f"Query service listening on http://{host}:{port}")
+        print(f"Query service listening on http://{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            watcher.cancel()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the latest matchup and stat artifacts as JSON.")
+    parser.add_argument('--host', default=QUERY_HOST)
+    parser.add_argument('--port', type=int, default=QUERY_PORT)
+    parser.add_argument('--cache-size', type=int, default=QUERY_CACHE_SIZE, help="responses kept in the LRU cache")
+    args = parser.parse_args(argv)
+
+    service = QueryService(args.cache_size)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except FileNotFoundError as e:
+        logging.error(f"Query service needs a pipeline run first: {e}")
+        return 1
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,342 @@
+# replay_archive.py
+
+import os
+import sys
+import gzip
+import json
+import time
+import base64
+import logging
+import threading
+from collections import defaultdict
+
+# Archive format: gzip-compressed JSON lines. The first line describes the recording; every other line
+# is one HTTP response ('http') or one Sheets call or attribute read ('sheets') in the order it happened.
+ARCHIVE_VERSION = 1
+# Sheets calls that change the sheet; on replay they are answered from the archive and compared with it
+WRITE_OPS = ('append_row', 'append_rows', 'update', 'batch_update', 'clear', 'resize', 'insert_row', 'delete_rows')
+# Request headers dropped while recording so the archive holds full bodies, not 304s that need a local cache
+CONDITIONAL_HEADERS = ('If-None-Match', 'If-Modified-Since')
+# Fields of rows appended to these sheets that stay the same between runs on the same data; the others
+# (run date, duration, stage timings) differ on every run and are left out of the replay comparison
+STABLE_APPEND_FIELDS = {'Run_Log': (0, 2)}  # pipeline name, status
+
+_lock = threading.Lock()
+_archive = None
+
+
+# Compact, order-independent form of call arguments for comparing a replayed write with the recorded one
+def _normalize(value) -> str:
+    return json.dumps(value, default=str, sort_keys=True, separators=(',', ':'))
+
+
+# A replay miss is fetch_utils.ReplayMissError, a requests exception; imported on use so importing
+# this module (and run_all_nfl_scripts with it) does not pull in requests
+def _miss(message: str):
+    from fetch_utils import ReplayMissError
+    return ReplayMissError(message)
+
+
+# The part of a write that must match the recording: its arguments, minus the volatile fields
+def _comparable(sheet: str, op: str, args, kwargs) -> str:
+    fields = STABLE_APPEND_FIELDS.get(sheet)
+    if fields is not None and op == 'append_row' and args:
+        row = list(args[0])
+        args = [[row[i] for i in fields if i < len(row)]] + list(args[1:])
+    return _normalize([list(args), kwargs])
+
+
+# Capture every scraper response and Sheets call of a run into `path`
+class ArchiveRecorder:
+    mode = 'record'
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.counts = defaultdict(int)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.file = gzip.open(f"{path}.tmp", 'wt', encoding='utf-8')
+        self._write({'type': 'meta', 'version': ARCHIVE_VERSION, 'argv': sys.argv,
+                     'recorded_at': time.strftime('%Y-%m-%d %H:%M:%S')})
+
+    def _write(self, entry: dict):
+        line = json.dumps(entry, default=str)
+        with self.lock:
+            self.file.write(line + '\n')
+            self.counts[entry['type']] += 1
+
+    def record_http(self, url: str, response, elapsed: float):
+        self._write({'type': 'http', 'url': url, 'status': response.status_code, 'reason': response.reason,
+                     'headers': dict(response.headers), 'encoding': response.encoding, 'elapsed': round(elapsed, 4),
+                     'body': base64.b64encode(response.content).decode('ascii')})
+
+    def record_sheets(self, sheet: str, op: str, args=None, result=None, error=None, attr=False, elapsed=0.0):
+        entry = {'type': 'sheets', 'sheet': sheet, 'op': op, 'result': result, 'elapsed': round(elapsed, 4)}
+        if attr:
+            entry['attr'] = True
+        else:
+            entry['args'] = args
+        if error is not None:
+            entry['error'] = error
+        self._write(entry)
+
+    def session(self, session):
+        return RecordingSession(session, self)
+
+    def worksheet(self, spreadsheet_id: str, sheet_name: str, open_worksheet):
+        try:
+            return RecordingWorksheet(open_worksheet(), sheet_name, self)
+        except Exception as e:
+            self.record_sheets(sheet_name, 'open', error=f"{type(e).__name__}: {e}")
+            raise
+
+    def summary(self) -> str:
+        return f"{self.counts['http']} HTTP response(s), {self.counts['sheets']} Sheets call(s) recorded to {self.path}"
+
+    def close(self):
+        with self.lock:
+            if self.file.closed:
+                return
+            self.file.close()
+        os.replace(f"{self.path}.tmp", self.path)
+        logging.info(f"Record/replay: {self.summary()}")
+
+
+# Proxies for the live session and worksheets that pass every call through and record it
+class RecordingSession:
+    offline = False
+
+    def __init__(self, session, recorder: ArchiveRecorder):
+        self.session = session
+        self.recorder = recorder
+
+    def get(self, url, headers=None, **kwargs):
+        headers = {key: value for key, value in (headers or {}).items() if key not in CONDITIONAL_HEADERS}
+        start = time.perf_counter()
+        response = self.session.get(url, headers=headers, **kwargs)
+        self.recorder.record_http(url, response, time.perf_counter() - start)
+        return response
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
+
+
+class RecordingWorksheet:
+    def __init__(self, worksheet, sheet_name: str, recorder: ArchiveRecorder):
+        self._worksheet = worksheet
+        self._sheet_name = sheet_name
+        self._recorder = recorder
+
+    def __getattr__(self, name):
+        value = getattr(self._worksheet, name)
+        if not callable(value):
+            self._recorder.record_sheets(self._sheet_name, name, result=value, attr=True)
+            return value
+
+        def call(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = value(*args, **kwargs)
+            except Exception as e:
+                self._recorder.record_sheets(self._sheet_name, name, [args, kwargs], error=f"{type(e).__name__}: {e}",
+                                             elapsed=time.perf_counter() - start)
+                raise
+            self._recorder.record_sheets(self._sheet_name, name, [args, kwargs], result,
+                                         elapsed=time.perf_counter() - start)
+            return result
+        return call
+
+
+# Serve a run from an archive: scraper responses and Sheets reads come from the recording, Sheets writes
+# are checked against it, and nothing touches the network. Entries are matched per URL (or per sheet
+# and call) in recorded order; once a sequence is down to its last entry that entry keeps answering.
+class ArchiveReplayer:
+    mode = 'replay'
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.http = defaultdict(list)
+        self.sheets = defaultdict(list)
+        self.counts = defaultdict(int)
+        self.diverged = []
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            self.meta = json.loads(f.readline())
+            if self.meta.get('version') != ARCHIVE_VERSION:
+                raise ValueError(f"{path}: archive version {self.meta.get('version')}, expected {ARCHIVE_VERSION}")
+            for line in f:
+                entry = json.loads(line)
+                if entry['type'] == 'http':
+                    self.http[entry['url']].append(entry)
+                else:
+                    self.sheets[(entry['sheet'], entry['op'])].append(entry)
+        for queue in list(self.http.values()) + list(self.sheets.values()):
+            queue.reverse()  # popped from the end
+
+    def _next(self, table, key):
+        with self.lock:
+            queue = table.get(key)
+            if not queue:
+                return None
+            return queue.pop() if len(queue) > 1 else queue[-1]
+
+    def response(self, url: str):
+        import requests
+        from requests.structures import CaseInsensitiveDict
+
+        entry = self._next(self.http, url)
+        if entry is None:
+            self.counts['misses'] += 1
+            raise _miss(f"no recorded response for {url} in {self.path}")
+        response = requests.Response()
+        response.status_code = entry['status']
+        response.reason = entry['reason']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response.encoding = entry['encoding']
+        response.url = url
+        response._content = base64.b64decode(entry['body'])
+        self.counts['http'] += 1
+        return response
+
+    def sheets_entry(self, sheet: str, op: str):
+        entry = self._next(self.sheets, (sheet, op))
+        if entry is None and op not in WRITE_OPS:
+            self.counts['misses'] += 1
+            raise _miss(f"no recorded Sheets {op} on '{sheet}' in {self.path}")
+        return entry
+
+    def diverge(self, sheet: str, op: str):
+        with self.lock:
+            self.diverged.append(f"{sheet}.{op}")
+
+    def session(self, session=None):
+        return ReplaySession(self)
+
+    def worksheet(self, spreadsheet_id: str, sheet_name: str, open_worksheet=None):
+        entry = self._next(self.sheets, (sheet_name, 'open'))
+        if entry is not None and entry.get('error'):
+            raise _miss(f"recorded run could not open '{sheet_name}': {entry['error']}")
+        return ReplayWorksheet(sheet_name, self)
+
+    def summary(self) -> str:
+        note = f", differing from the recording: {', '.join(self.diverged)}" if self.diverged else ''
+        return (f"{self.counts['http']} HTTP response(s) and {self.counts['sheets_reads']} Sheets read(s) served, "
+                f"{self.counts['sheets_writes']} Sheets write(s) checked, {self.counts['misses']} miss(es) "
+                f"from {self.path}{note}")
+
+    def close(self):
+        logging.info(f"Record/replay: {self.summary()}")
+
+
+class ReplaySession:
+    offline = True  # no rate limiting: nothing goes over the network
+
+    def __init__(self, replayer: ArchiveReplayer):
+        self.replayer = replayer
+
+    def get(self, url, headers=None, **kwargs):
+        return self.replayer.response(url)
+
+
+class ReplayWorksheet:
+    def __init__(self, sheet_name: str, replayer: ArchiveReplayer):
+        self._sheet_name = sheet_name
+        self._replayer = replayer
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        entry = self._replayer.sheets_entry(self._sheet_name, name)
+        if entry is not None and entry.get('attr'):
+            return entry['result']
+
+        def call(*args, **kwargs):
+            if name in WRITE_OPS:
+                self._replayer.counts['sheets_writes'] += 1
+                replayed = _comparable(self._sheet_name, name, args, kwargs)
+                if entry is None or replayed != _comparable(self._sheet_name, name, *entry['args']):
+                    self._replayer.diverge(self._sheet_name, name)
+            else:
+                self._replayer.counts['sheets_reads'] += 1
+            if entry is not None and entry.get('error'):
+                raise _miss(f"recorded Sheets {name} on '{self._sheet_name}' failed: {entry['error']}")
+            return entry['result'] if entry is not None else None
+        return call
+
+
+# The archive of the current run, if recording or replaying; None otherwise
+def current_archive():
+    return _archive
+
+
+def start_recording(path: str) -> ArchiveRecorder:
+    global _archive
+    with _lock:
+        _archive = ArchiveRecorder(path)
+    return _archive
+
+
+def start_replay(path: str) -> ArchiveReplayer:
+    global _archive
+    with _lock:
+        _archive = ArchiveReplayer(path)
+    return _archive
+
+
+def stop_archive():
+    global _archive
+    with _lock:
+        archive, _archive = _archive, None
+    if archive is not None:
+        archive.close()
+    return archive
+
+
+# Per-stage wall time of two runs side by side, from the pipeline_spans.jsonl files of their work dirs
+def compare_spans(spans_a: str, spans_b: str) -> str:
+    def stage_times(path):
+        with open(path) as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        last_run = records[-1]['run_id'] if records else None
+        return {r['name']: r['wall_s'] for r in records if r['run_id'] == last_run and r['kind'] in ('stage', 'run')}
+
+    a, b = stage_times(spans_a), stage_times(spans_b)
+    lines = [f"{'stage':<26}{'A (s)':>10}{'B (s)':>10}{'B/A':>8}"]
+    for name in list(a) + [name for name in b if name not in a]:
+        ratio = f"{b[name] / a[name]:.2f}" if a.get(name) and name in b else '-'
+        lines.append(f"{name:<26}{a.get(name, float('nan')):>10.3f}{b.get(name, float('nan')):>10.3f}{ratio:>8}")
+    return '\n'.join(lines)
+
+
+# What an archive holds: responses per URL and calls per sheet
+def describe(path: str) -> str:
+    replayer = ArchiveReplayer(path)
+    lines = [f"{path}: recorded {replayer.meta['recorded_at']} by {' '.join(replayer.meta['argv'])}"]
+    for url, entries in replayer.http.items():
+        size = sum(len(entry['body']) * 3 // 4 for entry in entries)
+        lines.append(f"  GET {url}  {len(entries)}x, status {[e['status'] for e in reversed(entries)]}, {size // 1024}KB")
+    for (sheet, op), entries in replayer.sheets.items():
+        lines.append(f"  {sheet}.{op}  {len(entries)}x")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect record/replay archives and compare replayed runs.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    show = sub.add_parser('show', help="list the responses and Sheets calls in an archive")
+    show.add_argument('archive')
+    compare = sub.add_parser('compare', help="stage timings of two runs, e.g. two code versions on one archive")
+    compare.add_argument('spans_a', help="pipeline_spans.jsonl of run A (its --workdir)")
+    compare.add_argument('spans_b')
+    args = parser.parse_args(argv)
+
+    if args.command == 'show':
+        print(describe(args.archive))
+    else:
+        print(compare_spans(args.spans_a, args.spans_b))
+
+
+if __name__ == "__main__":
+    main()
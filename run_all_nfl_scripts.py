@@ -1,88 +1,136 @@
-import subprocess
+import argparse
 import os
 import logging
 from dotenv import load_dotenv
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-import gspread
 import sys
 import time
+import shutil
+import tempfile
 from datetime import datetime
-from google.oauth2.service_account import Credentials
+from fingerprints import FingerprintManifest
+from gsheets_client import get_worksheet, timed, client_stats
+from notifier import get_notifier, close_notifier
+from instrumentation import start_run, span, count, format_stage_summary
+from pipeline_dag import Stage, StageError, select_stages, run_dag, FAIL_FAST, CONTINUE
+from stage_store import stage_path
+from pipeline_logging import setup_logging
+from replay_archive import current_archive, start_recording, start_replay, stop_archive
 
 print(sys.executable)
 
 # Set up logging
-logging.basicConfig(
-    filename='nfl_pipeline.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-)
+setup_logging()
 
 # Load environment variables from .env file
 load_dotenv()
 
 
-def get_gsheets_client():
-    SCOPES = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive']
-    credentials = Credentials.from_service_account_file('credentials.json', scopes=SCOPES)
-    client = gspread.authorize(credentials)
-    return client
+# Queue the email on the background notifier, which reuses its SMTP connection and retries;
+# failures go out at once, other notifications may be collected into a digest
+def send_email(subject, body, urgent=False):
+    archive = current_archive()
+    if archive is not None and archive.mode == 'replay':
+        logging.info(f"Replay run, email not sent: {subject}")
+        return
+    get_notifier().notify(subject, body, urgent)
 
 
-def send_email(subject, body):
-    try:
-        sender_email = os.getenv('EMAIL')
-        receiver_email = os.getenv('RECEIVER_EMAIL')
-        password = os.getenv('EMAIL_PASSWORD')
+# Stage functions for the in-process runner. Each receives the results of its dependencies
+# and raises StageError when the stage produced nothing usable. Stage modules (and with them
+# pandas, bs4, gspread, jinja2) are imported by the stage that needs them, so --help, --list
+# and single-stage runs only pay for what they use.
+def stage_nfl_scrapper(inputs):
+    import nfl_scrapper
 
-        # Set up the email server
-        server = smtplib.SMTP('smtp.gmail.com', 587)
-        server.starttls()
+    all_dfs = nfl_scrapper.scrape_all(nfl_scrapper.STAT_URLS)
+    if not all_dfs:
+        raise StageError("No stat tables were scraped.")
+    count(rows_out=sum(len(df) for df, _ in all_dfs))
+    nfl_scrapper.save_stats(all_dfs)
+    return {df_name: df for df, df_name in all_dfs}
 
-        # Login to your email account
-        server.login(sender_email, password)
 
-        # Create the email
-        msg = MIMEMultipart()
-        msg['From'] = sender_email
-        msg['To'] = receiver_email
-        msg['Subject'] = subject
+def stage_schedule_scrapper(inputs):
+    import schedule_scrapper
 
-        # Attach the email body
-        msg.attach(MIMEText(body, 'plain'))
+    schedule_df = schedule_scrapper.scrape_current_week_schedule(schedule_scrapper.SCHEDULE_URL)
+    if schedule_df is None or not schedule_scrapper.save_schedule(schedule_df):
+        raise StageError("Schedule could not be scraped or failed validation.")
+    count(rows_out=len(schedule_df))
+    return schedule_df
 
-        # Send the email
-        server.send_message(msg)
-        server.quit()
 
-        logging.info(f"Email sent: {subject}")
-    except Exception as e:
-        logging.error(f"Failed to send email: {str(e)}")
+def stage_matchup_stats(inputs):
+    import matchup_stats
 
+    schedule_df = inputs.get('schedule_scrapper')
+    if schedule_df is None:
+        schedule_df = matchup_stats.load_weekly_schedule(matchup_stats.SCHEDULE_FILE)
+    nfl_stats_sheets = inputs.get('nfl_scrapper')
+    if nfl_stats_sheets is None:
+        nfl_stats_sheets = matchup_stats.load_nfl_stats(matchup_stats.STATS_FILE)
 
-def run_script(script_name):
-    try:
-        print(f"Running {script_name}...")
-        result = subprocess.run([os.path.join('venv', 'Scripts', 'python.exe'), script_name], check=True, capture_output=True, text=True)
-        # print(f"STDOUT:\n{result.stdout}")  # Standard output
-        # print(f"STDERR:\n{result.stderr}")  # Error output
-        logging.info(f"ETL {script_name.split('.')[0]} pipeline completed successfully.")
-        print(f"{script_name} completed successfully!\n")
-    except subprocess.CalledProcessError as e:
-        print(f"Error occurred while running {script_name}: {e}")
-        # print(f"STDOUT:\n{e.stdout}")  # Any output before error
-        # print(f"STDERR:\n{e.stderr}")  # Error details
-        logging.error(f"ETL {script_name.split('.')[0]} pipeline failed: {e}")
+    final_df = matchup_stats.build_matchup_stats(schedule_df, nfl_stats_sheets)
+    count(rows_in=len(schedule_df) + sum(len(df) for df in nfl_stats_sheets.values()), rows_out=len(final_df))
+    if final_df.empty:
+        raise StageError("No data to save; final DataFrame is empty.")
+    matchup_stats.save_output_with_date(final_df)
+    return final_df
+
+
+def stage_write_to_gsheets(inputs):
+    import write_to_gsheets
+
+    write_to_gsheets.upload_to_gsheets(write_to_gsheets.OUTPUT_FILE, os.getenv('SPREADSHEET_ID'),
+                                       write_to_gsheets.OUTPUT_SHEET_NAME, inputs.get('matchup_stats'))
+
+
+def stage_generate_html_dashboard(inputs):
+    import generate_html_dashboard
+
+    generate_html_dashboard.main()
+
+
+def stage_create_backups(inputs):
+    import create_backups
+
+    store = create_backups.get_backup_store()
+    if create_backups.backup_pipeline_files(store) is None:
+        raise StageError("Backup snapshot failed.")
+    create_backups.clean_old_backups(store)
+
+
+# The pipeline graph: the two scrapers are independent, everything else waits on matchup_stats.
+# Scrapers read remote pages so they always run; downstream stages are keyed on the stage store
+# artifacts (the xlsx exports embed a creation timestamp, so they never hash the same twice).
+# The dashboard renders the Run_Log, which changes with every run, so it has no inputs and always runs.
+STATS_STAGE = stage_path('nfl_stats')
+SCHEDULE_STAGE = stage_path('schedule')
+OUTPUT_STAGE = stage_path('nfl_output')
+OUTPUT_FILE = 'nfl_output.xlsx'  # matchup_stats' Excel export, the same file write_to_gsheets.OUTPUT_FILE names
+# Read-only files a --record/--replay work dir needs besides the archive
+WORKDIR_FILES = ['dashboard_template.html']
+
+STAGES = [
+    Stage('nfl_scrapper', stage_nfl_scrapper, outputs=[STATS_STAGE]),
+    Stage('schedule_scrapper', stage_schedule_scrapper, outputs=[SCHEDULE_STAGE]),
+    Stage('matchup_stats', stage_matchup_stats, deps=['nfl_scrapper', 'schedule_scrapper'],
+          inputs=[STATS_STAGE, SCHEDULE_STAGE], outputs=[OUTPUT_STAGE, OUTPUT_FILE]),
+    Stage('write_to_gsheets', stage_write_to_gsheets, deps=['matchup_stats'], inputs=[OUTPUT_STAGE]),
+    Stage('generate_html_dashboard', stage_generate_html_dashboard, deps=['matchup_stats'],
+          outputs=['dashboard.html']),
+    Stage('create_backups', stage_create_backups, deps=['matchup_stats'],
+          inputs=[STATS_STAGE, SCHEDULE_STAGE, OUTPUT_STAGE]),
+]
 
 
 # Define log function
-def log_run_to_gsheets(status, duration, error_message=''):
+def log_run_to_gsheets(status, duration, error_message='', stage_summary=''):
+    from gspread.exceptions import APIError, SpreadsheetNotFound
+
     try:
         # Connect to Google Sheets
-        client = get_gsheets_client()
-        sheet = client.open_by_key(os.getenv('SPREADSHEET_ID_LOG')).worksheet('Run_Log')
+        sheet = get_worksheet(os.getenv('SPREADSHEET_ID_LOG'), 'Run_Log')
 
         # Record current date and time for logging
         run_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
@@ -91,45 +139,115 @@ def log_run_to_gsheets(status, duration, error_message=''):
         pipeline_name = "NFL Pipeline"
 
         # Append new row to Google Sheets
-        new_row = [pipeline_name, run_date, status, duration, error_message]
-        sheet.append_row(new_row)
+        new_row = [pipeline_name, run_date, status, duration, error_message, stage_summary]
+        with timed('data'):
+            sheet.append_row(new_row)
         logging.info(f"Run log added to Google Sheets: {new_row}")
 
-    except gspread.exceptions.APIError as api_error:
+    except APIError as api_error:
         logging.error(f"Google Sheets API error: {api_error}")
-    except gspread.exceptions.SpreadsheetNotFound:
+    except SpreadsheetNotFound:
         logging.error("Google Sheets ID not found or inaccessible. Check SPREADSHEET_ID.")
     except Exception as e:
         logging.error(f"Failed to log run to Google Sheets: {e}")
 
 
-def main():
-    start_time = time.time()  # Track start time
-
-    # Define the list of scripts to run
-    script_folder = os.path.dirname(__file__)
-    scripts = ["nfl_scrapper.py", "schedule_scrapper.py", "matchup_stats.py", "write_to_gsheets.py",
-               "generate_html_dashboard.py", "create_backups.py"]
-
-    try:
-        for script in scripts:
-            script_path = os.path.join(script_folder, script)
-            run_script(script_path)
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the NFL pipeline stages in one process.")
+    parser.add_argument('--only', action='append', metavar='STAGE',
+                        help="run just this stage (repeatable); missing inputs are loaded from disk")
+    parser.add_argument('--target', action='append', metavar='STAGE',
+                        help="run this stage and everything upstream of it (repeatable)")
+    parser.add_argument('--continue-on-error', action='store_true',
+                        help="keep running stages that do not depend on a failed one")
+    parser.add_argument('--workers', type=int, default=4, help="stages allowed to run at the same time")
+    parser.add_argument('--force', action='store_true', help="run stages even when their inputs are unchanged")
+    parser.add_argument('--list', action='store_true', help="list the stages and exit")
+    archive = parser.add_mutually_exclusive_group()
+    archive.add_argument('--record', metavar='ARCHIVE',
+                         help="capture every scraped page and Sheets call of this run into ARCHIVE (gzip)")
+    archive.add_argument('--replay', metavar='ARCHIVE',
+                         help="run from a recorded ARCHIVE without network: no pages, Sheets or email")
+    parser.add_argument('--workdir', help="directory for the outputs of a --record/--replay run "
+                                          "(default: a new temporary directory)")
+    return parser.parse_args(argv)
+
+
+# Record and replay runs start from an empty work dir, so no local cache (HTTP snapshots, Sheets grid,
+# Run_Log mirror, fingerprints) decides which requests are made and both runs see the same calls
+def enter_workdir(workdir, prefix):
+    workdir = workdir or tempfile.mkdtemp(prefix=prefix)
+    os.makedirs(workdir, exist_ok=True)
+    for name in WORKDIR_FILES:
+        if not os.path.exists(os.path.join(workdir, name)):
+            shutil.copy(name, workdir)
+    os.chdir(workdir)
+    logging.info(f"Running in {os.path.abspath(workdir)}")
+    print(f"Work dir: {os.path.abspath(workdir)}")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.list:
+        for stage in STAGES:
+            print(f"{stage.name}  <- {', '.join(stage.deps) or '-'}")
+        return
+
+    if args.record or args.replay:
+        archive_path = os.path.abspath(args.record or args.replay)
+        enter_workdir(args.workdir, 'nfl-record-' if args.record else 'nfl-replay-')
+        (start_recording if args.record else start_replay)(archive_path)
+        args.force = True
 
-        duration = round(time.time() - start_time, 2)  # Calculate total duration
-        log_run_to_gsheets('Success', duration)  # Log success
+    start_time = time.time()  # Track start time
+    stages = select_stages(STAGES, targets=args.target, only=args.only)
+    policy = CONTINUE if args.continue_on_error else FAIL_FAST
+
+    run_id = start_run()
+    with span('pipeline', kind='run'):
+        results = run_dag(stages, policy=policy, max_workers=args.workers, manifest=FingerprintManifest(),
+                          force=args.force)
+    report_run(run_id, results, start_time)
+
+    archive = current_archive()
+    if archive is not None:
+        close_notifier()  # the Run_Log append is part of the recording
+        stop_archive()
+        print(f"Record/replay: {archive.summary()}")
+
+
+# Print stage outcomes, then record the run in the Run_Log sheet and send the notification email
+def report_run(run_id, results, start_time):
+    stage_summary = format_stage_summary()
+    logging.info(f"Run {run_id} stage summary: {stage_summary}")
+    for result in results:
+        print(f"{result.name}: {result.status} ({result.duration:.2f}s)")
+    failed = [result for result in results if result.status == 'failed']
+    skipped = [result.name for result in results if result.status == 'skipped']
+    unchanged = [result.name for result in results if result.status == 'unchanged']
+    unchanged_note = f"Skipped, inputs unchanged: {', '.join(unchanged)}" if unchanged else ''
+    if unchanged:
+        logging.info(unchanged_note)
+
+    duration = round(time.time() - start_time, 2)  # Calculate total duration
+    logging.info(f"Google API client stats: {client_stats()}")
+    if not failed:
+        get_notifier().submit(log_run_to_gsheets, 'Success', duration, '', stage_summary)  # Skipped stages are in the summary
         subject = "NFL Pipeline Completed Successfully"
         body = "The NFL data pipeline has run successfully without any issues."
+        if unchanged:
+            body += f"\n\n{unchanged_note}"
         send_email(subject, body)
         logging.info("ETL run_all_nfl_scripts pipeline completed successfully.")
-
-    except Exception as e:
-        duration = round(time.time() - start_time, 2)
-        log_run_to_gsheets('Failed', duration, str(e))  # Log failure with error
+    else:
+        error_message = '; '.join(f"{result.name}: {result.error}" for result in failed)
+        if skipped:
+            error_message += f" (skipped: {', '.join(skipped)})"
+        get_notifier().submit(log_run_to_gsheets, 'Failed', duration, error_message, stage_summary)  # Log failure
         subject = "NFL Pipeline Failed"
-        body = f"The NFL data pipeline encountered an error:\n\n{str(e)}"
-        send_email(subject, body)
-        logging.error(f"ETL run_all_nfl_scripts pipeline failed: {e}")
+        body = f"The NFL data pipeline encountered an error:\n\n{error_message}"
+        send_email(subject, body, urgent=True)
+        logging.error(f"ETL run_all_nfl_scripts pipeline failed: {error_message}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,145 @@
+# run_log_mirror.py
+
+import os
+import sqlite3
+import logging
+import threading
+
+MIRROR_DB = os.getenv('NFL_RUN_LOG_DB', 'run_log.db')
+RUN_LOG_COLUMNS = ['Pipeline Name', 'Run Date', 'Run Status', 'Duration', 'Error Message', 'Stage Summary']
+# Bumped whenever the tables change; an outdated mirror is dropped and fetched again
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    row_num INTEGER PRIMARY KEY,
+    pipeline_name TEXT NOT NULL,
+    run_date TEXT NOT NULL,
+    status TEXT,
+    duration REAL,
+    error_message TEXT,
+    stage_summary TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_by_date ON runs (run_date DESC, row_num DESC);
+CREATE TABLE IF NOT EXISTS latest_runs (
+    pipeline_name TEXT PRIMARY KEY,
+    row_num INTEGER NOT NULL,
+    run_date TEXT NOT NULL,
+    status TEXT,
+    duration REAL,
+    stage_summary TEXT
+);
+CREATE TABLE IF NOT EXISTS run_totals (
+    pipeline_name TEXT NOT NULL,
+    status TEXT NOT NULL,
+    runs INTEGER NOT NULL,
+    total_duration REAL NOT NULL,
+    PRIMARY KEY (pipeline_name, status)
+);
+"""
+
+
+def _duration(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+# Local SQLite copy of the Run_Log worksheet. Rows are keyed by their sheet row number, so a sync
+# only asks for rows below the last one mirrored. The latest run per pipeline and per-status totals
+# are kept up to date as rows arrive, so reading them never scans the history.
+class RunLogMirror:
+    def __init__(self, db_file: str = MIRROR_DB):
+        self.db_file = db_file
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self.conn.executescript("DROP TABLE IF EXISTS runs; DROP TABLE IF EXISTS latest_runs; "
+                                    "DROP TABLE IF EXISTS run_totals;")
+        self.conn.executescript(SCHEMA)
+        self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self):
+        self.conn.close()
+
+    def synced_rows(self) -> int:
+        row = self.conn.execute("SELECT MAX(row_num) FROM runs").fetchone()
+        return row[0] or 0
+
+    # Insert rows of sheet values (columns as in RUN_LOG_COLUMNS), the first being data row first_row_num.
+    # Rows already mirrored are ignored, so replaying a range is harmless.
+    def add_rows(self, rows: list, first_row_num: int) -> int:
+        added = 0
+        with self.lock, self.conn:
+            for offset, values in enumerate(rows):
+                values = list(values) + [''] * (len(RUN_LOG_COLUMNS) - len(values))
+                pipeline_name, run_date, status, duration, error_message, stage_summary = values[:len(RUN_LOG_COLUMNS)]
+                if not pipeline_name and not run_date:
+                    continue
+                duration = _duration(duration)
+                row_num = first_row_num + offset
+                cursor = self.conn.execute(
+                    "INSERT OR IGNORE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (row_num, pipeline_name, run_date, status, duration, error_message, stage_summary),
+                )
+                if cursor.rowcount == 0:
+                    continue
+                added += 1
+                self.conn.execute(
+                    """INSERT INTO latest_runs VALUES (?, ?, ?, ?, ?, ?)
+                       ON CONFLICT (pipeline_name) DO UPDATE SET
+                           row_num = excluded.row_num, run_date = excluded.run_date, status = excluded.status,
+                           duration = excluded.duration, stage_summary = excluded.stage_summary
+                       WHERE excluded.run_date >= latest_runs.run_date""",
+                    (pipeline_name, row_num, run_date, status, duration, stage_summary),
+                )
+                self.conn.execute(
+                    """INSERT INTO run_totals VALUES (?, ?, 1, ?)
+                       ON CONFLICT (pipeline_name, status) DO UPDATE SET
+                           runs = runs + 1, total_duration = total_duration + excluded.total_duration""",
+                    (pipeline_name, status, duration or 0.0),
+                )
+        return added
+
+    # Pull only the rows appended to the worksheet since the last sync. Row 1 is the header.
+    def sync(self, worksheet) -> int:
+        synced = self.synced_rows()
+        last_col = chr(ord('A') + len(RUN_LOG_COLUMNS) - 1)
+        rows = worksheet.get(f"A{synced + 2}:{last_col}")
+        added = self.add_rows(rows, synced + 1)
+        logging.info(f"Run log mirror: {added} new row(s) fetched, {synced + added} mirrored")
+        return added
+
+    # Drop everything and fetch the whole sheet again, e.g. after rows were deleted or edited by hand
+    def rebuild(self, worksheet) -> int:
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM runs")
+            self.conn.execute("DELETE FROM latest_runs")
+            self.conn.execute("DELETE FROM run_totals")
+        return self.sync(worksheet)
+
+    def latest_runs(self) -> list:
+        return [dict(row) for row in self.conn.execute(
+            "SELECT pipeline_name, run_date, status, duration, stage_summary FROM latest_runs ORDER BY pipeline_name")]
+
+    def recent_runs(self, limit: int = 50) -> list:
+        return [dict(row) for row in self.conn.execute(
+            """SELECT run_date, pipeline_name, status, duration, error_message, stage_summary FROM runs
+               ORDER BY run_date DESC, row_num DESC LIMIT ?""", (limit,))]
+
+    # Runs, successes and average duration per pipeline, read from the running totals
+    def totals(self) -> list:
+        summary = {}
+        for row in self.conn.execute("SELECT * FROM run_totals ORDER BY pipeline_name"):
+            entry = summary.setdefault(row['pipeline_name'], {
+                'pipeline_name': row['pipeline_name'], 'runs': 0, 'successes': 0, 'total_duration': 0.0})
+            entry['runs'] += row['runs']
+            entry['total_duration'] += row['total_duration']
+            if row['status'] == 'Success':
+                entry['successes'] += row['runs']
+        for entry in summary.values():
+            entry['success_rate'] = round(100.0 * entry['successes'] / entry['runs'], 1)
+            entry['avg_duration'] = round(entry.pop('total_duration') / entry['runs'], 2)
+        return list(summary.values())
@@ -1,77 +1,147 @@
-import requests
-from bs4 import BeautifulSoup
+import re
 import pandas as pd
 import logging
+import requests
+from fetch_utils import fetch
+from http_cache import get_http_cache
+from instrumentation import traced, count
+from table_extractor import extract_table, extract_tables
+from stage_store import write_stage, EXPORT_EXCEL
+from team_registry import NFL_REGISTRY
 from validation_functions import run_validations
+from pipeline_logging import setup_logging
+
+SCHEDULE_URL = "https://www.teamrankings.com/nfl/schedules/season/"  # Modify the URL if needed
+SCHEDULE_COLUMNS = ['Teams', 'Time', 'Location']
+WEEK_PATTERN = re.compile(r'week\s+(\d+)', re.IGNORECASE)
+# Both scrapers may fetch the same page but cache different frames from it
+WEEK_CACHE_NAMESPACE = 'current_week_schedule'
+SEASON_CACHE_NAMESPACE = 'season_schedule'
 
 # Set up logging
-logging.basicConfig(
-    filename='nfl_pipeline.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-)
+setup_logging()
 
 
-# Function to scrape the current week's NFL schedule
-def scrape_current_week_schedule(url):
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'
-    }
+# Keep rows with exactly 3 cells: Teams, Time, and Location (header row already skipped),
+# plus canonical ids for both sides of each matchup (-1 when unknown or malformed)
+def schedule_frame(rows):
+    schedule_data = [cells for cells in rows if len(cells) == 3]
+    df = pd.DataFrame(schedule_data, columns=SCHEDULE_COLUMNS)
+    df['Team1 ID'], df['Team2 ID'], _ = NFL_REGISTRY.matchup_team_ids(df['Teams'])
+    return df
+
 
-    response = requests.get(url, headers=headers)
+# Function to scrape the current week's NFL schedule
+@traced()
+def scrape_current_week_schedule(url, cache=None, deadline=None):
+    cache = cache or get_http_cache()
+    try:
+        response = fetch(url, headers=cache.conditional_headers(url, WEEK_CACHE_NAMESPACE), deadline=deadline)
+    except requests.RequestException as e:
+        logging.error(f"Failed to retrieve {url}: {e}")
+        return None
 
     # Log the status code of the response
     logging.info(f"Request to {url} returned status code: {response.status_code}")
 
+    # Reuse the last parsed schedule if the page has not changed
+    cached_df = cache.lookup(url, response, WEEK_CACHE_NAMESPACE)
+    if cached_df is not None:
+        count(rows_out=len(cached_df))
+        return cached_df
+
     # Check if the request was successful (status code 200)
     if response.status_code != 200:
         logging.error(f"Failed to retrieve {url}. Status code: {response.status_code}")
         return None
 
-    # Parse the HTML content using BeautifulSoup
-    soup = BeautifulSoup(response.content, 'html.parser')
-
-    # Find the schedule table (by inspecting the webpage)
-    table = soup.find('table', {'class': 'tr-table'})  # Adjust based on the table's class
+    # Extract only the schedule table (by inspecting the webpage)
+    table = extract_table(response.content, {'class': 'tr-table'})  # Adjust based on the table's class
 
     # Check if the table was found
     if table is None:
         logging.error("No schedule table found on the page.")
-        logging.debug(f"HTML content: {soup.prettify()}")
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            logging.debug("HTML content: %s", response.text)
+        return None
+
+    _, rows = table
+    df = schedule_frame(rows)
+
+    cache.store(url, response, df, WEEK_CACHE_NAMESPACE)
+    count(rows_out=len(df))
+    return df
+
+
+# Every week on a season schedule page as one DataFrame with a 'Week' column. On teamrankings each
+# week's table sits under a "Week N" heading and its own headers are game days ("Thu Sep  5"), so the
+# week is read from that heading, else from a "Week N" table header. Tables with neither are numbered
+# in page order, which is only right when the page lists every week from week 1; a warning says so.
+@traced()
+def scrape_season_schedule(url, cache=None, deadline=None):
+    cache = cache or get_http_cache()
+    try:
+        response = fetch(url, headers=cache.conditional_headers(url, SEASON_CACHE_NAMESPACE), deadline=deadline)
+    except requests.RequestException as e:
+        logging.error(f"Failed to retrieve {url}: {e}")
         return None
+    logging.info(f"Request to {url} returned status code: {response.status_code}")
 
-    # Prepare lists to hold the schedule data
-    schedule_data = []
+    cached_df = cache.lookup(url, response, SEASON_CACHE_NAMESPACE)
+    if cached_df is not None:
+        count(rows_out=len(cached_df))
+        return cached_df
 
-    # Iterate through the rows of the table
-    for row in table.find_all('tr')[1:]:  # Skip the first row (header)
-        cells = row.find_all('td')
-        if len(cells) == 3:  # Ensure there are exactly 3 cells: Teams, Time, and Location
-            teams = cells[0].text.strip()
-            time = cells[1].text.strip()
-            location = cells[2].text.strip()
-            schedule_data.append([teams, time, location])
+    if response.status_code != 200:
+        logging.error(f"Failed to retrieve {url}. Status code: {response.status_code}")
+        return None
 
-    # Convert the list to a pandas DataFrame
-    df = pd.DataFrame(schedule_data, columns=['Teams', 'Time', 'Location'])
+    weeks, unlabeled = [], 0
+    tables = extract_tables(response.content, {'class': 'tr-table'}, headings=True)
+    for number, (heading, headers, rows) in enumerate(tables, start=1):
+        match = WEEK_PATTERN.search(heading or '') or (WEEK_PATTERN.search(headers[0]) if headers else None)
+        unlabeled += match is None
+        df = schedule_frame(rows)
+        df.insert(0, 'Week', int(match.group(1)) if match else number)
+        weeks.append(df)
+    if unlabeled:
+        logging.warning(f"{unlabeled} of {len(tables)} schedule table(s) on {url} have no week heading; "
+                        f"numbered in page order")
+    if not weeks:
+        logging.error(f"No schedule tables found on {url}")
+        return None
 
+    df = pd.concat(weeks, ignore_index=True)
+    cache.store(url, response, df, SEASON_CACHE_NAMESPACE)
+    count(rows_out=len(df))
     return df
 
 
-# Main execution
-if __name__ == "__main__":
-    url = "https://www.teamrankings.com/nfl/schedules/season/"  # Modify the URL if needed
+# Validate the schedule, hand it off through the stage store and optionally export to Excel
+def save_schedule(schedule_df, file_name="nfl_current_week_schedule.xlsx"):
+    if not run_validations(schedule_df, "Schedule Data", required_columns=SCHEDULE_COLUMNS):
+        logging.error("Validation failed for schedule_df.")
+        return False
+    logging.info("Schedule data successfully scraped and validated.")
+    if EXPORT_EXCEL:
+        schedule_df.to_excel(file_name, index=False)
+    write_stage('schedule', schedule_df)
+    return True
+
+
+def main(url=SCHEDULE_URL):
     schedule_df = scrape_current_week_schedule(url)
 
     try:
-        if schedule_df is not None:
-            # Validate the DataFrame structure and contents
-            if run_validations(schedule_df, "Schedule Data", required_columns=['Teams', 'Time', 'Location']):
-                logging.info("Schedule data successfully scraped and validated.")
-                # Optionally, save to Excel
-                schedule_df.to_excel("nfl_current_week_schedule.xlsx", index=False)
-                logging.info("ETL schedule pipeline completed successfully.")
-            else:
-                logging.error("Validation failed for schedule_df.")
+        if schedule_df is not None and save_schedule(schedule_df):
+            logging.info("ETL schedule pipeline completed successfully.")
+            logging.info(f"HTTP cache stats: {get_http_cache().stats()}")
     except Exception as e:
         logging.error(f"ETL schedule pipeline failed: {e}")
+
+    return schedule_df
+
+
+# Main execution
+if __name__ == "__main__":
+    main()
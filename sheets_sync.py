@@ -0,0 +1,205 @@
+# sheets_sync.py
+
+import os
+import json
+import time
+import random
+import logging
+import hashlib
+from instrumentation import count
+
+SYNC_CACHE_DIR = os.getenv('NFL_SHEETS_CACHE_DIR', '.sheets_cache')
+MAX_CELLS_PER_BATCH = int(os.getenv('NFL_SHEETS_MAX_CELLS_PER_BATCH', '40000'))
+MAX_RANGES_PER_BATCH = 500
+MAX_RETRIES = 5
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+# Values as Sheets displays them, so a cached grid compares equal to a fetched one.
+# Only values that are not plain str/int/float can be pd.NA, so pandas is imported for those alone.
+def cell_str(value) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, float):
+        if value != value:  # NaN
+            return ''
+        if value.is_integer():
+            return str(int(value))
+        return str(value)
+    if isinstance(value, (str, int)):
+        return str(value)
+    from pandas import NA
+    return '' if value is NA else str(value)
+
+
+def to_grid(df) -> list:
+    return [[cell_str(v) for v in df.columns]] + [[cell_str(v) for v in row] for row in df.values.tolist()]
+
+
+# Row-level diff: contiguous runs of changed rows as (first 1-based row, rows of values).
+# Rows and columns that existed before but not anymore are blanked out.
+def diff_grids(old_grid: list, new_grid: list) -> list:
+    width = max([len(row) for row in old_grid + new_grid] or [0])
+    height = max(len(old_grid), len(new_grid))
+    if width == 0:
+        return []
+
+    def padded(grid, r):
+        row = grid[r] if r < len(grid) else []
+        return list(row) + [''] * (width - len(row))
+
+    runs = []
+    for r in range(height):
+        new_row = padded(new_grid, r)
+        if padded(old_grid, r) == new_row:
+            continue
+        if runs and runs[-1][0] + len(runs[-1][1]) == r + 1:
+            runs[-1][1].append(new_row)
+        else:
+            runs.append((r + 1, [new_row]))
+    return runs
+
+
+# Turn runs into batch_update payloads under the cell and range limits; oversized runs are split by rows
+def chunk_ranges(runs: list, max_cells: int = MAX_CELLS_PER_BATCH) -> list:
+    from gspread.utils import rowcol_to_a1
+
+    batches, batch, cells = [], [], 0
+    for first_row, rows in runs:
+        width = len(rows[0])
+        rows_per_piece = max(1, max_cells // width)
+        for offset in range(0, len(rows), rows_per_piece):
+            values = rows[offset:offset + rows_per_piece]
+            start = first_row + offset
+            piece = {'range': f"{rowcol_to_a1(start, 1)}:{rowcol_to_a1(start + len(values) - 1, width)}",
+                     'values': values}
+            if batch and (cells + len(values) * width > max_cells or len(batch) >= MAX_RANGES_PER_BATCH):
+                batches.append(batch)
+                batch, cells = [], 0
+            batch.append(piece)
+            cells += len(values) * width
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+# Retry rate-limit and server errors with exponential backoff and jitter, honouring Retry-After
+def with_backoff(call, *args, **kwargs):
+    from gspread.exceptions import APIError
+
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            count(http_requests=1)
+            return call(*args, **kwargs)
+        except APIError as e:
+            status = getattr(getattr(e, 'response', None), 'status_code', None)
+            if status not in RETRY_STATUS_CODES or attempt == MAX_RETRIES:
+                raise
+            retry_after = getattr(e.response, 'headers', {}).get('Retry-After')
+            delay = float(retry_after) if retry_after else min(64, 2 ** attempt) + random.uniform(0, 1)
+            logging.warning(f"Google Sheets API returned {status}, retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def _cache_file(spreadsheet_id: str, sheet_name: str) -> str:
+    key = hashlib.sha256(f"{spreadsheet_id}/{sheet_name}".encode('utf-8')).hexdigest()[:16]
+    return os.path.join(SYNC_CACHE_DIR, f"{key}.json")
+
+
+def load_cached_grid(spreadsheet_id: str, sheet_name: str):
+    path = _cache_file(spreadsheet_id, sheet_name)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logging.warning(f"Ignoring unreadable Sheets cache {path}: {e}")
+        return None
+
+
+def save_cached_grid(spreadsheet_id: str, sheet_name: str, grid: list):
+    os.makedirs(SYNC_CACHE_DIR, exist_ok=True)
+    path = _cache_file(spreadsheet_id, sheet_name)
+    with open(f"{path}.tmp", 'w') as f:
+        json.dump(grid, f)
+    os.replace(f"{path}.tmp", path)
+
+
+# Write only the rows that differ from the last written grid, in as few batch_update calls as possible.
+# Returns the number of cells sent.
+def sync_worksheet(worksheet, df, spreadsheet_id: str, sheet_name: str, use_cache: bool = True) -> int:
+    new_grid = to_grid(df)
+    old_grid = load_cached_grid(spreadsheet_id, sheet_name) if use_cache else None
+    if old_grid is None:
+        old_grid = with_backoff(worksheet.get_all_values)
+        logging.info(f"Fetched {len(old_grid)} rows from sheet '{sheet_name}' to diff against")
+
+    runs = diff_grids(old_grid, new_grid)
+    if not runs:
+        logging.info(f"Sheet '{sheet_name}' already up to date, nothing sent.")
+        save_cached_grid(spreadsheet_id, sheet_name, new_grid)
+        return 0
+
+    # Grow the sheet first; writes outside the grid are rejected
+    rows_needed = max(len(old_grid), len(new_grid))
+    cols_needed = max(len(row) for row in old_grid + new_grid)
+    if rows_needed > worksheet.row_count or cols_needed > worksheet.col_count:
+        with_backoff(worksheet.resize, rows=max(rows_needed, worksheet.row_count),
+                     cols=max(cols_needed, worksheet.col_count))
+
+    cells = 0
+    for batch in chunk_ranges(runs):
+        # USER_ENTERED so numeric strings land as numbers, as the full update did
+        with_backoff(worksheet.batch_update, batch, value_input_option='USER_ENTERED')
+        cells += sum(len(item['values']) * len(item['values'][0]) for item in batch)
+    save_cached_grid(spreadsheet_id, sheet_name, new_grid)
+    logging.info(f"Synced {len(runs)} changed range(s), {cells} cells, to sheet '{sheet_name}'.")
+    return cells
+
+
+# In-memory worksheet with the subset of the gspread API used above, for offline runs and checks
+class FakeWorksheet:
+    def __init__(self, values=None, rows=1000, cols=26):
+        self.values = [list(row) for row in (values or [])]
+        self.row_count = rows
+        self.col_count = cols
+        self.calls = []
+
+    def get_all_values(self):
+        self.calls.append('get_all_values')
+        width = max([len(row) for row in self.values] or [0])
+        rows = [row + [''] * (width - len(row)) for row in self.values]
+        while rows and not any(rows[-1]):
+            rows.pop()
+        return rows
+
+    def resize(self, rows=None, cols=None):
+        self.calls.append('resize')
+        self.row_count = rows or self.row_count
+        self.col_count = cols or self.col_count
+
+    def clear(self):
+        self.calls.append('clear')
+        self.values = []
+
+    def update(self, values, range_name='A1'):
+        self.calls.append('update')
+        self.batch_update([{'range': range_name, 'values': values}])
+
+    def batch_update(self, data, value_input_option='RAW'):
+        from gspread.utils import a1_to_rowcol
+
+        self.calls.append('batch_update')
+        for item in data:
+            row, col = a1_to_rowcol(item['range'].split(':')[0])
+            for r, values in enumerate(item['values']):
+                target = row - 1 + r
+                if target >= self.row_count or col - 1 + len(values) > self.col_count:
+                    raise ValueError(f"Range {item['range']} exceeds grid limits")
+                while len(self.values) <= target:
+                    self.values.append([])
+                line = self.values[target]
+                while len(line) < col - 1 + len(values):
+                    line.append('')
+                line[col - 1:col - 1 + len(values)] = [cell_str(v) for v in values]
@@ -0,0 +1,86 @@
+# stage_store.py
+
+import os
+import json
+import logging
+from instrumentation import traced, count
+
+# Internal hand-off between pipeline stages as Arrow IPC files; Excel is only an optional export.
+# pandas and pyarrow are imported by the functions that move data, so path helpers stay cheap.
+STAGE_DIR = os.getenv('NFL_STAGE_DIR', 'stage_store')
+EXPORT_EXCEL = os.getenv('NFL_EXPORT_EXCEL', '1') == '1'
+MANIFEST_FILE = '_sheets.json'
+
+
+# `root` places a stage outside STAGE_DIR, e.g. per-week backfill inputs
+def stage_path(stage: str, root: str = None) -> str:
+    return os.path.join(root or STAGE_DIR, stage)
+
+
+def _frame_file(stage: str, sheet: str, root: str = None) -> str:
+    return os.path.join(stage_path(stage, root), f"{sheet}.arrow")
+
+
+# Write one DataFrame or a {sheet_name: DataFrame} mapping as a stage artifact
+@traced()
+def write_stage(stage: str, frames, root: str = None) -> str:
+    import pandas as pd
+    import pyarrow as pa
+
+    single = isinstance(frames, pd.DataFrame)
+    sheets = {stage: frames} if single else frames
+    os.makedirs(stage_path(stage, root), exist_ok=True)
+
+    count(rows_in=sum(len(df) for df in sheets.values()))
+    for sheet, df in sheets.items():
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        tmp_file = f"{_frame_file(stage, sheet, root)}.tmp"
+        # Uncompressed IPC so readers can memory-map columns without a copy
+        with pa.OSFile(tmp_file, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp_file, _frame_file(stage, sheet, root))
+
+    # The manifest is written last, so a stage is only visible once all its frames are on disk
+    manifest_file = os.path.join(stage_path(stage, root), MANIFEST_FILE)
+    with open(f"{manifest_file}.tmp", 'w') as f:
+        json.dump({'single': single, 'sheets': list(sheets)}, f)
+    os.replace(f"{manifest_file}.tmp", manifest_file)
+
+    logging.info("Stage '%s' written with %d frame(s) to %s", stage, len(sheets), stage_path(stage, root))
+    return stage_path(stage, root)
+
+
+def _read_frame(stage: str, sheet: str, root: str = None):
+    import pyarrow as pa
+
+    with pa.memory_map(_frame_file(stage, sheet, root), 'r') as source:
+        return pa.ipc.open_file(source).read_all().to_pandas()
+
+
+# Read a stage back: a DataFrame for single-frame stages, else a {sheet_name: DataFrame} dict
+@traced()
+def read_stage(stage: str, root: str = None):
+    with open(os.path.join(stage_path(stage, root), MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    frames = {sheet: _read_frame(stage, sheet, root) for sheet in manifest['sheets']}
+    count(rows_out=sum(len(df) for df in frames.values()))
+    logging.info("Stage '%s' loaded from %s", stage, stage_path(stage, root))
+    return frames[stage] if manifest['single'] else frames
+
+
+def stage_mtime(stage: str, root: str = None):
+    manifest_file = os.path.join(stage_path(stage, root), MANIFEST_FILE)
+    return os.path.getmtime(manifest_file) if os.path.exists(manifest_file) else None
+
+
+# Prefer the stage artifact; fall back to the Excel file when the stage is missing or older.
+# Stages are written after their Excel export, so a fresh run always prefers the stage.
+def load_stage_or_excel(stage: str, excel_file: str, sheet_name=0):
+    mtime = stage_mtime(stage)
+    if mtime is not None and (not os.path.exists(excel_file) or mtime >= os.path.getmtime(excel_file)):
+        return read_stage(stage)
+    import pandas as pd
+
+    logging.info("Stage '%s' unavailable or stale, reading %s", stage, excel_file)
+    return pd.read_excel(excel_file, sheet_name=sheet_name)
+
@@ -0,0 +1,143 @@
+# stat_schema.py
+
+import logging
+import numpy as np
+import pandas as pd
+from functools import lru_cache
+from validation_functions import compile_rules, RANGE, ROW_COUNT, UNIQUE
+
+# Column kinds. Every teamrankings stat page has the same layout: Rank, Team, then the current
+# season, Last 3, Last 1, Home, Away and the previous season, all in the stat's unit.
+RANK = 'rank'        # nullable Int16
+TEXT = 'text'        # kept as str
+VALUE = 'value'      # float32
+PERCENT = 'percent'  # "41.2%" -> 0.412 as float32
+AUTO = 'auto'        # PERCENT when every present cell ends in '%', else VALUE
+
+# Cells the site uses for "no value"; they become NA without counting as failed casts
+MISSING_MARKERS = ('', '--', '-', 'N/A', 'NA')
+
+
+class StatSchema:
+    def __init__(self, unit, kind=VALUE):
+        self.unit = unit
+        self.kind = kind
+
+    def column_kind(self, column: str) -> str:
+        if column == 'Rank':
+            return RANK
+        if column in ('Team', 'Team ID'):
+            return TEXT
+        return self.kind
+
+
+# Keyed by teamrankings URL slug; stats not listed are parsed with AUTO
+STAT_SCHEMAS = {
+    'points-per-game': StatSchema('points'),
+    'opponent-points-per-game': StatSchema('points'),
+    'sacks-per-game': StatSchema('sacks'),
+    'third-down-conversion-pct': StatSchema('fraction', PERCENT),
+    'qb-sacked-per-game': StatSchema('sacks'),
+    'opponent-third-down-conversion-pct': StatSchema('fraction', PERCENT),
+    'turnover-margin-per-game': StatSchema('turnovers'),
+    'penalty-yards-per-game': StatSchema('yards'),
+    'red-zone-scoring-pct': StatSchema('fraction', PERCENT),
+    'opponent-red-zone-scores-per-game': StatSchema('scores'),
+}
+DEFAULT_SCHEMA = StatSchema(None, AUTO)
+
+
+# Schema for a URL slug or a sheet name as nfl_scrapper builds them (df_<slug>, cut to 31 chars)
+def schema_for(name: str) -> StatSchema:
+    if name in STAT_SCHEMAS:
+        return STAT_SCHEMAS[name]
+    for slug, schema in STAT_SCHEMAS.items():
+        if name == f"df_{slug.replace('-', '_')}"[:31]:
+            return schema
+    return DEFAULT_SCHEMA
+
+
+def _to_float(text: str) -> float:
+    try:
+        return float(text.rstrip('%').replace(',', ''))
+    except ValueError:
+        return np.nan
+
+
+# float64 values and a failed-cast mask for one column of cells (str, numbers or None). Scraped
+# tables are a few dozen rows, where a loop over the cells beats a chain of pandas .str calls.
+def _parse_numbers(cells, kind):
+    if pd.api.types.is_numeric_dtype(cells):
+        values = pd.to_numeric(cells).to_numpy(dtype=np.float64, na_value=np.nan)
+        return values, np.zeros(len(values), dtype=bool)
+
+    text = ['' if cell is None or cell is pd.NA or cell != cell else str(cell).strip() for cell in cells]
+    missing = np.array([t in MISSING_MARKERS for t in text], dtype=bool)
+    if kind == AUTO:
+        present = [t for t, m in zip(text, missing) if not m]
+        kind = PERCENT if present and all(t.endswith('%') for t in present) else VALUE
+    values = np.array([np.nan if m else _to_float(t) for t, m in zip(text, missing)], dtype=np.float64)
+    if kind == PERCENT:
+        values = values / 100
+    return values, np.isnan(values) & ~missing
+
+
+def _typed_columns(name: str, columns):
+    schema = schema_for(name)
+    typed, failures = {}, {}
+    for column, cells in columns:
+        kind = schema.column_kind(column)
+        if kind == TEXT:
+            typed[column] = cells
+            continue
+        values, failed = _parse_numbers(cells, kind)
+        if failed.any():
+            failures[column] = int(failed.sum())
+        if kind == RANK:
+            typed[column] = pd.array(np.where(np.isnan(values), np.nan, np.round(values)), dtype='Int16')
+        else:
+            typed[column] = values.astype(np.float32)
+    if failures:
+        logging.warning(f"{name}: failed casts per column {failures}")
+    return typed, failures
+
+
+# Validation rules for a typed stat sheet with `columns` from a league of `n_teams`. A missing Team,
+# Rank or name fails the sheet; odd ranks or percentages, duplicate teams and a row count other than
+# the league size are logged as warnings. Cached, so every check of the same layout shares one rule set.
+@lru_cache(maxsize=None)
+def stat_rules(name: str, columns: tuple, n_teams: int):
+    schema = schema_for(name)
+    kinds = {column: schema.column_kind(column) for column in columns if column != 'Team ID'}
+    dtypes = {column: 'integer' if kind == RANK else 'text' if kind == TEXT else 'float'
+              for column, kind in kinds.items()}
+    ranges = {'Rank': (1, n_teams)} if 'Rank' in kinds else {}
+    if schema.kind == PERCENT:
+        ranges.update((column, (0, 1)) for column, kind in kinds.items() if kind == PERCENT)
+    return compile_rules(required_columns=['Rank', 'Team'], nan_columns=['Team'], dtypes=dtypes, ranges=ranges,
+                         unique_columns=['Team'], row_count=n_teams, warn_only=(RANGE, UNIQUE, ROW_COUNT))
+
+
+def _is_typed(df: pd.DataFrame, name: str) -> bool:
+    schema = schema_for(name)
+    for column, dtype in df.dtypes.items():
+        kind = schema.column_kind(column)
+        if kind == RANK and dtype != 'Int16' or kind not in (RANK, TEXT) and dtype != np.float32:
+            return False
+    return True
+
+
+# Typed copy of a stat table: Int16 ranks, float32 values, percentages as fractions. Returns the
+# frame and {column: failed casts}; cells that could not be parsed are NA.
+def coerce_stat_frame(df: pd.DataFrame, name: str):
+    if _is_typed(df, name):
+        return df, {}  # already typed, e.g. frames handed over in-process; keeps memoized validation
+    typed, failures = _typed_columns(name, df.items())
+    return pd.DataFrame(typed, index=df.index), failures
+
+
+# Parse scraped (headers, rows) of strings straight into typed columns
+def typed_stat_frame(headers: list, rows: list, name: str):
+    cells = zip(*rows) if rows else [() for _ in headers]
+    typed, failures = _typed_columns(name, ((header, list(column)) for header, column in zip(headers, cells)))
+    return pd.DataFrame(typed, columns=headers), failures
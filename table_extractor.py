@@ -0,0 +1,196 @@
+# table_extractor.py
+
+import os
+import logging
+from html.parser import HTMLParser
+
+try:
+    import lxml.html
+except ImportError:  # lxml is optional; the stream backend needs only the standard library
+    lxml = None
+
+HEADING_TAGS = ('h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+
+
+def _decode(content) -> str:
+    if isinstance(content, bytes):
+        return content.decode('utf-8', errors='replace')
+    return content
+
+
+# Same semantics as BeautifulSoup attrs matching: a class matches the whole value or any single class
+def _attrs_match(tag_attrs: dict, attrs: dict) -> bool:
+    for name, expected in (attrs or {}).items():
+        value = tag_attrs.get(name)
+        if value is None:
+            return False
+        if name == 'class':
+            if value != expected and expected not in value.split():
+                return False
+        elif value != expected:
+            return False
+    return True
+
+
+def _rows_from_soup_table(table):
+    headers = [th.text.strip() for th in table.find_all('th')]
+    rows = [[td.text.strip() for td in tr.find_all('td')] for tr in table.find_all('tr')[1:]]
+    return headers, rows
+
+
+# Backend 1: full html.parser tree, the original implementation kept as the fallback
+def extract_with_soup(content, attrs=None):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(content, 'html.parser')
+    table = soup.find('table', attrs or {})
+    if table is None:
+        return None
+    return _rows_from_soup_table(table)
+
+
+# Backend 2: html.parser with a SoupStrainer so only <table> subtrees are built.
+# attrs are matched afterwards: strainers see multi-valued class attributes as one raw string.
+def extract_with_strainer(content, attrs=None):
+    from bs4 import BeautifulSoup, SoupStrainer
+
+    soup = BeautifulSoup(content, 'html.parser', parse_only=SoupStrainer('table'))
+    table = soup.find('table', attrs or {})
+    if table is None:
+        return None
+    return _rows_from_soup_table(table)
+
+
+# Backend 3: libxml2 via lxml, walking only the matched table element
+def extract_with_lxml(content, attrs=None):
+    if lxml is None:
+        raise ImportError("lxml is not installed")
+    tree = lxml.html.fromstring(content)
+    for table in tree.iter('table'):
+        if _attrs_match(table.attrib, attrs):
+            break
+    else:
+        return None
+
+    headers = [th.text_content().strip() for th in table.iter('th')]
+    rows = [[td.text_content().strip() for td in tr.iter('td')] for tr in list(table.iter('tr'))[1:]]
+    return headers, rows
+
+
+# Streaming tokenizer for backend 4: collects cells of the first matching table, ignores the rest
+class _TableStreamParser(HTMLParser):
+    def __init__(self, attrs=None):
+        super().__init__(convert_charrefs=True)
+        self.attrs = attrs
+        self.depth = 0
+        self.done = False
+        self.headers = []
+        self.rows = []
+        self.row = None
+        self.cell = None
+        self.cell_tag = None
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        if tag == 'table':
+            if self.depth or _attrs_match(dict((k, v or '') for k, v in attrs), self.attrs):
+                self.depth += 1
+        elif not self.depth:
+            return
+        elif tag == 'tr':
+            self._close_cell()
+            self.row = []
+            self.rows.append(self.row)
+        elif tag in ('td', 'th'):
+            self._close_cell()
+            self.cell = []
+            self.cell_tag = tag
+
+    def handle_endtag(self, tag):
+        if self.done or not self.depth:
+            return
+        if tag in ('td', 'th', 'tr'):
+            self._close_cell()
+        elif tag == 'table':
+            self._close_cell()
+            self.depth -= 1
+            if not self.depth:
+                self.done = True
+
+    def handle_data(self, data):
+        if self.cell is not None:
+            self.cell.append(data)
+
+    def _close_cell(self):
+        if self.cell is None:
+            return
+        text = ''.join(self.cell).strip()
+        if self.cell_tag == 'th':
+            self.headers.append(text)
+        elif self.row is not None:
+            self.row.append(text)
+        self.cell = None
+        self.cell_tag = None
+
+
+# Backend 4: regex-free streaming tokenizer from the standard library, no tree at all
+def extract_with_stream(content, attrs=None):
+    parser = _TableStreamParser(attrs)
+    parser.feed(_decode(content))
+    parser.close()
+    if not parser.depth and not parser.done:
+        return None
+    return parser.headers, parser.rows[1:]
+
+
+BACKENDS = {
+    'soup': extract_with_soup,
+    'strainer': extract_with_strainer,
+    'lxml': extract_with_lxml,
+    'stream': extract_with_stream,
+}
+DEFAULT_BACKEND = os.getenv('NFL_TABLE_BACKEND', 'lxml' if lxml is not None else 'stream')
+
+
+# (headers, rows) of every table matching attrs, e.g. one per week on the season schedule page.
+# With headings=True each item is (heading, headers, rows), heading being the text of the nearest
+# <h1>-<h6> before the table (None if there is none), such as the "Week 5" above each week's table.
+def extract_tables(content, attrs=None, headings=False) -> list:
+    if lxml is not None:
+        tree = lxml.html.fromstring(content)
+        tables, heading = [], None
+        for element in tree.iter('table', *HEADING_TAGS):
+            if element.tag in HEADING_TAGS:
+                heading = element.text_content().strip()
+            elif _attrs_match(element.attrib, attrs):
+                headers = [th.text_content().strip() for th in element.iter('th')]
+                rows = [[td.text_content().strip() for td in tr.iter('td')] for tr in list(element.iter('tr'))[1:]]
+                tables.append((heading, headers, rows) if headings else (headers, rows))
+        return tables
+    from bs4 import BeautifulSoup, SoupStrainer
+
+    soup = BeautifulSoup(content, 'html.parser', parse_only=SoupStrainer(['table', *HEADING_TAGS]))
+    tables = []
+    for table in soup.find_all('table', attrs or {}):
+        headers, rows = _rows_from_soup_table(table)
+        if headings:
+            previous = table.find_previous(HEADING_TAGS)
+            tables.append((previous.text.strip() if previous is not None else None, headers, rows))
+        else:
+            tables.append((headers, rows))
+    return tables
+
+
+# Extract (headers, rows) of the first table matching attrs; falls back to the full soup parse
+def extract_table(content, attrs=None, backend=None):
+    backend = backend or DEFAULT_BACKEND
+    if backend != 'soup':
+        try:
+            result = BACKENDS[backend](content, attrs)
+            if result is not None:
+                return result
+            logging.warning(f"Table extractor '{backend}' found no table, falling back to soup")
+        except Exception as e:
+            logging.warning(f"Table extractor '{backend}' failed, falling back to soup: {e}")
+    return extract_with_soup(content, attrs)
@@ -0,0 +1,125 @@
+# team_registry.py
+
+import re
+import logging
+import numpy as np
+import pandas as pd
+from pipeline_logging import log_sampled
+
+MATCHUP_SPLIT_PATTERN = r'\s*@\s*|\s*vs\.\s*|\s*vs\s*'
+
+# (canonical teamrankings name, abbreviations, city, nickname, extra aliases)
+NFL_TEAMS = [
+    ('Arizona', ['ARI', 'ARZ'], 'Arizona', 'Cardinals', []),
+    ('Atlanta', ['ATL'], 'Atlanta', 'Falcons', []),
+    ('Baltimore', ['BAL'], 'Baltimore', 'Ravens', []),
+    ('Buffalo', ['BUF'], 'Buffalo', 'Bills', []),
+    ('Carolina', ['CAR'], 'Carolina', 'Panthers', []),
+    ('Chicago', ['CHI'], 'Chicago', 'Bears', []),
+    ('Cincinnati', ['CIN'], 'Cincinnati', 'Bengals', []),
+    ('Cleveland', ['CLE'], 'Cleveland', 'Browns', []),
+    ('Dallas', ['DAL'], 'Dallas', 'Cowboys', []),
+    ('Denver', ['DEN'], 'Denver', 'Broncos', []),
+    ('Detroit', ['DET'], 'Detroit', 'Lions', []),
+    ('Green Bay', ['GB', 'GNB'], 'Green Bay', 'Packers', []),
+    ('Houston', ['HOU'], 'Houston', 'Texans', []),
+    ('Indianapolis', ['IND'], 'Indianapolis', 'Colts', []),
+    ('Jacksonville', ['JAX', 'JAC'], 'Jacksonville', 'Jaguars', []),
+    ('Kansas City', ['KC', 'KAN'], 'Kansas City', 'Chiefs', []),
+    ('Las Vegas', ['LV', 'LVR'], 'Las Vegas', 'Raiders', ['Oakland', 'Oakland Raiders']),
+    ('LA Chargers', ['LAC'], 'Los Angeles', 'Chargers', ['San Diego', 'San Diego Chargers']),
+    ('LA Rams', ['LAR'], 'Los Angeles', 'Rams', ['St. Louis Rams']),
+    ('Miami', ['MIA'], 'Miami', 'Dolphins', []),
+    ('Minnesota', ['MIN'], 'Minnesota', 'Vikings', []),
+    ('New England', ['NE', 'NWE'], 'New England', 'Patriots', []),
+    ('New Orleans', ['NO', 'NOR'], 'New Orleans', 'Saints', []),
+    ('NY Giants', ['NYG'], 'New York', 'Giants', []),
+    ('NY Jets', ['NYJ'], 'New York', 'Jets', []),
+    ('Philadelphia', ['PHI'], 'Philadelphia', 'Eagles', []),
+    ('Pittsburgh', ['PIT'], 'Pittsburgh', 'Steelers', []),
+    ('San Francisco', ['SF', 'SFO'], 'San Francisco', '49ers', []),
+    ('Seattle', ['SEA'], 'Seattle', 'Seahawks', []),
+    ('Tampa Bay', ['TB', 'TAM'], 'Tampa Bay', 'Buccaneers', ['Bucs']),
+    ('Tennessee', ['TEN'], 'Tennessee', 'Titans', []),
+    ('Washington', ['WAS', 'WSH'], 'Washington', 'Commanders', ['Washington Football Team', 'Football Team']),
+]
+
+
+# Lowercase, drop periods and a leading "#12" rank marker, collapse whitespace
+def normalize(name) -> str:
+    name = re.sub(r'^#\d+\s+', '', str(name).strip())
+    return ' '.join(name.replace('.', '').lower().split())
+
+
+# Canonical team list with an O(1) alias hash; ids are positions in `names`
+class TeamRegistry:
+    def __init__(self, teams):
+        self.names = []
+        self.aliases = {}
+        self.ambiguous = {'la', 'ny'}
+
+        for team_id, (name, abbreviations, city, nickname, extra) in enumerate(teams):
+            self.names.append(name)
+            for spelling in [name, city, nickname, f"{city} {nickname}", *abbreviations, *extra]:
+                self._add_alias(normalize(spelling), team_id)
+
+        # City or market names shared by several teams never resolve on their own
+        for alias in self.ambiguous:
+            self.aliases.pop(alias, None)
+
+    def _add_alias(self, alias, team_id):
+        existing = self.aliases.get(alias)
+        if existing is not None and existing != team_id:
+            self.ambiguous.add(alias)
+        self.aliases[alias] = team_id
+
+    def __len__(self):
+        return len(self.names)
+
+    # Smallest signed integer dtype that holds every id plus the -1 "unknown" marker
+    @property
+    def id_dtype(self):
+        for dtype in (np.int8, np.int16, np.int32):
+            if len(self.names) <= np.iinfo(dtype).max:
+                return dtype
+        return np.int64
+
+    # Team id for any known spelling, -1 if unknown or ambiguous
+    def team_id(self, name) -> int:
+        alias = normalize(name)
+        team_id = self.aliases.get(alias)
+        if team_id is None:
+            if alias in self.ambiguous:
+                log_sampled(logging.WARNING, 'ambiguous_team', "Team name '%s' is ambiguous and was not resolved", name)
+            else:
+                log_sampled(logging.WARNING, 'unknown_team', "Unknown team name '%s'", name)
+            return -1
+        return team_id
+
+    def team_name(self, team_id: int) -> str:
+        return self.names[team_id] if team_id >= 0 else None
+
+    # Resolve a column of names, hashing each distinct spelling once
+    def team_ids(self, names: pd.Series) -> np.ndarray:
+        codes, uniques = pd.factorize(names.astype(str))
+        lookup = np.array([self.team_id(name) for name in uniques], dtype=self.id_dtype)
+        ids = np.full(len(codes), -1, dtype=self.id_dtype)
+        ids[codes >= 0] = lookup[codes[codes >= 0]]
+        return ids
+
+    # Team id for each side of "Away @ Home" / "Team vs. Team" strings; -1 where malformed
+    def matchup_team_ids(self, matchups: pd.Series):
+        teams = matchups.astype(str).str.split(MATCHUP_SPLIT_PATTERN, regex=True)
+        well_formed = (teams.str.len() == 2).to_numpy()
+        team1 = np.full(len(teams), -1, dtype=self.id_dtype)
+        team2 = np.full(len(teams), -1, dtype=self.id_dtype)
+        if well_formed.any():
+            team1[well_formed] = self.team_ids(teams[well_formed].str[0].str.strip())
+            team2[well_formed] = self.team_ids(teams[well_formed].str[1].str.strip())
+        return team1, team2, well_formed
+
+    def categorical(self, team_ids) -> pd.Categorical:
+        return pd.Categorical.from_codes(np.asarray(team_ids), categories=self.names)
+
+
+NFL_REGISTRY = TeamRegistry(NFL_TEAMS)
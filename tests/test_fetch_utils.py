@@ -0,0 +1,43 @@
+# test_fetch_utils.py
+#
+# The shared requests session: one session for every caller, with a connection pool as large as the
+# largest pool_size asked for so far.
+# Usage: python -m pytest -q tests/test_fetch_utils.py
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fetch_utils
+from fetch_utils import get_session
+
+
+@pytest.fixture(autouse=True)
+def fresh_session(monkeypatch):
+    monkeypatch.setattr(fetch_utils, '_session', None)
+    monkeypatch.setattr(fetch_utils, '_session_pool_size', 0)
+
+
+def pool_sizes(session):
+    return {prefix: session.get_adapter(f"{prefix}example.com")._pool_maxsize for prefix in ('http://', 'https://')}
+
+
+def test_larger_pool_size_grows_the_shared_session():
+    session = get_session(4)
+    assert pool_sizes(session) == {'http://': 4, 'https://': 4}
+
+    assert get_session(16) is session
+    assert pool_sizes(session) == {'http://': 16, 'https://': 16}
+
+
+def test_smaller_pool_size_keeps_the_larger_pool():
+    session = get_session(16)
+    adapter = session.get_adapter('https://example.com')
+
+    assert get_session(4) is session
+    assert get_session() is session
+    assert session.get_adapter('https://example.com') is adapter
+    assert pool_sizes(session) == {'http://': 16, 'https://': 16}
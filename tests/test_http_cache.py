@@ -0,0 +1,61 @@
+# test_http_cache.py
+#
+# Snapshot lookups in the conditional-GET cache: a corrupt pickle is a miss that evicts the entry, and
+# two scrapers caching different frames for the same URL do not see each other's snapshots.
+# Usage: python -m pytest -q tests/test_http_cache.py
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from http_cache import HttpCache
+
+URL = 'https://www.teamrankings.com/nfl/schedules/season/'
+
+
+def page(status=200, body=b'<table>schedule</table>'):
+    response = requests.Response()
+    response.status_code = status
+    response.url = URL
+    response._content = body
+    response.headers['ETag'] = '"v1"'
+    return response
+
+
+@pytest.mark.parametrize('damage', ['empty', 'truncated', 'garbage'])
+def test_unreadable_snapshot_is_a_miss_and_is_evicted(tmp_path, damage):
+    cache = HttpCache(str(tmp_path))
+    cache.store(URL, page(), pd.DataFrame({'Teams': ['Baltimore  @  Kansas City']}))
+    [key] = cache.index
+    with open(cache._path(key, 'pkl'), 'rb') as f:
+        snapshot = f.read()
+    with open(cache._path(key, 'pkl'), 'wb') as f:
+        f.write({'empty': b'', 'truncated': snapshot[:len(snapshot) // 2], 'garbage': b'not a pickle'}[damage])
+
+    fresh = HttpCache(str(tmp_path))  # nothing warm in memory, so the pickle is read
+    assert fresh.lookup(URL, page(304)) is None
+
+    assert fresh.index == {}
+    assert not os.path.exists(fresh._path(key, 'pkl')) and not os.path.exists(fresh._path(key, 'body'))
+    assert HttpCache(str(tmp_path)).conditional_headers(URL) == {}
+
+
+def test_namespaces_keep_frames_of_the_same_url_apart(tmp_path):
+    cache = HttpCache(str(tmp_path))
+    week = pd.DataFrame({'Teams': ['Baltimore  @  Kansas City']})
+    season = pd.DataFrame({'Week': [1, 1], 'Teams': ['Baltimore  @  Kansas City', 'Green Bay  @  Philadelphia']})
+    cache.store(URL, page(), week, 'current_week_schedule')
+
+    assert cache.conditional_headers(URL, 'season_schedule') == {}
+    assert cache.lookup(URL, page(), 'season_schedule') is None
+    cache.store(URL, page(), season, 'season_schedule')
+
+    fresh = HttpCache(str(tmp_path))
+    assert fresh.conditional_headers(URL, 'current_week_schedule') == {'If-None-Match': '"v1"'}
+    pd.testing.assert_frame_equal(fresh.lookup(URL, page(304), 'current_week_schedule'), week)
+    pd.testing.assert_frame_equal(fresh.lookup(URL, page(304), 'season_schedule'), season)
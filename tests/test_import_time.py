@@ -0,0 +1,46 @@
+# test_import_time.py
+#
+# Import-time budget per top-level module: entry points like `run_all_nfl_scripts.py --list` and
+# single stages should not pay for pandas, gspread, bs4 or jinja2 unless they use them.
+# Usage: python -m pytest -q tests/test_import_time.py
+
+import os
+import sys
+import json
+import glob
+import subprocess
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGETS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'import_budgets.json')
+BUDGET_SCALE = float(os.getenv('NFL_IMPORT_BUDGET_SCALE', '1'))
+RUNS = 3
+
+with open(BUDGETS_FILE) as f:
+    BUDGETS = json.load(f)
+
+MODULES = sorted(os.path.splitext(os.path.basename(path))[0] for path in glob.glob(os.path.join(ROOT, '*.py')))
+
+
+# Cumulative microseconds for `module` from one fresh interpreter's -X importtime report
+def import_time_us(module: str, cwd: str) -> int:
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+                            cwd=cwd, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr[-2000:]
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if name.rstrip() == f" {module}":
+            return int(cumulative)
+    raise AssertionError(f"{module} missing from the -X importtime report")
+
+
+@pytest.mark.parametrize('module', MODULES)
+def test_import_time_within_budget(module, tmp_path):
+    budget_ms = BUDGETS['modules'].get(module, BUDGETS['default_ms']) * BUDGET_SCALE
+    # Best of a few runs, so a cold disk cache or a busy machine does not fail the test
+    best_ms = min(import_time_us(module, str(tmp_path)) for _ in range(RUNS)) / 1000
+    assert best_ms <= budget_ms, f"importing {module} took {best_ms:.0f} ms, budget {budget_ms:.0f} ms"
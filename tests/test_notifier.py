@@ -0,0 +1,127 @@
+# test_notifier.py
+#
+# The background notifier against a local SMTP stand-in: one connection is reused for several emails,
+# a rejected or dropped send is retried on a fresh connection, and non-urgent notifications are
+# batched into one digest while urgent ones go out at once.
+# Usage: python -m pytest -q tests/test_notifier.py
+
+import os
+import sys
+import email
+import threading
+import socketserver
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from notifier import Notifier
+
+
+# Just enough SMTP for smtplib: no TLS, no auth. `fail_data` holds one action per upcoming DATA
+# command ('451' rejects the message, 'drop' closes the connection); later messages are accepted.
+class StandInSMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode('ascii'))
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply('220 stand-in ready')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('ascii').strip().upper()
+            if command.startswith(('EHLO', 'HELO')):
+                self.reply('250 stand-in')
+            elif command.startswith('DATA'):
+                self.reply('354 end with <CRLF>.<CRLF>')
+                data = []
+                for raw in iter(self.rfile.readline, b''):
+                    if raw in (b'.\r\n', b'.\n'):
+                        break
+                    data.append(raw[1:] if raw.startswith(b'..') else raw)
+                with server.lock:
+                    action = server.fail_data.pop(0) if server.fail_data else None
+                    if action is None:
+                        server.messages.append(email.message_from_bytes(b''.join(data)))
+                if action == 'drop':
+                    return
+                self.reply('451 try again later' if action == '451' else '250 queued')
+            elif command.startswith('QUIT'):
+                self.reply('221 bye')
+                return
+            else:  # MAIL, RCPT, RSET, NOOP
+                self.reply('250 ok')
+
+
+@pytest.fixture
+def smtp_server():
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), StandInSMTPHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.connections = 0
+    server.messages = []
+    server.fail_data = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_notifier(server, **options):
+    return Notifier(sender='pipeline@example.com', receiver='owner@example.com', password='',
+                    host='127.0.0.1', port=server.server_address[1], starttls=False, **options)
+
+
+def test_connection_is_reused_between_emails(smtp_server):
+    notifier = make_notifier(smtp_server)
+    for n in range(3):
+        notifier.notify(f"Run {n}", "done")
+    notifier.close(timeout=10)
+
+    assert [msg['Subject'] for msg in smtp_server.messages] == ['Run 0', 'Run 1', 'Run 2']
+    assert smtp_server.connections == 1
+    assert notifier.stats['sent'] == 3
+    assert notifier.stats['connections'] == 1
+
+
+def test_failed_sends_are_retried_on_a_new_connection(smtp_server):
+    smtp_server.fail_data = ['451', 'drop']
+    notifier = make_notifier(smtp_server, retries=3, backoff=0.01)
+    notifier.notify("Pipeline failed", "stage error", urgent=True)
+    notifier.close(timeout=10)
+
+    assert [msg['Subject'] for msg in smtp_server.messages] == ['Pipeline failed']
+    assert notifier.stats['retries'] == 2
+    assert notifier.stats['sent'] == 1
+    assert notifier.stats['failed'] == 0
+    assert smtp_server.connections == 3
+
+
+def test_retries_are_bounded(smtp_server):
+    smtp_server.fail_data = ['451'] * 5
+    notifier = make_notifier(smtp_server, retries=2, backoff=0.01)
+    notifier.notify("Pipeline failed", "stage error", urgent=True)
+    notifier.close(timeout=10)
+
+    assert smtp_server.messages == []
+    assert notifier.stats['retries'] == 2
+    assert notifier.stats['failed'] == 1
+
+
+def test_non_urgent_notifications_are_batched_into_a_digest(smtp_server):
+    notifier = make_notifier(smtp_server, digest_minutes=60)
+    notifier.notify("Run 1 succeeded", "first")
+    notifier.notify("Pipeline failed", "stage error", urgent=True)
+    notifier.notify("Run 2 succeeded", "second")
+    notifier.close(timeout=10)  # delivers the pending digest
+
+    subjects = [msg['Subject'] for msg in smtp_server.messages]
+    assert subjects == ['Pipeline failed', 'NFL Pipeline digest: 2 notification(s)']
+    digest = smtp_server.messages[1].get_payload()[0].get_payload(decode=True).decode().replace('\r\n', '\n')
+    assert 'Run 1 succeeded\nfirst' in digest and 'Run 2 succeeded\nsecond' in digest
+    assert notifier.stats['digests'] == 1
+    assert smtp_server.connections == 1
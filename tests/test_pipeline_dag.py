@@ -0,0 +1,53 @@
+# test_pipeline_dag.py
+#
+# Stages that do not run still appear in the run's spans and stage summary: a zero-duration 'stage'
+# span with status 'skipped', both when the inputs are unchanged and when a dependency failed.
+# Usage: python -m pytest -q tests/test_pipeline_dag.py
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import instrumentation
+from fingerprints import FingerprintManifest
+from instrumentation import start_run, run_spans, format_stage_summary
+from pipeline_dag import Stage, StageError, run_dag, CONTINUE
+
+
+@pytest.fixture(autouse=True)
+def spans_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(instrumentation, 'SPANS_FILE', str(tmp_path / 'pipeline_spans.jsonl'))
+    start_run('test-run')
+
+
+def test_unchanged_stages_get_a_skipped_span(tmp_path):
+    source = tmp_path / 'nfl_stats.xlsx'
+    source.write_text('stats')
+    manifest = FingerprintManifest(str(tmp_path / 'manifest.json'))
+    stages = [Stage('matchup_stats', lambda inputs: 'done', inputs=[str(source)])]
+
+    assert [r.status for r in run_dag(stages, manifest=manifest)] == ['success']
+    start_run('second-run')
+    assert [r.status for r in run_dag(stages, manifest=manifest)] == ['unchanged']
+
+    [record] = run_spans('stage')
+    assert record['name'] == 'matchup_stats' and record['status'] == 'skipped'
+    assert record['wall_s'] == 0 and record['cpu_s'] == 0
+    assert format_stage_summary() == 'matchup_stats skipped'
+
+
+def test_stages_after_a_failure_get_a_skipped_span():
+    def fail(inputs):
+        raise StageError('no table found')
+
+    stages = [Stage('nfl_scrapper', fail), Stage('matchup_stats', lambda inputs: 'done', deps=['nfl_scrapper'])]
+
+    results = run_dag(stages, policy=CONTINUE)
+
+    assert [r.status for r in results] == ['failed', 'skipped']
+    statuses = {record['name']: record['status'] for record in run_spans('stage')}
+    assert statuses == {'nfl_scrapper': 'error', 'matchup_stats': 'skipped'}
+    assert format_stage_summary().endswith('; matchup_stats skipped')
@@ -0,0 +1,80 @@
+# test_pipeline_logging.py
+#
+# Queued JSON logging: records cross to the listener thread with their arguments unformatted and
+# their traceback rendered, so every line of the log file carries 'msg' and, for exceptions, 'exc'.
+# Usage: python -m pytest -q tests/test_pipeline_logging.py
+
+import os
+import sys
+import json
+import queue
+import logging
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pipeline_logging
+from pipeline_logging import StructuredQueueHandler
+
+
+@pytest.fixture
+def log_lines(tmp_path, monkeypatch):
+    log_file = tmp_path / 'nfl_pipeline.log'
+    monkeypatch.setattr(pipeline_logging, 'LOG_FILE', str(log_file))
+    monkeypatch.setattr(pipeline_logging, 'LOG_ARCHIVE_DIR', str(tmp_path / 'logs'))
+    monkeypatch.setattr(pipeline_logging, 'LOG_FORMAT', 'json')
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    for handler in handlers:
+        root.removeHandler(handler)
+    monkeypatch.setattr(pipeline_logging, '_listener', None)
+    pipeline_logging.setup_logging()
+
+    def read():
+        pipeline_logging.shutdown_logging()  # drains the queue
+        with open(log_file, encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+
+    yield read
+    pipeline_logging.shutdown_logging()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+
+
+def test_logged_exception_has_exc_key(log_lines):
+    try:
+        {}['missing']
+    except KeyError:
+        logging.exception("Stage %s failed", 'nfl_scrapper')
+
+    [entry] = log_lines()
+    assert entry['msg'] == "Stage nfl_scrapper failed"
+    assert entry['level'] == 'ERROR'
+    assert 'Traceback' in entry['exc'] and "KeyError: 'missing'" in entry['exc']
+
+
+def test_plain_messages_have_no_exc_key(log_lines):
+    logging.warning("Evicted %d entries from %s", 3, 'http_cache')
+
+    [entry] = log_lines()
+    assert entry['msg'] == "Evicted 3 entries from http_cache"
+    assert 'exc' not in entry
+
+
+def test_prepare_keeps_args_and_drops_live_traceback():
+    handler = StructuredQueueHandler(queue.SimpleQueue())
+    try:
+        raise ValueError('bad row')
+    except ValueError:
+        record = logging.LogRecord('root', logging.ERROR, __file__, 1, "Row %d: %s", (7, 'x'), sys.exc_info())
+
+    prepared = handler.prepare(record)
+
+    assert prepared.msg == "Row %d: %s" and prepared.args == (7, 'x')
+    assert prepared.exc_info is None
+    assert 'ValueError: bad row' in prepared.exc_text
+    assert record.exc_info is not None  # the caller's record is left alone
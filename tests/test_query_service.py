@@ -0,0 +1,86 @@
+# test_query_service.py
+#
+# Query service responses from a stats stage written like the pipeline's: float32 stat values come
+# back at their own precision (32.3, not 32.299999), unknown names are 404s while unexpected errors are
+# 500s, and replacing an Excel fallback counts as new artifacts.
+# Usage: python -m pytest -q tests/test_query_service.py
+
+import os
+import sys
+import json
+import shutil
+
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import stage_store
+import query_service
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(stage_store, 'STAGE_DIR', str(tmp_path / 'stage_store'))
+    sheets = pd.read_excel(os.path.join(ROOT, 'nfl_stats.xlsx'), sheet_name=None, dtype=str)
+    stage_store.write_stage('nfl_stats', sheets)
+    service = query_service.QueryService()
+    service.data = query_service.MatchupData()
+    return service
+
+
+def get(service, target):
+    status, body = service.respond('GET', target)
+    return status, json.loads(body)
+
+
+def test_leaderboard_values_keep_their_decimal_form(service):
+    status, body = get(service, '/leaderboard/points-per-game?limit=3')
+
+    assert status == 200
+    first = body['rows'][0]
+    assert first['Team'] == 'Washington'
+    assert first['Last 3'] == 32.3
+    assert first['2024'] == 31.1
+    assert [row['Rank'] for row in body['rows']] == [1, 1, 3]
+
+
+def test_percentages_are_fractions_without_float32_noise(service):
+    sheet = pd.read_excel(os.path.join(ROOT, 'nfl_stats.xlsx'), sheet_name='df_third_down_conversion_pct', dtype=str)
+    expected = {team: round(float(text.rstrip('%')) / 100, 6) for team, text in zip(sheet['Team'], sheet['2024'])}
+
+    status, body = get(service, '/leaderboard/third-down-conversion-pct?limit=32')
+
+    assert status == 200
+    assert {row['Team']: row['2024'] for row in body['rows']} == expected
+
+
+def test_unknown_team_stat_and_endpoint_are_not_found(service):
+    for target in ('/teams/Nowhere', '/leaderboard/punts-per-fortnight', '/matchup/Washington/Nowhere', '/nope'):
+        status, body = get(service, target)
+        assert status == 404, target
+        assert body['error']
+
+
+def test_other_lookup_errors_are_internal_errors(service, monkeypatch):
+    def broken(stat, limit):
+        raise KeyError('Rank')
+
+    monkeypatch.setattr(service.data, 'leaderboard', broken)
+
+    assert get(service, '/leaderboard/points-per-game') == (500, {'error': 'internal error'})
+    assert service.cache.entries == {}
+
+
+def test_excel_fallback_changes_the_artifact_version(service):
+    version = query_service.artifact_version()
+    assert service.data.week is None
+
+    shutil.copy(os.path.join(ROOT, 'nfl_output.xlsx'), 'nfl_output.xlsx')
+
+    assert query_service.artifact_version() != version
+    data = query_service.MatchupData()
+    assert data.version == query_service.artifact_version()
+    assert data.this_week(data.team_id('Minnesota'))['Opponent'] == 'LA Rams'
@@ -0,0 +1,81 @@
+# test_schedule_scrapper.py
+#
+# Week numbers of the season schedule: read from the "Week N" headings of the real teamrankings
+# markup (benchmarks/fixtures/schedule_season.html, built from the saved page), from "Week N" table
+# headers, or in page order with a warning when a page labels neither.
+# Usage: python -m pytest -q tests/test_schedule_scrapper.py
+
+import os
+import sys
+import logging
+
+import pytest
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import schedule_scrapper
+from http_cache import HttpCache
+
+SEASON_PAGE = os.path.join(ROOT, 'benchmarks', 'fixtures', 'schedule_season.html')
+URL = 'https://www.teamrankings.com/nfl/schedules/season/'
+
+
+def table(header, games):
+    rows = ''.join(f'<tr><td><a href="/nfl/matchup/x">{teams}</a></td><td>1:00 PM</td><td>Stadium</td></tr>'
+                   for teams in games)
+    return (f'<table class="tr-table"><thead><tr><th>{header}</th><th>Time</th><th>Location</th></tr></thead>'
+            f'<tbody>{rows}</tbody></table>')
+
+
+@pytest.fixture
+def serve(monkeypatch, tmp_path):
+    def scrape(content):
+        def fake_fetch(url, headers=None, deadline=None):
+            response = requests.Response()
+            response.status_code = 200
+            response.url = url
+            response._content = content.encode('utf-8') if isinstance(content, str) else content
+            return response
+
+        monkeypatch.setattr(schedule_scrapper, 'fetch', fake_fetch)
+        return schedule_scrapper.scrape_season_schedule(URL, cache=HttpCache(str(tmp_path / 'http_cache')))
+    return scrape
+
+
+def test_weeks_come_from_section_headings_on_the_real_page(serve, caplog):
+    with open(SEASON_PAGE, 'rb') as f:
+        df = serve(f.read())
+
+    assert sorted(df['Week'].unique()) == list(range(1, 19))
+    week_1 = df[df['Week'] == 1]
+    assert len(week_1) == 16
+    assert week_1['Teams'].iloc[0] == 'Baltimore  @  Kansas City'
+    assert df[df['Week'] == 18]['Teams'].iloc[-1] == 'Houston  @  Tennessee'
+    assert (df['Team1 ID'] >= 0).all() and (df['Team2 ID'] >= 0).all()
+    assert 'page order' not in caplog.text
+
+
+def test_headings_win_over_page_order(serve):
+    page = (f"<h1>NFL Schedule</h1><h4>Week 12</h4>{table('Thu Nov 21', ['Pittsburgh  @  Cleveland'])}"
+            f"<h4>Week 13</h4>{table('Thu Nov 28', ['Chicago  @  Detroit', 'NY Giants  @  Dallas'])}")
+
+    df = serve(page)
+
+    assert df['Week'].tolist() == [12, 13, 13]
+
+
+def test_week_table_headers_are_used_without_headings(serve):
+    df = serve(table('Week 10', ['Cincinnati  @  Baltimore']) + table('Week 11', ['Washington  @  Philadelphia']))
+
+    assert df['Week'].tolist() == [10, 11]
+
+
+def test_unlabeled_tables_are_numbered_in_page_order(serve, caplog):
+    with caplog.at_level(logging.WARNING):
+        df = serve(f"<h1>NFL Schedule</h1>{table('Sun Sep  8', ['Arizona  @  Buffalo'])}"
+                   f"{table('Sun Sep 15', ['NY Jets  @  Tennessee'])}")
+
+    assert df['Week'].tolist() == [1, 2]
+    assert '2 of 2 schedule table(s)' in caplog.text and 'page order' in caplog.text
@@ -0,0 +1,163 @@
+# test_sheets_sync.py
+#
+# Row-diff sync of a DataFrame to a worksheet, checked offline against sheets_sync.FakeWorksheet:
+# nothing is sent for an unchanged grid, only changed rows are written, the sheet grows when needed,
+# large diffs are split into several batch_update calls and rate-limit errors are retried.
+# Usage: python -m pytest -q tests/test_sheets_sync.py
+
+import os
+import sys
+import json
+import functools
+
+import pandas as pd
+import pytest
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sheets_sync
+from sheets_sync import FakeWorksheet, sync_worksheet, to_grid, chunk_ranges, with_backoff
+
+SPREADSHEET_ID = 'test-spreadsheet'
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(sheets_sync, 'SYNC_CACHE_DIR', str(tmp_path / 'sheets_cache'))
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr(sheets_sync.time, 'sleep', delays.append)
+    return delays
+
+
+def stats_frame(rows=5):
+    return pd.DataFrame({'Team': [f"Team {i}" for i in range(rows)],
+                         'Rank': list(range(1, rows + 1)),
+                         'Value': [round(20.5 + i, 1) for i in range(rows)]})
+
+
+def api_error(status, retry_after=None):
+    from gspread.exceptions import APIError
+
+    response = requests.Response()
+    response.status_code = status
+    response._content = json.dumps({'error': {'code': status, 'message': 'quota', 'status': 'x'}}).encode()
+    if retry_after is not None:
+        response.headers['Retry-After'] = str(retry_after)
+    return APIError(response)
+
+
+def test_unchanged_grid_sends_nothing():
+    df = stats_frame()
+    worksheet = FakeWorksheet(to_grid(df))
+
+    assert sync_worksheet(worksheet, df, SPREADSHEET_ID, 'Stats', use_cache=False) == 0
+    assert worksheet.calls == ['get_all_values']
+
+    # The cached grid now stands in for the sheet: no read either
+    worksheet.calls.clear()
+    assert sync_worksheet(worksheet, df, SPREADSHEET_ID, 'Stats') == 0
+    assert worksheet.calls == []
+
+
+def test_changed_rows_only_are_written():
+    df = stats_frame()
+    worksheet = FakeWorksheet(to_grid(df))
+    sync_worksheet(worksheet, df, SPREADSHEET_ID, 'Stats', use_cache=False)
+
+    changed = df.copy()
+    changed.loc[2, 'Value'] = 99.9
+    changed.loc[3, 'Value'] = 98.8
+    worksheet.calls.clear()
+    sent = []
+    original = worksheet.batch_update
+    worksheet.batch_update = lambda data, **kwargs: (sent.append(data), original(data, **kwargs))
+
+    cells = sync_worksheet(worksheet, changed, SPREADSHEET_ID, 'Stats')
+
+    assert worksheet.calls == ['batch_update']
+    assert [item['range'] for item in sent[0]] == ['A4:C5']  # data rows 2-3 are sheet rows 4-5
+    assert cells == 6
+    assert worksheet.get_all_values() == to_grid(changed)
+
+
+def test_sheet_grows_when_rows_are_added():
+    worksheet = FakeWorksheet(to_grid(stats_frame(2)), rows=3, cols=3)
+    bigger = stats_frame(6)
+
+    sync_worksheet(worksheet, bigger, SPREADSHEET_ID, 'Stats', use_cache=False)
+
+    assert 'resize' in worksheet.calls
+    assert worksheet.calls.index('resize') < worksheet.calls.index('batch_update')
+    assert worksheet.row_count == 7
+    assert worksheet.get_all_values() == to_grid(bigger)
+
+
+def test_rows_removed_are_blanked_without_resizing():
+    worksheet = FakeWorksheet(to_grid(stats_frame(6)), rows=7, cols=3)
+    smaller = stats_frame(3)
+
+    sync_worksheet(worksheet, smaller, SPREADSHEET_ID, 'Stats', use_cache=False)
+
+    assert 'resize' not in worksheet.calls
+    assert worksheet.row_count == 7
+    assert worksheet.get_all_values() == to_grid(smaller)
+
+
+def test_large_diff_is_split_into_batches(monkeypatch):
+    monkeypatch.setattr(sheets_sync, 'chunk_ranges', functools.partial(chunk_ranges, max_cells=10))
+    worksheet = FakeWorksheet()
+    df = stats_frame(10)
+
+    cells = sync_worksheet(worksheet, df, SPREADSHEET_ID, 'Stats', use_cache=False)
+
+    assert worksheet.calls.count('batch_update') == 4  # 11 rows of 3 cells, at most 3 rows per batch
+    assert cells == 33
+    assert worksheet.get_all_values() == to_grid(df)
+
+
+def test_chunk_ranges_respects_cell_limit():
+    runs = [(2, [['a', 'b']] * 7), (20, [['c', 'd']] * 2)]
+
+    batches = chunk_ranges(runs, max_cells=6)
+
+    assert all(sum(len(item['values']) * 2 for item in batch) <= 6 for batch in batches)
+    assert [item['range'] for batch in batches for item in batch] == ['A2:B4', 'A5:B7', 'A8:B8', 'A20:B21']
+
+
+def test_rate_limited_calls_are_retried(sleeps):
+    failures = [api_error(429, retry_after=7), api_error(503)]
+
+    def flaky_get_all_values():
+        if failures:
+            raise failures.pop(0)
+        return [['Team']]
+
+    assert with_backoff(flaky_get_all_values) == [['Team']]
+    assert len(sleeps) == 2
+    assert sleeps[0] == 7  # Retry-After is honoured
+    assert 2 <= sleeps[1] < 3  # then exponential backoff with jitter
+
+
+def test_client_errors_and_exhausted_retries_raise(sleeps, monkeypatch):
+    from gspread.exceptions import APIError
+
+    def rejected():
+        raise api_error(400)
+
+    with pytest.raises(APIError):
+        with_backoff(rejected)
+    assert sleeps == []
+
+    monkeypatch.setattr(sheets_sync, 'MAX_RETRIES', 2)
+
+    def throttled():
+        raise api_error(429)
+
+    with pytest.raises(APIError):
+        with_backoff(throttled)
+    assert len(sleeps) == 2
@@ -1,8 +1,195 @@
 # validation_functions.py
 
 import logging
+import weakref
+import threading
+import numpy as np
 import pandas as pd
 
+# Rule kinds. A rule is a plain tuple (kind, column, *params, severity) so rule sets hash and compare
+# by value; column None means every column of the frame.
+NOT_EMPTY = 'not_empty'    # (NOT_EMPTY, None, severity)
+REQUIRED = 'required'      # (REQUIRED, column, severity)
+DTYPE = 'dtype'            # (DTYPE, column, 'integer' | 'float' | 'numeric' | 'text', severity)
+NOT_NULL = 'not_null'      # (NOT_NULL, column or None, severity)
+RANGE = 'range'            # (RANGE, column, low, high, severity), bounds inclusive, NA cells skipped
+UNIQUE = 'unique'          # (UNIQUE, column, severity)
+ROW_COUNT = 'row_count'    # (ROW_COUNT, None, expected rows, severity)
+
+ERROR = 'error'      # fails the frame
+WARNING = 'warning'  # reported and logged only
+
+_DTYPE_CHECKS = {
+    'integer': pd.api.types.is_integer_dtype,
+    'float': pd.api.types.is_float_dtype,
+    'numeric': pd.api.types.is_numeric_dtype,
+    'text': lambda dtype: pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype),
+}
+
+_lock = threading.Lock()
+_reports = {}  # id(frame) -> {rules key: (shape, columns, report)}
+
+
+# A compiled, immutable set of rules; checks of the same kind are evaluated together in one pass
+class RuleSet:
+    def __init__(self, rules):
+        self.rules = tuple(rules)
+        self.key = self.rules
+
+    def __eq__(self, other):
+        return isinstance(other, RuleSet) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        return f"RuleSet({len(self.rules)} rules)"
+
+    def of_kind(self, kind):
+        return [rule for rule in self.rules if rule[0] == kind]
+
+
+# Outcome of one frame against one rule set; truthy when no error-severity rule failed
+class ValidationReport:
+    def __init__(self, df_name: str, rows: int, failures: list):
+        self.df_name = df_name
+        self.rows = rows
+        self.failures = failures  # dicts: rule, column, severity, count, message
+
+    @property
+    def ok(self) -> bool:
+        return not any(failure['severity'] == ERROR for failure in self.failures)
+
+    def __bool__(self):
+        return self.ok
+
+    @property
+    def errors(self) -> list:
+        return [failure for failure in self.failures if failure['severity'] == ERROR]
+
+    @property
+    def warnings(self) -> list:
+        return [failure for failure in self.failures if failure['severity'] == WARNING]
+
+    def as_dict(self) -> dict:
+        return {'name': self.df_name, 'ok': self.ok, 'rows': self.rows, 'failures': self.failures}
+
+
+# Rule set for the checks run_validations has always made, plus the optional extras
+def compile_rules(required_columns: list = None, nan_columns: list = None, dtypes: dict = None,
+                  ranges: dict = None, unique_columns: list = None, row_count: int = None,
+                  warn_only: tuple = ()) -> RuleSet:
+    def severity(kind):
+        return WARNING if kind in warn_only else ERROR
+
+    rules = [(NOT_EMPTY, None, severity(NOT_EMPTY))]
+    rules += [(REQUIRED, column, severity(REQUIRED)) for column in required_columns or ()]
+    rules += [(DTYPE, column, kind, severity(DTYPE)) for column, kind in (dtypes or {}).items()]
+    if nan_columns is None:
+        rules.append((NOT_NULL, None, severity(NOT_NULL)))
+    else:
+        rules += [(NOT_NULL, column, severity(NOT_NULL)) for column in nan_columns]
+    rules += [(RANGE, column, low, high, severity(RANGE)) for column, (low, high) in (ranges or {}).items()]
+    rules += [(UNIQUE, column, severity(UNIQUE)) for column in unique_columns or ()]
+    if row_count is not None:
+        rules.append((ROW_COUNT, None, row_count, severity(ROW_COUNT)))
+    return RuleSet(rules)
+
+
+def _failure(rule, column, count, message):
+    return {'rule': rule[0], 'column': column, 'severity': rule[-1], 'count': int(count), 'message': message}
+
+
+# One pass over the frame: presence and dtype checks read only the column index and dtypes, then the
+# null, range and uniqueness checks each scan their columns as a single block
+def _evaluate(df: pd.DataFrame, df_name: str, rules: RuleSet) -> ValidationReport:
+    failures = []
+    columns = set(df.columns)
+
+    for rule in rules.of_kind(NOT_EMPTY):
+        if df.empty:
+            failures.append(_failure(rule, None, 0, f"{df_name} is empty."))
+
+    missing = [rule for rule in rules.of_kind(REQUIRED) if rule[1] not in columns]
+    if missing:
+        # One message for all missing columns, as validate_columns logs them
+        failures.append(_failure(missing[0], [rule[1] for rule in missing], len(missing),
+                                 f"{df_name} is missing columns: {[rule[1] for rule in missing]}"))
+        failures[-1]['severity'] = ERROR if any(rule[-1] == ERROR for rule in missing) else WARNING
+
+    for rule in rules.of_kind(DTYPE):
+        column, kind = rule[1], rule[2]
+        if column in columns and not _DTYPE_CHECKS[kind](df[column].dtype):
+            failures.append(_failure(rule, column, 0, f"{df_name} column '{column}' is {df[column].dtype}, "
+                                                      f"expected {kind}"))
+
+    not_null = rules.of_kind(NOT_NULL)
+    if not_null and not df.empty:
+        whole = any(rule[1] is None for rule in not_null)
+        selected = list(df.columns) if whole else [rule[1] for rule in not_null if rule[1] in columns]
+        if selected:
+            mask = (df if whole else df[selected]).isna().to_numpy()
+            if mask.any():
+                nulls = mask.sum(axis=0)
+                rule = next(rule for rule in not_null if rule[1] is None or rule[1] in selected)
+                bad = {column: int(n) for column, n in zip(selected, nulls) if n}
+                failures.append(_failure(rule, list(bad), sum(bad.values()), f"{df_name} contains NaN values: {bad}"))
+
+    ranges = [rule for rule in rules.of_kind(RANGE)
+              if rule[1] in columns and pd.api.types.is_numeric_dtype(df[rule[1]].dtype)]
+    if ranges and not df.empty:
+        block = df[[rule[1] for rule in ranges]].to_numpy(dtype=float, na_value=np.nan)
+        low = np.array([rule[2] for rule in ranges], dtype=float)
+        high = np.array([rule[3] for rule in ranges], dtype=float)
+        out_of_range = ((block < low) | (block > high)).sum(axis=0)
+        for rule, n in zip(ranges, out_of_range):
+            if n:
+                failures.append(_failure(rule, rule[1], n, f"{df_name} column '{rule[1]}' has {n} value(s) "
+                                                           f"outside [{rule[2]}, {rule[3]}]"))
+
+    for rule in rules.of_kind(UNIQUE):
+        if rule[1] in columns:
+            duplicated = int(df[rule[1]].duplicated().sum())
+            if duplicated:
+                failures.append(_failure(rule, rule[1], duplicated, f"{df_name} column '{rule[1]}' has "
+                                                                    f"{duplicated} duplicate value(s)"))
+
+    for rule in rules.of_kind(ROW_COUNT):
+        if len(df) != rule[2]:
+            failures.append(_failure(rule, None, len(df), f"{df_name} has {len(df)} rows, expected {rule[2]}"))
+
+    return ValidationReport(df_name, len(df), failures)
+
+
+def _forget(frame_id):
+    with _lock:
+        _reports.pop(frame_id, None)
+
+
+# Validate a frame against a rule set and log the failures. Reports are memoized per frame object and
+# rule set, so re-checking the same frame is a dict lookup and logs nothing new; the memo is dropped
+# when the frame is garbage collected or its shape or columns change. Frames edited in place
+# without changing shape should be re-checked with use_cache=False.
+def validate_frame(df: pd.DataFrame, df_name: str, rules: RuleSet, use_cache: bool = True) -> ValidationReport:
+    shape, columns = df.shape, tuple(df.columns)
+    if use_cache:
+        with _lock:
+            cached = _reports.get(id(df), {}).get(rules.key)
+        if cached is not None and cached[0] == shape and cached[1] == columns:
+            return cached[2]
+
+    report = _evaluate(df, df_name, rules)
+    for failure in report.failures:
+        (logging.error if failure['severity'] == ERROR else logging.warning)(failure['message'])
+
+    if use_cache:
+        with _lock:
+            if id(df) not in _reports:
+                _reports[id(df)] = {}
+                weakref.finalize(df, _forget, id(df))
+            _reports[id(df)][rules.key] = (shape, columns, report)
+    return report
+
 
 # Validation 1: Check if DataFrame is empty
 def validate_not_empty(df: pd.DataFrame, df_name: str) -> bool:
@@ -12,8 +199,10 @@ def validate_not_empty(df: pd.DataFrame, df_name: str) -> bool:
     return True
 
 
-# Validation 2: Check for NaN values
-def validate_no_nan(df: pd.DataFrame, df_name: str) -> bool:
+# Validation 2: Check for NaN values, in all columns or only in `columns`
+def validate_no_nan(df: pd.DataFrame, df_name: str, columns: list = None) -> bool:
+    if columns is not None:
+        df = df[[col for col in columns if col in df.columns]]
     if df.isnull().values.any():
         logging.warning(f"{df_name} contains NaN values.")
         return False
@@ -29,13 +218,9 @@ def validate_columns(df: pd.DataFrame, df_name: str, required_columns: list) ->
     return True
 
 
-# Add more validation functions as needed...
-
-
-# A wrapper function that runs all validations
-def run_validations(df: pd.DataFrame, df_name: str, required_columns: list = None):
-    return all([
-        validate_not_empty(df, df_name),
-        validate_no_nan(df, df_name),
-        validate_columns(df, df_name, required_columns) if required_columns else True
-    ])
+# A wrapper that runs the standard validations (not empty, no NaN, required columns) through the
+# rule engine; returns the report, which is truthy when the frame passed
+def run_validations(df: pd.DataFrame, df_name: str, required_columns: list = None, nan_columns: list = None):
+    rules = compile_rules(required_columns=required_columns,
+                          nan_columns=list(nan_columns) if nan_columns is not None else None)
+    return validate_frame(df, df_name, rules)
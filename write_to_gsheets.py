@@ -1,47 +1,46 @@
-import pandas as pd
-import gspread
-from google.oauth2.service_account import Credentials
 from dotenv import load_dotenv
 import os
 import logging
+from gsheets_client import get_worksheet, timed
+from instrumentation import traced, count
+from sheets_sync import sync_worksheet, save_cached_grid, to_grid
+from stage_store import load_stage_or_excel
+from pipeline_logging import setup_logging
 
 # Set up logging
-logging.basicConfig(
-    filename='nfl_pipeline.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-)
+setup_logging()
 
 # Load environment variables
 load_dotenv()
 
+OUTPUT_FILE = 'nfl_output.xlsx'
+OUTPUT_SHEET_NAME = 'Sheet1'
+# 'diff' sends only changed rows; 'full' clears the sheet and rewrites every cell
+SYNC_MODE = os.getenv('NFL_SHEETS_SYNC', 'diff')
 
-# Set up Google Sheets API client
-def get_gsheets_client():
-    SCOPES = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive']
-    try:
-        credentials = Credentials.from_service_account_file('credentials.json', scopes=SCOPES)
-        client = gspread.authorize(credentials)
-        logging.info("Successfully authenticated Google Sheets API client.")
-        return client
-    except Exception as e:
-        logging.error(f"Failed to authenticate Google Sheets API client: {e}")
-        raise
 
+# Upload Excel file to Google Sheets; an in-memory DataFrame skips the file read
+@traced()
+def upload_to_gsheets(excel_file, spreadsheet_id, sheet_name, df=None):
+    import pandas as pd
 
-# Upload Excel file to Google Sheets
-def upload_to_gsheets(excel_file, spreadsheet_id, sheet_name):
     try:
-        df = pd.read_excel(excel_file)
+        if df is None:
+            df = load_stage_or_excel('nfl_output', excel_file)
         df = df.replace([float('inf'), float('-inf'), pd.NA, None], 0).fillna(0)
         logging.info(f"Loaded data from {excel_file} with {len(df)} rows.")
-
-        client = get_gsheets_client()
-        sheet = client.open_by_key(spreadsheet_id)
-        worksheet = sheet.worksheet(sheet_name)
-
-        worksheet.clear()
-        worksheet.update([df.columns.values.tolist()] + df.values.tolist())
+        count(rows_in=len(df))
+
+        worksheet = get_worksheet(spreadsheet_id, sheet_name)
+
+        with timed('data'):
+            if SYNC_MODE == 'diff':
+                sync_worksheet(worksheet, df, spreadsheet_id, sheet_name)
+            else:
+                worksheet.clear()
+                worksheet.update([df.columns.values.tolist()] + df.values.tolist())
+                count(http_requests=2)
+                save_cached_grid(spreadsheet_id, sheet_name, to_grid(df))
         logging.info(f"Data successfully written to Google Sheets sheet '{sheet_name}'.")
 
     except Exception as e:
@@ -49,13 +48,13 @@ def upload_to_gsheets(excel_file, spreadsheet_id, sheet_name):
         raise
 
 
-if __name__ == "__main__":
-    excel_file = 'nfl_output.xlsx'
-    spreadsheet_id = os.getenv('SPREADSHEET_ID')
-    sheet_name = 'Sheet1'
-
+def main(df=None):
     try:
-        upload_to_gsheets(excel_file, spreadsheet_id, sheet_name)
+        upload_to_gsheets(OUTPUT_FILE, os.getenv('SPREADSHEET_ID'), OUTPUT_SHEET_NAME, df)
         logging.info("write_to_gsheets.py completed successfully.")
     except Exception as e:
         logging.error(f"write_to_gsheets.py failed: {e}")
+
+
+if __name__ == "__main__":
+    main()